@@ -0,0 +1,233 @@
+"""
+Pre-generate answers for many student questions at once.
+
+Questions are read from a CSV (``question`` column, optional ``id`` and
+``school_level``) or a JSONL file with the same keys. For each chunk of
+questions the embeddings are computed in one pass and retrieval runs as a
+single batched Chroma query; the LLM calls are then fanned out with bounded
+concurrency, a request rate limit and retries. Results are appended to a JSONL
+file as they complete, so an interrupted run resumes where it stopped.
+
+Usage (from the project root):
+    python -m app.batch_answer questions.csv answers.jsonl --concurrency 8 --rpm 60
+"""
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set
+
+from app.metrics import configure_logging, observe_timings, record_trace
+from app.resilience import TokenBucket, backoff_delay
+
+logger = logging.getLogger(__name__)
+
+BATCH_CHUNK_SIZE = int(os.getenv('BATCH_CHUNK_SIZE', 64))
+BATCH_CONCURRENCY = int(os.getenv('BATCH_CONCURRENCY', 8))
+# Gemini requests per minute across the whole run (0 = unlimited)
+BATCH_REQUESTS_PER_MINUTE = float(os.getenv('BATCH_REQUESTS_PER_MINUTE', 60))
+BATCH_MAX_RETRIES = int(os.getenv('BATCH_MAX_RETRIES', 3))
+BATCH_RETRY_BASE_DELAY = float(os.getenv('BATCH_RETRY_BASE_DELAY', 2.0))
+BATCH_RETRY_MAX_DELAY = float(os.getenv('BATCH_RETRY_MAX_DELAY', 60.0))
+
+
+def read_questions(path: Path) -> Iterator[dict]:
+    """Yield {'id', 'question', 'filters'} from a CSV or JSONL file.
+
+    Rows without an ``id`` are numbered by their position in the file.
+    """
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        if path.suffix.lower() == '.csv':
+            rows = csv.DictReader(f)
+        else:
+            rows = (json.loads(line) for line in f if line.strip())
+
+        for position, row in enumerate(rows, 1):
+            question = (row.get('question') or '').strip()
+            if not question:
+                logger.warning(f"Skipping row {position}: no question")
+                continue
+            school_level = (row.get('school_level') or '').strip()
+            yield {
+                'id': str(row.get('id') or position),
+                'question': question,
+                'filters': {'school_level': school_level} if school_level else None
+            }
+
+
+def load_completed_ids(path: Path) -> Set[str]:
+    """Ids already answered successfully in an existing output file."""
+    completed = set()
+    if not path.exists():
+        return completed
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A line cut off by an interrupted run
+                continue
+            if record.get('status') == 'ok':
+                completed.add(str(record['id']))
+    return completed
+
+
+def chunked(items: List[dict], size: int) -> Iterator[List[dict]]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+class BatchAnswerer:
+    """Answer a list of questions with batched retrieval and concurrent generation."""
+
+    def __init__(self, chatbot, concurrency: int = BATCH_CONCURRENCY,
+                 requests_per_minute: float = BATCH_REQUESTS_PER_MINUTE,
+                 max_retries: int = BATCH_MAX_RETRIES, retry_base_delay: float = BATCH_RETRY_BASE_DELAY,
+                 n_results: int = 3):
+        self.chatbot = chatbot
+        self.semaphore = asyncio.Semaphore(concurrency)
+        # Unbounded wait: a batch run queues for its quota instead of failing fast
+        self.rate_limiter = TokenBucket(requests_per_minute, burst=1)
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = BATCH_RETRY_MAX_DELAY
+        self.n_results = n_results
+        self.stats = {'ok': 0, 'failed': 0, 'skipped': 0}
+
+    def prepare(self, items: List[dict]) -> List[str]:
+        """Build a prompt per question; questions sharing filters share one Chroma query."""
+        groups: Dict[Optional[tuple], List[int]] = {}
+        for i, item in enumerate(items):
+            key = tuple(sorted(item['filters'].items())) if item['filters'] else None
+            groups.setdefault(key, []).append(i)
+
+        prompts = [None] * len(items)
+        for indices in groups.values():
+            questions = [items[i]['question'] for i in indices]
+            results = self.chatbot.get_similar_cases_many(
+                questions, n_results=self.n_results, filters=items[indices[0]]['filters']
+            )
+            for i, cases in zip(indices, results):
+                items[i]['sources'] = [case['id'] for case in cases]
+                # Question embeddings are cached by the batched retrieval above
+                items[i]['recommendations'] = self.chatbot.recommend_jobs(items[i]['question'])
+                prompts[i] = self.chatbot.build_prompt(items[i]['question'], cases)
+        return prompts
+
+    async def generate(self, prompt: str) -> str:
+        """One LLM call with rate limiting and full-jitter exponential-backoff retries.
+
+        ``chatbot.llm`` has its own retries and circuit breaker; these outer
+        retries also cover empty answers and an open breaker, waiting it out.
+        """
+        for attempt in range(self.max_retries + 1):
+            await self.rate_limiter.aacquire()
+            try:
+                async with self.semaphore:
+                    # Counted with the chatbot's own calls so FAST_ANSWER_MODE=auto sees batch load
+                    with self.chatbot.count_llm_call():
+                        text = await self.chatbot.llm.agenerate(prompt)
+                if text:
+                    return text
+                raise ValueError("empty response")
+            except Exception as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = max(getattr(e, 'retry_after', 0.0),
+                            backoff_delay(attempt, self.retry_base_delay, self.retry_max_delay))
+                logger.warning(f"Generation failed ({e}); retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    async def answer(self, item: dict, prompt: str, output) -> None:
+        start = time.perf_counter()
+        record = {
+            'id': item['id'], 'question': item['question'], 'sources': item.get('sources', []),
+            'recommendations': item.get('recommendations', [])
+        }
+        try:
+            record['answer'] = await self.generate(prompt)
+            record['status'] = 'ok'
+        except Exception as e:
+            record['answer'] = None
+            record['status'] = 'error'
+            record['error'] = str(e)
+        record['latency_ms'] = round((time.perf_counter() - start) * 1000, 1)
+        observe_timings({'batch_answer': record['latency_ms']})
+        record_trace('batch_answer', {'total': record['latency_ms']}, id=item['id'], status=record['status'],
+                     error=record.get('error'))
+
+        # Runs on the event loop thread, so lines are never interleaved
+        output.write(json.dumps(record, ensure_ascii=False) + '\n')
+        output.flush()
+        self.stats['ok' if record['status'] == 'ok' else 'failed'] += 1
+
+    async def run(self, items: List[dict], output_path: Path, chunk_size: int = BATCH_CHUNK_SIZE) -> dict:
+        """Answer items not yet in output_path, appending one JSON line per answer."""
+        completed = load_completed_ids(output_path)
+        pending = [item for item in items if item['id'] not in completed]
+        self.stats['skipped'] = len(items) - len(pending)
+        logger.info(f"{len(pending)} questions to answer, {self.stats['skipped']} already done")
+
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        tasks = []
+        with open(output_path, 'a', encoding='utf-8') as output:
+            for chunk in chunked(pending, chunk_size):
+                # Retrieval for the next chunk overlaps with generation for earlier ones
+                prompts = await loop.run_in_executor(self.chatbot.executor, self.prepare, chunk)
+                tasks.extend(
+                    asyncio.create_task(self.answer(item, prompt, output))
+                    for item, prompt in zip(chunk, prompts)
+                )
+            await asyncio.gather(*tasks)
+
+        self.stats['seconds'] = time.perf_counter() - start
+        return self.stats
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Pre-generate chatbot answers for a file of questions.")
+    parser.add_argument('input', type=Path, help="CSV or JSONL file with a 'question' field")
+    parser.add_argument('output', type=Path, help="JSONL file to append answers to (resumed if it exists)")
+    parser.add_argument('--concurrency', type=int, default=BATCH_CONCURRENCY,
+                        help=f"concurrent Gemini calls (default: {BATCH_CONCURRENCY})")
+    parser.add_argument('--rpm', type=float, default=BATCH_REQUESTS_PER_MINUTE,
+                        help=f"Gemini requests per minute, 0 for no limit (default: {BATCH_REQUESTS_PER_MINUTE:g})")
+    parser.add_argument('--retries', type=int, default=BATCH_MAX_RETRIES,
+                        help=f"retries per question (default: {BATCH_MAX_RETRIES})")
+    parser.add_argument('--chunk-size', type=int, default=BATCH_CHUNK_SIZE,
+                        help=f"questions embedded and retrieved together (default: {BATCH_CHUNK_SIZE})")
+    parser.add_argument('--n-results', type=int, default=3, help="reference cases per question (default: 3)")
+    return parser.parse_args(argv)
+
+
+async def run_batch(args) -> dict:
+    from app.career_chatbot import CareerChatbot
+
+    chatbot = CareerChatbot()
+    answerer = BatchAnswerer(
+        chatbot, concurrency=args.concurrency, requests_per_minute=args.rpm,
+        max_retries=args.retries, n_results=args.n_results
+    )
+    items = list(read_questions(args.input))
+    return await answerer.run(items, args.output, chunk_size=args.chunk_size)
+
+
+def main(argv=None):
+    configure_logging()
+    args = parse_args(argv)
+    stats = asyncio.run(run_batch(args))
+    logger.info(
+        f"Done: {stats['ok']} answered, {stats['failed']} failed, {stats['skipped']} skipped "
+        f"in {stats['seconds']:.1f}s"
+    )
+    if stats['failed']:
+        logger.info("Re-run the same command to retry the failed questions.")
+
+
+if __name__ == "__main__":
+    main()
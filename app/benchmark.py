@@ -0,0 +1,619 @@
+"""
+Benchmarks for the data pipeline.
+
+Usage (from the project root):
+    python -m app.benchmark import
+    python -m app.benchmark latency --backend stub --concurrency 1 4 16
+    python -m app.benchmark vector --queries 200 -k 20
+    python -m app.benchmark embedding --runtimes torch onnx onnx-int8
+    python -m app.benchmark embedding --models all-MiniLM-L6-v2 multilingual-e5-small --runtimes torch
+    python -m app.benchmark chunking --records 1000
+    python -m app.benchmark rerank --candidates 0 5 10 20
+    python -m app.benchmark recommend -k 3
+"""
+import argparse
+import asyncio
+import importlib.util
+import itertools
+import logging
+import re
+import resource
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.db import DatabaseManager
+from app.embeddings import EMBEDDING_MODEL
+from app.metrics import configure_logging
+from app.reranker import RERANKER_MODEL
+from app.record_reader import LABELING_DATA_PATH, SCHOOL_LEVEL_FILES, iter_json_records
+
+logger = logging.getLogger(__name__)
+
+
+def count_rows(db_path: Path) -> int:
+    """Count the rows written to the counselling tables."""
+    with sqlite3.connect(db_path) as conn:
+        return sum(
+            conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in ('students', 'counselling_sessions', 'highlights')
+        )
+
+
+def run_import(mode: str, level: str, records: list, workdir: Path) -> dict:
+    """Import one file's records into a fresh database and time it."""
+    db_path = workdir / f"{mode}_{level}.db"
+    db = DatabaseManager(str(db_path))
+    try:
+        start = time.perf_counter()
+        if mode == 'bulk':
+            db.bulk_import_school_data(level, records)
+        else:
+            db.import_school_data(level, records)
+        db.flush_batch()
+        elapsed = time.perf_counter() - start
+    finally:
+        db.close()
+        db.engine.dispose()
+
+    rows = count_rows(db_path)
+    return {'rows': rows, 'seconds': elapsed, 'rows_per_second': rows / elapsed if elapsed > 0 else 0.0}
+
+
+def bench_import(args):
+    """Compare the legacy per-row importer with the bulk importer."""
+    print(f"{'level':<6}{'mode':<8}{'rows':>8}{'seconds':>10}{'rows/s':>12}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        for level, relative_path in SCHOOL_LEVEL_FILES.items():
+            file_path = LABELING_DATA_PATH / relative_path
+            if not file_path.exists():
+                logger.warning(f"File not found: {file_path}")
+                continue
+
+            # Parse once up front so both importers are timed on inserts only
+            records = list(iter_json_records(file_path))
+            results = {}
+            for mode in ('legacy', 'bulk'):
+                best = None
+                for _ in range(args.repeat):
+                    result = run_import(mode, level, records, workdir)
+                    (workdir / f"{mode}_{level}.db").unlink()
+                    if best is None or result['seconds'] < best['seconds']:
+                        best = result
+                results[mode] = best
+                print(f"{level:<6}{mode:<8}{best['rows']:>8}{best['seconds']:>10.3f}"
+                      f"{best['rows_per_second']:>12.0f}")
+
+            speedup = results['legacy']['seconds'] / results['bulk']['seconds']
+            print(f"{level:<6}{'speedup':<8}{speedup:>30.1f}x")
+
+
+LATENCY_STAGES = ('embed', 'retrieval', 'rerank', 'prompt', 'generation', 'fallback', 'total')
+
+
+def iter_level_records():
+    """Yield (school_level, record) round-robin across the school-level files."""
+    def read(level, file_path):
+        for record in iter_json_records(file_path):
+            yield level, record
+
+    readers = [
+        read(level, LABELING_DATA_PATH / relative_path)
+        for level, relative_path in SCHOOL_LEVEL_FILES.items()
+        if (LABELING_DATA_PATH / relative_path).exists()
+    ]
+    for item in itertools.chain.from_iterable(itertools.zip_longest(*readers)):
+        if item is not None:
+            yield item
+
+
+def first_sentences(text: str, count: int = 1) -> str:
+    sentences = re.split(r'(?<=[.다])\s+|\n+', text.strip())
+    return ' '.join(sentence.strip() for sentence in sentences[:count] if sentence.strip())
+
+
+def labeling_queries(limit: int) -> List[str]:
+    """Student-style questions built from the first sentence of counselling summaries.
+
+    Records are taken round-robin across the school-level files so every level
+    is represented.
+    """
+    queries = []
+    for _, record in iter_level_records():
+        if not record.get('counselling_summaries'):
+            continue
+        sentence = first_sentences(record['counselling_summaries'][0]['summary'])
+        if sentence:
+            queries.append(f"{sentence} 어떤 진로를 준비하면 좋을까요?")
+        if len(queries) >= limit:
+            break
+    return queries
+
+
+def held_out_split(query_limit: int, document_limit: int = 0, record_limit: int = 0,
+                   chunking: Optional[str] = None):
+    """Documents to index plus held-out (query, student_idx) pairs.
+
+    For students with at least two sessions, the opening of the first session's
+    summary becomes the query and that session is left out of the index; a
+    query counts as answered when a result belongs to the same student.
+    Reading stops once the query, document and record limits are all met.
+    """
+    from app.create_embeddings import DOCUMENT_CHUNKING, build_documents
+
+    documents, queries = [], []
+    for records, (level, record) in enumerate(iter_level_records(), 1):
+        sessions = record.get('counselling_summaries') or []
+        held_out = None
+        if len(queries) < query_limit and len(sessions) >= 2:
+            text = first_sentences(sessions[0]['summary'], 2)
+            if text:
+                queries.append((text, record['student_idx']))
+                held_out = sessions[0]['counseling_idx']
+        for document in build_documents(record, level, chunking or DOCUMENT_CHUNKING):
+            if document[2]['counseling_idx'] != held_out:
+                documents.append(document)
+        if len(queries) >= query_limit and len(documents) >= document_limit and records >= record_limit:
+            break
+    return documents, queries
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {'p50': p50, 'p95': p95, 'p99': p99}
+
+
+async def replay_queries(chatbot, queries: List[str], concurrency: int) -> Dict[str, List[float]]:
+    """Send queries through agenerate_response with at most ``concurrency`` in flight."""
+    semaphore = asyncio.Semaphore(concurrency)
+    samples = {stage: [] for stage in LATENCY_STAGES}
+
+    async def send(query):
+        async with semaphore:
+            timings = {}
+            start = time.perf_counter()
+            await chatbot.agenerate_response(query, timings=timings)
+            timings['total'] = (time.perf_counter() - start) * 1000
+        for stage in LATENCY_STAGES:
+            if stage in timings:
+                samples[stage].append(timings[stage])
+
+    await asyncio.gather(*(send(query) for query in queries))
+    return samples
+
+
+def bench_latency(args):
+    """End-to-end request latency per stage at several concurrency levels."""
+    from app.cache import LRUCache, SemanticCache
+    from app.career_chatbot import CareerChatbot, StubBackend
+    from app.gui import EXAMPLE_QUESTIONS
+    from app.metrics import REQUESTS
+    from app.resilience import TokenBucket
+
+    if args.backend == 'stub':
+        backend = StubBackend(latency_ms=args.stub_latency_ms, ttft_ms=args.stub_ttft_ms,
+                              failure_rate=args.stub_failure_rate)
+    else:
+        backend = args.backend
+    chatbot = CareerChatbot(llm_backend=backend)
+    # A real quota would throttle the replay itself; only simulate one when asked
+    chatbot.llm.limiter = TokenBucket(args.rate_limit_rpm, burst=1, max_wait=chatbot.llm.limiter.max_wait)
+    if not args.cache:
+        # Every replayed query should pay for embedding, retrieval and generation
+        chatbot.embedding_cache = LRUCache(maxsize=0)
+        chatbot.retrieval_cache = LRUCache(maxsize=0)
+        chatbot.response_cache = SemanticCache(maxsize=0)
+        if chatbot.reranker is not None:
+            chatbot.reranker.cache = LRUCache(maxsize=0)
+    if chatbot.reranker is not None and args.rerank_candidates:
+        chatbot.retriever.rerank_candidates = args.rerank_candidates
+    chatbot.warm_up()
+
+    queries = (list(EXAMPLE_QUESTIONS) + labeling_queries(args.queries)) * args.rounds
+    print(f"{len(queries)} requests, backend={chatbot.llm.name}, cache={'on' if args.cache else 'off'}")
+    print(f"{'conc':>5}{'stage':>12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+
+    for concurrency in args.concurrency:
+        start = time.perf_counter()
+        samples = asyncio.run(replay_queries(chatbot, queries, concurrency))
+        elapsed = time.perf_counter() - start
+        for stage in LATENCY_STAGES:
+            if not samples[stage]:
+                continue
+            stats = percentiles(samples[stage])
+            print(f"{concurrency:>5}{stage:>12}{stats['p50']:>10.1f}{stats['p95']:>10.1f}{stats['p99']:>10.1f}")
+        print(f"{concurrency:>5}{'throughput':>12}{len(queries) / elapsed:>10.1f} req/s")
+
+    outcomes = {outcome: int(REQUESTS.value(outcome=outcome)) for outcome in ('answered', 'cached', 'degraded', 'error')}
+    print("outcomes: " + ", ".join(f"{outcome}={count}" for outcome, count in outcomes.items()))
+    llm = chatbot.llm.stats()
+    print(f"llm: breaker {llm['state']} (opened {llm['opens']}x, {llm['rejected']} rejected), "
+          f"{llm['retries']} retries, rate limit {llm['rate_limit']['throttled']} throttled / "
+          f"{llm['rate_limit']['rejected']} rejected")
+
+    if chatbot.reranker is not None:
+        stats = chatbot.reranker.stats()
+        print(f"rerank: {chatbot.retriever.rerank_candidates} candidates, {stats['calls']} calls, "
+              f"mean {stats['mean_ms']:.1f}ms, score cache hit rate {stats['cache_hit_rate']:.1%}")
+
+
+def time_queries(backend, query_embeddings: List[List[float]], k: int, where=None):
+    """Query one embedding at a time, then all at once. Returns (latencies ms, batch ms, ids)."""
+    latencies, ids = [], []
+    for embedding in query_embeddings:
+        start = time.perf_counter()
+        result = backend.query(query_embeddings=[embedding], n_results=k, where=where)
+        latencies.append((time.perf_counter() - start) * 1000)
+        ids.append(result['ids'][0])
+    start = time.perf_counter()
+    backend.query(query_embeddings=query_embeddings, n_results=k, where=where)
+    return latencies, (time.perf_counter() - start) * 1000, ids
+
+
+def bench_vector(args):
+    """Chroma vs the in-process NumPy (and HNSW) vector index: latency and recall@k."""
+    import chromadb
+    from app.embeddings import CHROMA_PATH, COLLECTION_NAME, get_embedding_function
+    from app.vector_index import NumpyVectorIndex, copy_collection
+
+    embedding_function = get_embedding_function()
+    collection = chromadb.PersistentClient(path=str(CHROMA_PATH)).get_collection(
+        COLLECTION_NAME, embedding_function=embedding_function
+    )
+    queries = labeling_queries(args.queries)
+    query_embeddings = [list(map(float, embedding)) for embedding in embedding_function(queries)]
+    where = {'school_level': args.school_level} if args.school_level else None
+
+    variants = [('numpy-float32', 'float32', 'exact'), ('numpy-float16', 'float16', 'exact')]
+    if importlib.util.find_spec('hnswlib') is not None:
+        variants.append(('numpy-hnsw', 'float32', 'hnsw'))
+    else:
+        logger.warning("hnswlib is not installed; skipping the HNSW variant")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        backends = {'chroma': collection}
+        for name, dtype, algorithm in variants:
+            index = NumpyVectorIndex(Path(tmp) / name, dtype=dtype, algorithm=algorithm)
+            copy_collection(collection, index)
+            index.save()
+            start = time.perf_counter()
+            backends[name] = NumpyVectorIndex(Path(tmp) / name, dtype=dtype, algorithm=algorithm)
+            logger.warning(f"{name}: opened in {(time.perf_counter() - start) * 1000:.1f}ms")
+
+        print(f"{collection.count()} documents, {len(queries)} queries, k={args.k}, where={where}")
+        print(f"{'backend':<15}{'p50 ms':>10}{'p95 ms':>10}{'batch ms':>10}{'recall@k':>10}")
+
+        # Exact float32 search is the ground truth for recall
+        reference = None
+        results = {}
+        for name in ['numpy-float32'] + [name for name in backends if name != 'numpy-float32']:
+            latencies, batch_ms, ids = time_queries(backends[name], query_embeddings, args.k, where)
+            if reference is None:
+                reference = ids
+            recall = np.mean([
+                len(set(found) & set(expected)) / len(expected) if expected else 1.0
+                for found, expected in zip(ids, reference)
+            ])
+            results[name] = (percentiles(latencies), batch_ms, recall)
+
+        for name in backends:
+            stats, batch_ms, recall = results[name]
+            print(f"{name:<15}{stats['p50']:>10.2f}{stats['p95']:>10.2f}{batch_ms:>10.1f}{recall:>10.3f}")
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def index_documents(embedding_function, model_name: str, documents: list, path: Path):
+    """Embed documents into an exact NumPy index. Returns (index, seconds spent embedding)."""
+    from app.embeddings import PrefixedEmbeddingFunction, document_texts
+    from app.vector_index import NumpyVectorIndex
+
+    ids, texts, metadatas = (list(column) for column in zip(*documents))
+    # Documents get the passage prefix, not the query prefix the function adds
+    document_function = embedding_function.embedding_function \
+        if isinstance(embedding_function, PrefixedEmbeddingFunction) else embedding_function
+    start = time.perf_counter()
+    embeddings = document_function(document_texts(texts, model_name))
+    seconds = time.perf_counter() - start
+
+    index = NumpyVectorIndex(path, algorithm='exact')
+    index.upsert(ids=ids, embeddings=embeddings, documents=texts, metadatas=metadatas)
+    return index, seconds
+
+
+def student_recall(results: dict, held_out: list) -> float:
+    """Share of held-out queries with at least one result from the same student."""
+    return float(np.mean([
+        any(metadata['student_idx'] == student_idx for metadata in found)
+        for found, (_, student_idx) in zip(results['metadatas'], held_out)
+    ]))
+
+
+def bench_embedding(args):
+    """Embedding models and runtimes side by side on held-out labeling-data queries.
+
+    Reports load time, per-query latency, indexing throughput, recall@k against
+    the held-out student and agreement@k with the first combination listed.
+    """
+    from app.embeddings import get_embedding_function
+
+    documents, held_out = held_out_split(args.queries, document_limit=args.documents)
+    queries = [query for query, _ in held_out]
+
+    print(f"{len(documents)} documents, {len(queries)} held-out queries, k={args.k}")
+    print(f"{'model':<40}{'runtime':<11}{'load ms':>9}{'q p50':>8}{'q p95':>8}{'docs/s':>8}"
+          f"{'recall@k':>10}{'agree@k':>9}{'RSS MB':>8}")
+
+    reference = None
+    with tempfile.TemporaryDirectory() as tmp:
+        for model_name, runtime in itertools.product(args.models, args.runtimes):
+            try:
+                start = time.perf_counter()
+                embedding_function = get_embedding_function(model_name, runtime=runtime)
+                embedding_function([queries[0]])
+                load_ms = (time.perf_counter() - start) * 1000
+            except Exception as e:
+                logger.warning(f"Skipping {model_name} ({runtime}): {e}")
+                continue
+
+            latencies = []
+            for query in queries:
+                t0 = time.perf_counter()
+                embedding_function([query])
+                latencies.append((time.perf_counter() - t0) * 1000)
+
+            index, seconds = index_documents(
+                embedding_function, model_name, documents, Path(tmp) / f"{model_name}-{runtime}"
+            )
+            docs_per_second = len(documents) / seconds
+            results = index.query(query_embeddings=embedding_function(queries), n_results=args.k)
+
+            recall = student_recall(results, held_out)
+            if reference is None:
+                reference = results['ids']
+            agreement = np.mean([len(set(a) & set(b)) / len(b) for a, b in zip(results['ids'], reference) if b])
+
+            stats = percentiles(latencies)
+            print(f"{model_name:<40}{runtime:<11}{load_ms:>9.0f}{stats['p50']:>8.2f}{stats['p95']:>8.2f}"
+                  f"{docs_per_second:>8.0f}{recall:>10.3f}{agreement:>9.3f}{peak_rss_mb():>8.0f}")
+            del embedding_function, index
+
+
+def bench_rerank(args):
+    """Cross-encoder reranking at several candidate budgets: recall@n, latency, score cache hit rate.
+
+    Retrieval is vector-only over a held-out split (see held_out_split); a
+    budget of 0 is the fused order without reranking. Each budget is replayed
+    twice so the second pass shows the effect of the score cache.
+    """
+    from app.embeddings import get_embedding_function
+    from app.reranker import CrossEncoderReranker, reranker_path
+    from app.retrieval import HybridRetriever
+
+    embedding_function = get_embedding_function()
+    reranker = CrossEncoderReranker(reranker_path(args.model))
+    documents, held_out = held_out_split(args.queries, record_limit=args.records)
+    queries = [query for query, _ in held_out]
+    query_embeddings = embedding_function(queries)
+
+    print(f"{len(documents)} documents, {len(queries)} held-out queries, n_results={args.n_results}, "
+          f"reranker {args.model}")
+    print(f"{'budget':>7}{'pass':>6}{'recall@n':>10}{'p50 ms':>9}{'p95 ms':>9}{'cache hit':>11}")
+    with tempfile.TemporaryDirectory() as tmp:
+        index, _ = index_documents(embedding_function, EMBEDDING_MODEL, documents, Path(tmp) / 'index')
+        for budget in args.candidates:
+            reranker.cache.clear()
+            retriever = HybridRetriever(index, reranker=reranker if budget else None, rerank_candidates=budget)
+            for replay in (1, 2):
+                lookups_before, hits_before = reranker.cache.hits + reranker.cache.misses, reranker.cache.hits
+                latencies, found = [], []
+                for query, embedding, (_, student_idx) in zip(queries, query_embeddings, held_out):
+                    timings = {}
+                    cases = retriever.retrieve(query, n_results=args.n_results, query_embedding=embedding,
+                                               timings=timings)
+                    latencies.append(timings.get('rerank', 0.0))
+                    found.append(any(case['metadata']['student_idx'] == student_idx for case in cases))
+                lookups = reranker.cache.hits + reranker.cache.misses - lookups_before
+                hit_rate = (reranker.cache.hits - hits_before) / lookups if lookups else 0.0
+                stats = percentiles(latencies)
+                print(f"{budget:>7}{replay:>6}{np.mean(found):>10.3f}{stats['p50']:>9.1f}{stats['p95']:>9.1f}"
+                      f"{hit_rate:>11.1%}")
+            retriever.close()
+
+
+def bench_recommend(args):
+    """Job-category recommender on held-out students: hit@k against the experts' picks and latency.
+
+    Every ``--holdout``-th labeled student is left out of the build; the
+    opening of their first summary is the query. hit@k counts queries whose
+    priority-1 category is in the top k; overlap@k is the share of the three
+    expert picks found in the top k. The most frequently recommended
+    categories are shown as a baseline.
+    """
+    from app.create_embeddings import load_document_encoder
+    from app.embeddings import document_texts, get_embedding_function
+    from app.recommender import JobRecommender, iter_labeled_students
+
+    students = list(iter_labeled_students())
+    training = [student for i, student in enumerate(students) if i % args.holdout]
+    # hit@k needs the priority-1 pick, so held-out students without one are skipped
+    held_out, first = [], []
+    for student in students[::args.holdout]:
+        top = next((r['job_category_idx'] for r in student['recommended_job_categories'] if r['priority'] == 1), None)
+        if top is not None:
+            held_out.append(student)
+            first.append(top)
+
+    encoder = load_document_encoder(model_name=EMBEDDING_MODEL)
+    start = time.perf_counter()
+    recommender = JobRecommender.build(
+        training, lambda texts: encoder.encode(document_texts(texts), convert_to_numpy=True)
+    )
+    build_seconds = time.perf_counter() - start
+
+    queries = [first_sentences(student['counselling_summaries'][0]['summary'], 2) for student in held_out]
+    query_embeddings = np.asarray(get_embedding_function()(queries), dtype=np.float32)
+    expert = [
+        {recommendation['job_category_idx'] for recommendation in student['recommended_job_categories']}
+        for student in held_out
+    ]
+
+    latencies = []
+    ranked = []
+    for embedding in query_embeddings:
+        t0 = time.perf_counter()
+        recommendations = recommender.recommend(embedding, top_k=args.k)
+        latencies.append((time.perf_counter() - t0) * 1e6)
+        ranked.append([recommendation['job_category_idx'] for recommendation in recommendations])
+    t0 = time.perf_counter()
+    recommender.scores(query_embeddings)
+    batch_us = (time.perf_counter() - t0) * 1e6 / len(queries)
+    popular = [int(recommender.categories[i]) for i in np.argsort(-recommender.support)[:args.k]]
+
+    print(f"{len(training)} students indexed in {build_seconds:.1f}s, {len(held_out)} held out, "
+          f"{len(recommender.categories)} categories, k={args.k}")
+    print(f"{'ranking':<12}{'hit@k':>8}{'overlap@k':>11}")
+    for name, rankings in (('recommender', ranked), ('popularity', [popular] * len(held_out))):
+        hit = np.mean([top in ranking for top, ranking in zip(first, rankings)])
+        overlap = np.mean([len(set(ranking) & picks) / len(picks) for ranking, picks in zip(rankings, expert)])
+        print(f"{name:<12}{hit:>8.3f}{overlap:>11.3f}")
+    stats = percentiles(latencies)
+    print(f"recommend() p50 {stats['p50']:.1f}us, p95 {stats['p95']:.1f}us; batched scoring {batch_us:.2f}us/query")
+
+
+def bench_chunking(args):
+    """Full summaries + highlights vs highlight chunks: index size, recall@k and prompt context tokens.
+
+    Both layouts are built from the same records with the configured embedding
+    model. Context tokens are those build_context would put in the prompt for
+    the top ``--n-results`` sessions of each held-out query.
+    """
+    from app.career_chatbot import build_context, estimate_tokens
+    from app.chunking import CHUNKING_MODES
+    from app.embeddings import get_embedding_function
+    from app.retrieval import HybridRetriever
+
+    embedding_function = get_embedding_function()
+    summaries = {}
+    for _, record in itertools.islice(iter_level_records(), args.records):
+        for session in record['counselling_summaries']:
+            summaries[(record['student_idx'], session['counseling_idx'])] = session['summary']
+
+    print(f"{args.records} records, {args.queries} held-out queries, k={args.k}, model {EMBEDDING_MODEL}")
+    print(f"{'chunking':<12}{'vectors':>9}{'mean chars':>12}{'embed s':>9}{'recall@k':>10}{'context tok':>13}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in CHUNKING_MODES:
+            documents, held_out = held_out_split(args.queries, record_limit=args.records, chunking=mode)
+            index, seconds = index_documents(embedding_function, EMBEDDING_MODEL, documents, Path(tmp) / mode)
+            query_embeddings = embedding_function([query for query, _ in held_out])
+            recall = student_recall(index.query(query_embeddings=query_embeddings, n_results=args.k), held_out)
+
+            # Vector-only retrieval, with summaries filled in as the case store would
+            retriever = HybridRetriever(index)
+            all_cases = retriever.retrieve_many(
+                [query for query, _ in held_out], n_results=args.n_results, query_embeddings=query_embeddings
+            )
+            retriever.close()
+            context_tokens = []
+            for cases in all_cases:
+                for case in cases:
+                    case['summary'] = summaries.get(case['key'], case['summary'])
+                context_tokens.append(estimate_tokens(build_context(cases)))
+
+            mean_chars = np.mean([len(text) for _, text, _ in documents])
+            print(f"{mode:<12}{len(documents):>9}{mean_chars:>12.0f}{seconds:>9.1f}{recall:>10.3f}"
+                  f"{np.mean(context_tokens):>13.0f}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Career chatbot benchmarks.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = subparsers.add_parser('import', help="legacy vs bulk SQLite import (rows/sec)")
+    import_parser.add_argument('--repeat', type=int, default=3, help="runs per mode; the best is reported")
+    import_parser.set_defaults(func=bench_import)
+
+    latency_parser = subparsers.add_parser('latency', help="end-to-end p50/p95/p99 per request stage")
+    latency_parser.add_argument('--backend', default='stub', help="LLM backend: stub (default) or gemini")
+    latency_parser.add_argument('--stub-latency-ms', type=float, default=800, help="stub generation time")
+    latency_parser.add_argument('--stub-ttft-ms', type=float, default=200, help="stub time to first token")
+    latency_parser.add_argument('--stub-failure-rate', type=float, default=0.0,
+                                help="share of stub calls that fail with a transient error")
+    latency_parser.add_argument('--rate-limit-rpm', type=float, default=0,
+                                help="LLM requests per minute to simulate a quota, 0 for no limit (default: 0)")
+    latency_parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16],
+                                help="concurrency levels to replay the query set at")
+    latency_parser.add_argument('--queries', type=int, default=50,
+                                help="questions taken from the labeling data (added to the GUI examples)")
+    latency_parser.add_argument('--rounds', type=int, default=1, help="times the query set is replayed")
+    latency_parser.add_argument('--cache', action='store_true', help="keep the chatbot caches enabled")
+    latency_parser.add_argument('--rerank-candidates', type=int,
+                                help="sessions passed to the reranker (default: RERANK_CANDIDATES)")
+    latency_parser.set_defaults(func=bench_latency)
+
+    vector_parser = subparsers.add_parser('vector', help="Chroma vs NumPy/HNSW vector index latency and recall")
+    vector_parser.add_argument('--queries', type=int, default=200, help="questions taken from the labeling data")
+    vector_parser.add_argument('-k', type=int, default=20, help="results per query")
+    vector_parser.add_argument('--school-level', help="also apply a school_level filter (e.g. 고등)")
+    vector_parser.set_defaults(func=bench_vector)
+
+    embedding_parser = subparsers.add_parser(
+        'embedding', help="embedding models/runtimes: latency and recall@k on held-out queries"
+    )
+    embedding_parser.add_argument('--models', nargs='+', default=[EMBEDDING_MODEL],
+                                  help=f"models to compare (default: {EMBEDDING_MODEL})")
+    embedding_parser.add_argument('--runtimes', nargs='+', default=['torch', 'onnx', 'onnx-int8'],
+                                  help="runtimes to compare; agreement is measured against the first combination")
+    embedding_parser.add_argument('--documents', type=int, default=2000, help="documents to index")
+    embedding_parser.add_argument('--queries', type=int, default=200, help="held-out queries from the labeling data")
+    embedding_parser.add_argument('-k', type=int, default=10, help="results per query for recall@k")
+    embedding_parser.set_defaults(func=bench_embedding)
+
+    rerank_parser = subparsers.add_parser(
+        'rerank', help="cross-encoder candidate budgets: recall@n, rerank latency, score cache hit rate"
+    )
+    rerank_parser.add_argument('--candidates', type=int, nargs='+', default=[0, 5, 10, 20],
+                               help="sessions passed to the reranker (0 = no reranking)")
+    rerank_parser.add_argument('--model', default=RERANKER_MODEL, help=f"cross-encoder (default: {RERANKER_MODEL})")
+    rerank_parser.add_argument('--records', type=int, default=1000, help="student records to index")
+    rerank_parser.add_argument('--queries', type=int, default=100, help="held-out queries from the labeling data")
+    rerank_parser.add_argument('--n-results', type=int, default=3, help="sessions kept after reranking")
+    rerank_parser.set_defaults(func=bench_rerank)
+
+    recommend_parser = subparsers.add_parser(
+        'recommend', help="job-category recommender: hit@k on held-out students and latency"
+    )
+    recommend_parser.add_argument('--holdout', type=int, default=5, help="hold out every n-th student")
+    recommend_parser.add_argument('-k', type=int, default=3, help="categories recommended per query")
+    recommend_parser.set_defaults(func=bench_recommend)
+
+    chunking_parser = subparsers.add_parser(
+        'chunking', help="summary+highlight documents vs highlight chunks: vectors, recall@k, prompt tokens"
+    )
+    chunking_parser.add_argument('--records', type=int, default=1000, help="student records to index")
+    chunking_parser.add_argument('--queries', type=int, default=200, help="held-out queries from the labeling data")
+    chunking_parser.add_argument('-k', type=int, default=10, help="results per query for recall@k")
+    chunking_parser.add_argument('--n-results', type=int, default=3, help="sessions put in the prompt context")
+    chunking_parser.set_defaults(func=bench_chunking)
+
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    # Keep per-batch import/indexing progress out of the timings
+    configure_logging(level=logging.WARNING)
+    args = parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+In-process caches for the chatbot request path.
+
+- LRUCache: exact-key cache with optional TTL (query embeddings, retrieval results)
+- SemanticCache: returns a stored value when a new embedding is close enough
+  (cosine similarity) to a cached one (LLM responses)
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+import numpy as np
+
+
+class LRUCache:
+    """Thread-safe LRU cache with an optional per-entry time-to-live (seconds)."""
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, stored_at = entry
+                if self.ttl is None or time.monotonic() - stored_at <= self.ttl:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, time.monotonic())
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'size': len(self._data),
+            'maxsize': self.maxsize
+        }
+
+
+class SemanticCache:
+    """Nearest-neighbour cache over normalized embeddings.
+
+    ``lookup`` returns the value of the most similar entry in the same scope
+    when its cosine similarity is at least ``threshold``. The least recently
+    used entry is evicted once ``maxsize`` is reached.
+    """
+
+    def __init__(self, threshold: float = 0.95, maxsize: int = 256, ttl: Optional[float] = None):
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()  # id -> (vector, value, scope, stored_at)
+        self._next_id = 0
+        self._matrix = None
+        self._ids = []
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def _rebuild(self):
+        self._ids = list(self._entries)
+        self._matrix = (
+            np.stack([self._entries[i][0] for i in self._ids]) if self._ids else None
+        )
+
+    def _expire(self):
+        if self.ttl is None:
+            return
+        now = time.monotonic()
+        expired = [i for i, entry in self._entries.items() if now - entry[3] > self.ttl]
+        for entry_id in expired:
+            del self._entries[entry_id]
+        if expired:
+            self._rebuild()
+
+    def lookup(self, embedding, scope: Hashable = None) -> Optional[Any]:
+        vector = self._normalize(embedding)
+        with self._lock:
+            self._expire()
+            if self._matrix is not None:
+                similarities = self._matrix @ vector
+                for position in np.argsort(-similarities):
+                    if similarities[position] < self.threshold:
+                        break
+                    entry_id = self._ids[position]
+                    _, value, entry_scope, _ = self._entries[entry_id]
+                    if entry_scope == scope:
+                        self._entries.move_to_end(entry_id)
+                        self.hits += 1
+                        return value
+            self.misses += 1
+            return None
+
+    def add(self, embedding, value: Any, scope: Hashable = None):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[self._next_id] = (self._normalize(embedding), value, scope, time.monotonic())
+            self._next_id += 1
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+            self._rebuild()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._rebuild()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'threshold': self.threshold
+        }
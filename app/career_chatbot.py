@@ -1,94 +1,1051 @@
 import os
+import asyncio
+import hashlib
+import logging
+import math
+import random
+import textwrap
+import threading
+import time
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-import google.generativeai as genai
 from dotenv import load_dotenv
-import chromadb
+import numpy as np
+
+from app.cache import LRUCache, SemanticCache
+from app.case_store import CaseStore
+from app.conversation import ConversationStore
+from app.fallback import get_fallback_responder
+from app.embeddings import (
+    CHROMA_PATH, COLLECTION_NAME, EMBEDDING_MODEL, check_embedding_model, get_embedding_function
+)
+from app.metrics import (
+    CACHE_ENTRIES, CACHE_HIT_RATIO, CONVERSATION_SESSIONS, ERRORS, FALLBACKS, LLM_CIRCUIT_STATE, LLM_IN_FLIGHT,
+    LLM_RETRIES, REGISTRY, REQUESTS, TOPIC_REUSES, observe_timings, record_trace
+)
+from app.recommender import JOB_RECOMMENDATIONS, JOB_RECOMMENDER_PATH, JobRecommender
+from app.reranker import case_text, get_reranker
+from app.resilience import (
+    CIRCUIT_STATES, CircuitBreaker, CircuitOpenError, OverloadedError, RateLimitedError, TokenBucket, TransientError,
+    backoff_delay, is_transient
+)
+from app.retrieval import HybridRetriever, RETRIEVAL_CANDIDATES
+from app.tokens import estimate_tokens, truncate_to_tokens
+from app.vector_index import VECTOR_BACKEND, VECTOR_INDEX_PATH, NumpyVectorIndex
+
+logger = logging.getLogger(__name__)
 
 # 환경 변수 로드
 load_dotenv()
 
-# Gemini API 키 설정
+# Gemini API 키 (google.generativeai는 챗봇 생성 시점에 import/설정)
 GOOGLE_API_KEY = os.getenv('GOOGLE_API_KEY')
-genai.configure(api_key=GOOGLE_API_KEY)
 
 GEMINI_MODEL_NAME = os.getenv('GEMINI_MODEL_NAME', 'gemini-2.5-flash')
 GEMINI_TEMPERATURE = float(os.getenv('GEMINI_TEMPERATURE', 0.2))
 GEMINI_MAX_OUTPUT_TOKENS = int(os.getenv('GEMINI_MAX_OUTPUT_TOKENS', 1024))
 
+# LLM 백엔드: gemini(기본) 또는 stub(네트워크 없이 부하 테스트용 고정 응답)
+LLM_BACKEND = os.getenv('LLM_BACKEND', 'gemini')
+LLM_STUB_LATENCY_MS = float(os.getenv('LLM_STUB_LATENCY_MS', 800))
+LLM_STUB_TTFT_MS = float(os.getenv('LLM_STUB_TTFT_MS', 200))
+# stub 호출 중 일시적 오류(TransientError)를 낼 비율 (0~1, 장애 상황 테스트용)
+LLM_STUB_FAILURE_RATE = float(os.getenv('LLM_STUB_FAILURE_RATE', 0))
+
+# LLM 호출 보호: 할당량에 맞춘 토큰 버킷(분당 요청 수 — 0이면 제한 없음, 순간 허용량, 최대 대기 초),
+# 일시적 오류 재시도(횟수, 지터 백오프 기준/상한 초), 호출 제한 시간(초),
+# 서킷 브레이커(연속 실패 수, 열린 뒤 재시도까지 초)
+LLM_RATE_LIMIT_RPM = float(os.getenv('LLM_RATE_LIMIT_RPM', 0))
+LLM_RATE_LIMIT_BURST = int(os.getenv('LLM_RATE_LIMIT_BURST', 10))
+LLM_RATE_LIMIT_MAX_WAIT = float(os.getenv('LLM_RATE_LIMIT_MAX_WAIT', 30.0))
+LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', 2))
+LLM_RETRY_BASE_DELAY = float(os.getenv('LLM_RETRY_BASE_DELAY', 0.5))
+LLM_RETRY_MAX_DELAY = float(os.getenv('LLM_RETRY_MAX_DELAY', 4.0))
+LLM_TIMEOUT = float(os.getenv('LLM_TIMEOUT', 30))
+LLM_BREAKER_FAILURES = int(os.getenv('LLM_BREAKER_FAILURES', 5))
+LLM_BREAKER_RESET = float(os.getenv('LLM_BREAKER_RESET', 30))
+
+# 비동기 API: 동시 Gemini 호출 상한, 검색용 스레드 수
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', 8))
+CHATBOT_WORKERS = int(os.getenv('CHATBOT_WORKERS', 8))
+
+# 1단계 캐시: 질문 임베딩 / 검색 결과 (정확히 같은 질문)
+QUERY_CACHE_SIZE = int(os.getenv('QUERY_CACHE_SIZE', 1024))
+QUERY_CACHE_TTL = float(os.getenv('QUERY_CACHE_TTL', 3600))
+# 2단계 캐시: 의미적으로 유사한 질문에 대한 응답 재사용
+RESPONSE_CACHE_SIZE = int(os.getenv('RESPONSE_CACHE_SIZE', 256))
+RESPONSE_CACHE_TTL = float(os.getenv('RESPONSE_CACHE_TTL', 86400))
+RESPONSE_CACHE_THRESHOLD = float(os.getenv('RESPONSE_CACHE_THRESHOLD', 0.95))
+
+# 프롬프트에 넣을 참고 사례의 최대 토큰 수 (n_results를 늘려도 프롬프트 크기 유지)
+PROMPT_CONTEXT_TOKEN_BUDGET = int(os.getenv('PROMPT_CONTEXT_TOKEN_BUDGET', 1200))
+# LLM 없이 바로 사례 기반 답변: off | auto (동시 LLM 호출이 LLM_MAX_CONCURRENCY에 도달했을 때) | always
+FAST_ANSWER_MODE = os.getenv('FAST_ANSWER_MODE', 'off')
+
+# 시작 직후 모델/인덱스를 미리 데우는 질문 (LLM은 호출하지 않음)
+WARMUP_QUERY = os.getenv('WARMUP_QUERY', '고등학생인데 진로를 아직 못 정했어요')
+
+# 프로세스당 한 번만 만드는 프롬프트 템플릿
+PROMPT_TEMPLATE = textwrap.dedent("""
+    당신은 전문 진로 상담사입니다. 학생의 질문에 대해 따뜻하고 구체적인 조언을 제공해주세요.
+    {history}
+    학생의 질문: {query}
+    {context}
+    위 사례를 참고하여 다음 형식으로 답변해주세요:
+    1. 상황 분석
+    2. 진로 방향 제안
+    3. 구체적 행동 계획
+
+    친근하고 도움이 되는 톤으로 작성해주세요.
+""").strip()
+
+
+def build_context(cases, token_budget=PROMPT_CONTEXT_TOKEN_BUDGET):
+    """순위대로 사례를 추가하되 토큰 예산을 넘으면 중단 (첫 사례는 잘라서라도 포함)"""
+    if not cases:
+        return ""
+
+    header = "\n참고할 유사 사례들:\n"
+    lines = []
+    remaining = token_budget
+    for i, case in enumerate(cases, 1):
+        # 청크 인덱스면 요약 전체 대신 검색된 청크만 넣어 토큰 절약
+        line = f"{i}. {case_text(case)}\n"
+        cost = estimate_tokens(line)
+        if cost > remaining:
+            if not lines:
+                lines.append(truncate_to_tokens(line.rstrip('\n'), remaining) + "\n")
+            break
+        lines.append(line)
+        remaining -= cost
+    return header + "".join(lines)
+
+
+def format_recommendations(recommendations):
+    """추천 직무 계열 목록을 답변 끝에 붙일 텍스트로 변환"""
+    if not recommendations:
+        return ""
+    lines = ["\n\n📌 비슷한 상담 사례에서 추천된 직무 계열"]
+    for i, recommendation in enumerate(recommendations, 1):
+        related = f" (함께 추천: {', '.join(recommendation['related'])})" if recommendation['related'] else ""
+        lines.append(f"{i}. {recommendation['name']}{related}")
+    return "\n".join(lines)
+
+
+# LLM 없이 답할 때 앞뒤에 붙이는 안내 문구
+DEGRADED_NOTICE = "지금은 AI 상담 답변을 만들 수 없어, 비슷한 고민을 한 학생들의 실제 상담 사례로 먼저 답변드립니다."
+FAST_ANSWER_NOTICE = "질문이 많아 비슷한 고민을 한 학생들의 실제 상담 사례로 빠르게 답변드립니다."
+DEGRADED_CLOSING = "\n\n잠시 후 다시 질문해 주시면 더 자세히 답변드릴게요."
+
+
+_genai = None
+
+
+def load_genai():
+    """google.generativeai를 처음 필요할 때 import하고 API 키를 설정"""
+    global _genai
+    if _genai is None:
+        import google.generativeai as genai
+        genai.configure(api_key=GOOGLE_API_KEY)
+        _genai = genai
+    return _genai
+
+
+class LLMBackend:
+    """LLM 호출 인터페이스: 프롬프트를 받아 응답 텍스트를 반환 (내용이 없으면 빈 문자열)"""
+
+    name = 'base'
+
+    def generate(self, prompt):
+        raise NotImplementedError
+
+    async def agenerate(self, prompt):
+        raise NotImplementedError
+
+    def stream(self, prompt):
+        """텍스트 조각을 생성되는 대로 yield (기본 구현: 한 번에 전체)"""
+        text = self.generate(prompt)
+        if text:
+            yield text
+
+    async def astream(self, prompt):
+        text = await self.agenerate(prompt)
+        if text:
+            yield text
+
+
+class GeminiBackend(LLMBackend):
+    """Google Gemini API"""
+
+    name = 'gemini'
+
+    def __init__(self, model_name=GEMINI_MODEL_NAME, temperature=GEMINI_TEMPERATURE,
+                 max_output_tokens=GEMINI_MAX_OUTPUT_TOKENS, timeout=LLM_TIMEOUT):
+        genai = load_genai()
+        # 응답이 없을 때 SDK 기본값(수 분)까지 기다리지 않도록 요청 제한 시간 지정
+        self.request_options = {'timeout': timeout} if timeout else None
+        # Gemini 모델 객체는 요청마다 만들지 않고 재사용
+        self.model = genai.GenerativeModel(
+            model_name,
+            generation_config=genai.types.GenerationConfig(
+                temperature=temperature,
+                max_output_tokens=max_output_tokens,
+            )
+        )
+
+    @staticmethod
+    def _text(response):
+        """응답(또는 스트리밍 청크)의 텍스트 (안전 필터 등으로 내용이 없으면 빈 문자열)"""
+        if response.candidates and response.candidates[0].content.parts:
+            return response.text
+        return ""
+
+    def generate(self, prompt):
+        return self._text(self.model.generate_content(prompt, request_options=self.request_options))
+
+    async def agenerate(self, prompt):
+        return self._text(await self.model.generate_content_async(prompt, request_options=self.request_options))
+
+    def stream(self, prompt):
+        for chunk in self.model.generate_content(prompt, stream=True, request_options=self.request_options):
+            text = self._text(chunk)
+            if text:
+                yield text
+
+    async def astream(self, prompt):
+        response = await self.model.generate_content_async(
+            prompt, stream=True, request_options=self.request_options
+        )
+        async for chunk in response:
+            text = self._text(chunk)
+            if text:
+                yield text
+
+
+class StubBackend(LLMBackend):
+    """네트워크 없이 쓰는 로컬 대역: 프롬프트로 결정되는 고정 응답을 설정된 지연 후 반환
+
+    latency_ms는 전체 응답 시간, ttft_ms는 스트리밍 시 첫 조각까지의 시간입니다.
+    failure_rate 비율의 호출은 곧바로 TransientError를 냅니다 (재시도/서킷 브레이커 테스트용).
+    """
+
+    name = 'stub'
+
+    def __init__(self, latency_ms=LLM_STUB_LATENCY_MS, ttft_ms=LLM_STUB_TTFT_MS, chunks=8,
+                 failure_rate=LLM_STUB_FAILURE_RATE):
+        self.latency = latency_ms / 1000
+        self.ttft = min(ttft_ms, latency_ms) / 1000
+        self.chunks = max(chunks, 1)
+        self.failure_rate = failure_rate
+
+    def _maybe_fail(self):
+        if self.failure_rate and random.random() < self.failure_rate:
+            raise TransientError("stub: simulated 503 Service Unavailable")
+
+    def reply(self, prompt):
+        digest = hashlib.sha1(prompt.encode('utf-8')).hexdigest()[:8]
+        return (
+            f"[stub {digest}]\n"
+            "1. 상황 분석: 질문과 참고 사례를 바탕으로 학생의 관심사를 정리했습니다.\n"
+            "2. 진로 방향 제안: 관심 분야와 관련된 학과와 직업을 살펴보세요.\n"
+            "3. 구체적 행동 계획: 관련 과목 공부, 체험 활동, 진로 상담을 이어가세요."
+        )
+
+    def _pieces(self, text):
+        size = math.ceil(len(text) / self.chunks)
+        return [text[i:i + size] for i in range(0, len(text), size)]
+
+    def _gap(self, pieces):
+        return (self.latency - self.ttft) / max(len(pieces) - 1, 1)
+
+    def generate(self, prompt):
+        self._maybe_fail()
+        time.sleep(self.latency)
+        return self.reply(prompt)
+
+    async def agenerate(self, prompt):
+        self._maybe_fail()
+        await asyncio.sleep(self.latency)
+        return self.reply(prompt)
+
+    def stream(self, prompt):
+        self._maybe_fail()
+        pieces = self._pieces(self.reply(prompt))
+        time.sleep(self.ttft)
+        for i, piece in enumerate(pieces):
+            if i:
+                time.sleep(self._gap(pieces))
+            yield piece
+
+    async def astream(self, prompt):
+        self._maybe_fail()
+        pieces = self._pieces(self.reply(prompt))
+        await asyncio.sleep(self.ttft)
+        for i, piece in enumerate(pieces):
+            if i:
+                await asyncio.sleep(self._gap(pieces))
+            yield piece
+
+
+class ResilientBackend(LLMBackend):
+    """LLM 호출 보호 계층: 토큰 버킷 속도 제한, 일시적 오류 지터 재시도, 서킷 브레이커
+
+    브레이커가 열려 있거나 속도 제한 대기가 LLM_RATE_LIMIT_MAX_WAIT보다 길면 백엔드를
+    호출하지 않고 CircuitOpenError / RateLimitedError를 바로 던지므로, 호출 측은 제한 시간을
+    기다리지 않고 곧바로 대체 답변을 만들 수 있습니다. 스트리밍은 첫 조각 전에 난 오류만
+    재시도합니다. 상태는 stats()로 확인합니다.
+    """
+
+    def __init__(self, backend, limiter=None, breaker=None, max_retries=LLM_MAX_RETRIES,
+                 retry_base_delay=LLM_RETRY_BASE_DELAY, retry_max_delay=LLM_RETRY_MAX_DELAY, timeout=LLM_TIMEOUT):
+        self.backend = backend
+        self.name = backend.name
+        self.limiter = limiter or TokenBucket(LLM_RATE_LIMIT_RPM, LLM_RATE_LIMIT_BURST, LLM_RATE_LIMIT_MAX_WAIT)
+        self.breaker = breaker or CircuitBreaker(LLM_BREAKER_FAILURES, LLM_BREAKER_RESET)
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.timeout = timeout
+        self.retries = 0
+
+    def _retry_delay(self, error, attempt, retryable=True):
+        """재시도할 대기 시간(초) 반환 (재시도하지 않으면 None)
+
+        브레이커에는 요청당 한 번, 재시도를 포기할 때만 실패를 기록합니다. 서비스 장애로 볼 수 있는
+        일시적 오류와 시간 초과만 세고, 잘못된 요청 같은 클라이언트 오류는 세지 않습니다.
+        """
+        if not retryable or attempt >= self.max_retries or not is_transient(error):
+            if is_transient(error) or isinstance(error, (TimeoutError, asyncio.TimeoutError)):
+                self.breaker.record_failure()
+            return None
+        self.retries += 1
+        LLM_RETRIES.inc()
+        delay = backoff_delay(attempt, self.retry_base_delay, self.retry_max_delay)
+        logger.warning(f"LLM 호출 실패 ({type(error).__name__}: {error}), {delay:.1f}초 후 재시도")
+        return delay
+
+    def _timed(self, awaitable):
+        return asyncio.wait_for(awaitable, self.timeout) if self.timeout else awaitable
+
+    def generate(self, prompt):
+        # 브레이커는 요청 시작 시 한 번만 확인 (half-open 시험 호출도 재시도까지 마칠 수 있게)
+        self.breaker.check()
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire()
+            try:
+                text = self.backend.generate(prompt)
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                continue
+            self.breaker.record_success()
+            return text
+
+    async def agenerate(self, prompt):
+        self.breaker.check()
+        for attempt in range(self.max_retries + 1):
+            await self.limiter.aacquire()
+            try:
+                text = await self._timed(self.backend.agenerate(prompt))
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            self.breaker.record_success()
+            return text
+
+    def stream(self, prompt):
+        self.breaker.check()
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire()
+            started = False
+            try:
+                for text in self.backend.stream(prompt):
+                    started = True
+                    yield text
+            except Exception as e:
+                # 이미 내보낸 조각은 되돌릴 수 없으므로 첫 조각 이후 오류는 재시도하지 않음
+                delay = self._retry_delay(e, attempt, retryable=not started)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                continue
+            self.breaker.record_success()
+            return
+
+    async def astream(self, prompt):
+        self.breaker.check()
+        for attempt in range(self.max_retries + 1):
+            await self.limiter.aacquire()
+            started = False
+            try:
+                chunks = self.backend.astream(prompt).__aiter__()
+                while True:
+                    try:
+                        # 제한 시간은 첫 조각까지만 적용
+                        text = await (chunks.__anext__() if started else self._timed(chunks.__anext__()))
+                    except StopAsyncIteration:
+                        break
+                    started = True
+                    yield text
+            except Exception as e:
+                delay = self._retry_delay(e, attempt, retryable=not started)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            self.breaker.record_success()
+            return
+
+    def stats(self):
+        """브레이커 상태, 재시도 수, 속도 제한 통계"""
+        return {
+            'backend': self.name,
+            **self.breaker.stats(),
+            'retries': self.retries,
+            'rate_limit': self.limiter.stats()
+        }
+
+
+LLM_BACKENDS = {
+    'gemini': GeminiBackend,
+    'stub': StubBackend,
+}
+
+
+def get_llm_backend(name=LLM_BACKEND):
+    """이름으로 LLM 백엔드 생성"""
+    try:
+        backend_class = LLM_BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown LLM backend: {name} (choose from {', '.join(LLM_BACKENDS)})")
+    return backend_class()
+
+
+def normalize_query(query):
+    """캐시 키용 질문 정규화 (공백 정리)"""
+    return ' '.join(query.split())
+
+
+def filters_key(filters):
+    """메타데이터 필터를 캐시 키로 변환"""
+    return tuple(sorted(filters.items())) if filters else None
+
 class CareerChatbot:
-    def __init__(self, db_path=None):
+    def __init__(self, db_path=None, llm_backend=None, vector_backend=None):
+        """
+        Args:
+            db_path: 상담 원문 SQLite 경로
+            llm_backend: LLMBackend 인스턴스 또는 백엔드 이름 (기본값: LLM_BACKEND 환경변수)
+            vector_backend: 'chroma' 또는 'numpy' (기본값: VECTOR_BACKEND 환경변수)
+        """
         self.db_path = db_path or Path(__file__).parent / "career_guidance.db"
-        self.chroma_path = Path(__file__).parent / "chroma_db"
+        self.chroma_path = CHROMA_PATH
+        self.vector_backend = vector_backend or VECTOR_BACKEND
         
-        # ChromaDB 존재 여부 확인
-        if not self.chroma_path.exists():
+        # 벡터 인덱스 존재 여부 확인
+        if self.vector_backend == 'numpy':
+            if not NumpyVectorIndex.exists(VECTOR_INDEX_PATH):
+                raise FileNotFoundError(
+                    "Vector index not found. Please run create_embeddings.py --backend numpy first."
+                )
+        elif not self.chroma_path.exists():
             raise FileNotFoundError(
                 "ChromaDB embeddings not found. Please run create_embeddings.py first to create the embeddings."
             )
         
+        # 시작 단계별 소요 시간(ms)
+        self.startup_timings = {}
+
+        # 질문 임베딩을 직접 계산해 캐시하고 검색에 재사용
+        t0 = time.perf_counter()
+        self.embedding_function = get_embedding_function()
+        self.startup_timings['model_load'] = (time.perf_counter() - t0) * 1000
+        
+        t0 = time.perf_counter()
+        self.collection = self._open_collection()
+        # 다른 모델로 만든 인덱스에 질문 임베딩을 던지면 검색 결과가 무의미하므로 거부
+        check_embedding_model(self.collection)
+
+        # 상담 요약/하이라이트 원문 조회용 읽기 전용 SQLite (serving 프로필)
+        self.case_store = CaseStore(self.db_path) if Path(self.db_path).exists() else None
+
+        self.startup_timings['collection_open'] = (time.perf_counter() - t0) * 1000
+
+        # 후보를 넉넉히 가져온 뒤 cross-encoder로 재정렬 (RERANKER=none이면 사용 안 함)
+        t0 = time.perf_counter()
+        self.reranker = get_reranker()
+        self.startup_timings['reranker_load'] = (time.perf_counter() - t0) * 1000
+
+        # 벡터 검색(Chroma)과 키워드 검색(FTS5)을 동시에 수행하는 하이브리드 검색기
+        self.retriever = HybridRetriever(self.collection, self.case_store, reranker=self.reranker)
+
+        # LLM 백엔드 (Gemini 또는 로컬 stub)
+        t0 = time.perf_counter()
+        backend = llm_backend if isinstance(llm_backend, LLMBackend) else get_llm_backend(llm_backend or LLM_BACKEND)
+        # 속도 제한 + 재시도 + 서킷 브레이커로 감싸 할당량 소진/장애 시 바로 사례 기반 답변
+        self.llm = backend if isinstance(backend, ResilientBackend) else ResilientBackend(backend)
+        self.startup_timings['llm_client'] = (time.perf_counter() - t0) * 1000
+        self.last_timings = {}
+
+        # 전문가 추천 직무 계열 (미리 계산한 중심 벡터 + 동시 추천 행렬, LLM 호출 없음)
+        t0 = time.perf_counter()
+        self.recommender = self._load_recommender()
+        self.startup_timings['recommender_load'] = (time.perf_counter() - t0) * 1000
+
+        # agenerate_response용: 검색 스레드 풀, LLM 동시 호출 제한
+        self.executor = ThreadPoolExecutor(max_workers=CHATBOT_WORKERS, thread_name_prefix='chatbot')
+        self._llm_semaphore = None
+        # 진행 중인 LLM 호출 수 (동기/비동기 경로가 함께 씀, FAST_ANSWER_MODE=auto 판단 기준)
+        self.llm_in_flight = 0
+        self._in_flight_lock = threading.Lock()
+
+        self.embedding_cache = LRUCache(maxsize=QUERY_CACHE_SIZE, ttl=QUERY_CACHE_TTL)
+        self.retrieval_cache = LRUCache(maxsize=QUERY_CACHE_SIZE, ttl=QUERY_CACHE_TTL)
+        self.response_cache = SemanticCache(
+            threshold=RESPONSE_CACHE_THRESHOLD, maxsize=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL
+        )
+        # 세션별 대화 기록 (세션 수와 세션당 토큰 수 모두 상한, 오래된 대화는 요약)
+        self.conversations = ConversationStore()
+        # /metrics 내보내기 직전에 캐시 적중률, 진행 중인 LLM 호출 수 등을 갱신
+        REGISTRY.add_collector(self.collect_metrics)
+
+    def _open_collection(self):
+        """벡터 인덱스 열기: ChromaDB 컬렉션 또는 메모리 매핑된 NumPy 인덱스 (같은 query API)"""
+        if self.vector_backend == 'numpy':
+            return NumpyVectorIndex(VECTOR_INDEX_PATH, embedding_function=self.embedding_function)
+
         # ChromaDB 클라이언트 연결
+        import chromadb
         self.chroma_client = chromadb.PersistentClient(path=str(self.chroma_path))
-        
         try:
-            self.collection = self.chroma_client.get_collection("counselling_data")
+            return self.chroma_client.get_collection(
+                COLLECTION_NAME, embedding_function=self.embedding_function
+            )
         except:
             raise ValueError(
                 "Counselling data collection not found in ChromaDB. Please run create_embeddings.py first."
             )
 
-    def get_similar_cases(self, query, n_results=3):
-        # 질문과 유사한 사례 검색
-        results = self.collection.query(
-            query_texts=[query],
-            n_results=n_results
+    @property
+    def fallback(self):
+        """LLM 없이 답할 때 쓰는 키워드 색인 기반 로컬 답변기 (GUI와 공유, 처음 쓸 때 로드)"""
+        return get_fallback_responder()
+
+    @staticmethod
+    def _load_recommender():
+        """직무 추천기 로드 (없거나 다른 임베딩 모델로 만들었으면 None)"""
+        if JOB_RECOMMENDATIONS <= 0 or not JobRecommender.exists(JOB_RECOMMENDER_PATH):
+            return None
+        recommender = JobRecommender.load(JOB_RECOMMENDER_PATH)
+        built_with = recommender.metadata.get('embedding_model')
+        if built_with != EMBEDDING_MODEL:
+            logger.warning(
+                f"Job recommender was built with {built_with}, not {EMBEDDING_MODEL}; "
+                f"run python -m app.recommender to rebuild it. Recommendations are disabled."
+            )
+            return None
+        return recommender
+
+    def recommend_jobs(self, query, top_k=JOB_RECOMMENDATIONS, query_embedding=None):
+        """질문과 가까운 직무 계열 추천 (추천기가 없으면 빈 목록)
+
+        Returns:
+            list: {'job_category_idx', 'name', 'score', 'related'} 목록 (점수 순)
+        """
+        if self.recommender is None or top_k <= 0:
+            return []
+        if query_embedding is None:
+            query_embedding = self.embed_query(query)
+        return self.recommender.recommend(query_embedding, top_k=top_k)
+
+    def _recommendation_text(self, query_embedding, timings):
+        """답변 끝에 붙일 추천 직무 계열 텍스트 (소요 시간은 timings['recommend'])"""
+        if self.recommender is None:
+            return ""
+        t0 = time.perf_counter()
+        text = format_recommendations(self.recommend_jobs(None, query_embedding=query_embedding))
+        timings['recommend'] = (time.perf_counter() - t0) * 1000
+        return text
+
+    def embed_query(self, query):
+        """질문 임베딩 (LRU/TTL 캐시 사용)"""
+        key = normalize_query(query)
+        embedding = self.embedding_cache.get(key)
+        if embedding is None:
+            embedding = np.asarray(self.embedding_function([key])[0], dtype=np.float32)
+            self.embedding_cache.set(key, embedding)
+        return embedding
+
+    def embed_queries(self, queries):
+        """여러 질문을 한 번에 임베딩 (캐시에 없는 질문만 모아서 계산)"""
+        keys = [normalize_query(query) for query in queries]
+        embeddings = {key: self.embedding_cache.get(key) for key in dict.fromkeys(keys)}
+        missing = [key for key, embedding in embeddings.items() if embedding is None]
+        if missing:
+            for key, embedding in zip(missing, self.embedding_function(missing)):
+                embedding = np.asarray(embedding, dtype=np.float32)
+                self.embedding_cache.set(key, embedding)
+                embeddings[key] = embedding
+        return [embeddings[key] for key in keys]
+
+    def get_similar_cases_many(self, queries, n_results=3, filters=None, candidates=RETRIEVAL_CANDIDATES):
+        """여러 질문의 유사 사례를 한 번의 배치 임베딩과 한 번의 Chroma 쿼리로 검색"""
+        return self.retriever.retrieve_many(
+            queries, n_results=n_results, candidates=candidates, filters=filters,
+            query_embeddings=self.embed_queries(queries)
+        )
+
+    def warm_up(self, query=WARMUP_QUERY):
+        """첫 사용자 요청이 느리지 않도록 임베딩 모델, Chroma 인덱스, SQLite를 미리 한 번 사용
+
+        검색까지만 실행하고 LLM은 호출하지 않습니다. 결과는 캐시에 남기지 않습니다.
+        """
+        t0 = time.perf_counter()
+        self.retriever.retrieve(query, query_embedding=self.embedding_function([query])[0])
+        self.startup_timings['first_query'] = (time.perf_counter() - t0) * 1000
+        return self.startup_timings['first_query']
+
+    def cache_stats(self):
+        """캐시별 적중/미적중 통계 (reranker 사용 시 점수 캐시 적중률과 지연 시간 포함)"""
+        stats = {
+            'embedding': self.embedding_cache.stats(),
+            'retrieval': self.retrieval_cache.stats(),
+            'response': self.response_cache.stats()
+        }
+        if self.reranker is not None:
+            stats['rerank'] = self.reranker.stats()
+        stats['conversation'] = self.conversations.stats()
+        if isinstance(self.llm, ResilientBackend):
+            stats['llm'] = self.llm.stats()
+        return stats
+
+    def collect_metrics(self):
+        """캐시/세션/LLM 상태를 Prometheus gauge로 갱신"""
+        for name, stats in self.cache_stats().items():
+            if name == 'conversation':
+                CONVERSATION_SESSIONS.set(stats['sessions'])
+                continue
+            if name == 'llm':
+                LLM_CIRCUIT_STATE.set(CIRCUIT_STATES[stats['state']])
+                continue
+            CACHE_HIT_RATIO.set(stats.get('hit_rate', stats.get('cache_hit_rate', 0.0)), cache=name)
+            CACHE_ENTRIES.set(stats.get('size', stats.get('cache_size', 0)), cache=name)
+        LLM_IN_FLIGHT.set(self.llm_in_flight)
+
+    def get_session(self, session_id, history=None):
+        """세션 ID의 대화 상태 (history가 주어지면 비었을 때 초기화, 세션이 사라졌으면 복원)
+
+        Args:
+            session_id: 대화를 구분하는 키 (예: Gradio session_hash)
+            history: 클라이언트가 가진 (질문, 답변) 목록
+        """
+        return self.conversations.get(session_id, history)
+
+    def _session(self, session_id):
+        """세션 ID가 있으면 그 대화 상태, 없으면 None (이전 대화 없는 단발 요청)"""
+        return None if session_id is None else self.conversations.get(session_id)
+
+    def get_similar_cases(self, query, n_results=3, filters=None, candidates=RETRIEVAL_CANDIDATES,
+                          query_embedding=None, timings=None):
+        """질문과 유사한 상담 사례 검색
+
+        Args:
+            query (str): 학생 질문
+            n_results (int): 반환할 사례(상담 세션) 수
+            filters (dict): 메타데이터 필터 (예: {'school_level': '고등'})
+            candidates (int): 검색기별로 가져올 후보 수
+            query_embedding: 이미 계산한 질문 임베딩 (없으면 embed_query로 계산)
+            timings (dict): 검색 단계별 소요 시간(ms)을 기록할 dict (캐시 적중 시 비어 있음)
+
+        Returns:
+            list: 상담 세션 단위로 묶인 사례 목록 (단계별 지연 시간은 retriever.last_timings)
+        """
+        key = (normalize_query(query), n_results, candidates, filters_key(filters))
+        cases = self.retrieval_cache.get(key)
+        if cases is None:
+            cases = self.retriever.retrieve(
+                query, n_results=n_results, candidates=candidates, filters=filters,
+                query_embedding=query_embedding if query_embedding is not None else self.embed_query(query),
+                timings=timings
+            )
+            self.retrieval_cache.set(key, cases)
+        return cases
+
+    def build_prompt(self, query, cases, token_budget=PROMPT_CONTEXT_TOKEN_BUDGET, history=""):
+        """미리 만든 템플릿에 (이전 대화,) 질문과 (토큰 예산 내) 참고 사례를 채워 프롬프트 생성"""
+        return PROMPT_TEMPLATE.format(history=history, query=query, context=build_context(cases, token_budget))
+
+    def _prepare_request(self, query, filters, n_results, timings, session=None):
+        """LLM 호출 전 단계: 응답 캐시 조회, 유사 사례 검색, 프롬프트 생성
+
+        이어지는 대화에서는 응답 캐시를 쓰지 않고, 질문이 같은 주제에 머물면
+        (주제 임베딩과의 유사도 >= TOPIC_REUSE_THRESHOLD) 직전 검색 결과를 재사용합니다.
+
+        Returns:
+            tuple: (질문 임베딩, 캐시된 응답 또는 None, 프롬프트 또는 None, 유사 사례 또는 None)
+        """
+        start = time.perf_counter()
+
+        # 의미적으로 거의 같은 질문에 대한 답변이 있으면 재사용 (대화 첫 질문만)
+        query_embedding = self.embed_query(query)
+        timings['embed'] = (time.perf_counter() - start) * 1000
+        if session is None or session.is_empty:
+            cached_response = self.response_cache.lookup(query_embedding, scope=filters_key(filters))
+            if cached_response is not None:
+                timings['setup'] = (time.perf_counter() - start) * 1000
+                timings['cached'] = True
+                return query_embedding, cached_response, None, None
+
+        # 먼저 유사 사례 검색 (같은 주제의 후속 질문이면 세션에 남은 사례 재사용)
+        t0 = time.perf_counter()
+        scope = (filters_key(filters), n_results)
+        similar_cases = None if session is None else self.conversations.reuse_cases(session, query_embedding, scope)
+        if similar_cases is not None:
+            timings['topic_reuse'] = True
+        else:
+            retrieval_timings = {}
+            similar_cases = self.get_similar_cases(
+                query, n_results=n_results, filters=filters, query_embedding=query_embedding,
+                timings=retrieval_timings
+            )
+            if 'rerank' in retrieval_timings:
+                timings['rerank'] = retrieval_timings['rerank']
+            # 검색 내부 단계 (벡터, 키워드, 융합, 원문 조회)도 지표로 남김
+            for stage in ('vector', 'lexical', 'fusion', 'details'):
+                if stage in retrieval_timings:
+                    timings[f'retrieval_{stage}'] = retrieval_timings[stage]
+            if session is not None:
+                session.set_topic(query_embedding, scope, similar_cases)
+        timings['retrieval'] = (time.perf_counter() - t0) * 1000
+
+        # 유사 사례와 이전 대화를 문맥으로 활용
+        t0 = time.perf_counter()
+        prompt = self.build_prompt(query, similar_cases, history=session.render() if session else "")
+        timings['prompt'] = (time.perf_counter() - t0) * 1000
+        timings['setup'] = (time.perf_counter() - start) * 1000
+        return query_embedding, None, prompt, similar_cases
+
+    @staticmethod
+    def _log_timings(timings):
+        """단계별 소요 시간 로그 (스트리밍이면 첫 토큰까지의 시간 포함)"""
+        ttft = f", 첫 토큰 {timings['ttft']:.0f}ms" if 'ttft' in timings else ""
+        rerank = f" (재정렬 {timings['rerank']:.0f}ms)" if 'rerank' in timings else ""
+        if timings.get('topic_reuse'):
+            rerank = " (같은 주제: 이전 사례 재사용)"
+        logger.info(
+            f"응답 생성 시간: setup {timings['setup']:.0f}ms "
+            f"(임베딩 {timings['embed']:.0f}ms, 검색 {timings['retrieval']:.0f}ms{rerank}, "
+            f"프롬프트 {timings['prompt']:.1f}ms), generation {timings['generation']:.0f}ms{ttft}"
+        )
+
+    def _remember(self, text, query_embedding, filters, query, session):
+        """성공한 응답을 캐시하고 (대화 첫 질문만) 세션 기록에 추가"""
+        if session is None or session.is_empty:
+            self.response_cache.add(query_embedding, text, scope=filters_key(filters))
+        if session is not None:
+            session.add_turn(query, text)
+
+    def _record(self, timings, outcome, request_start, error=None, session=None, **attributes):
+        """요청 지표와 추적 기록 (단계별 시간 히스토그램, 결과별 요청 수, 오류 수, JSON trace 한 줄)
+
+        Returns:
+            str: 추적 ID (오류 안내 문구와 trace 로그를 연결할 때 사용)
+        """
+        timings['total'] = (time.perf_counter() - request_start) * 1000
+        REQUESTS.inc(outcome=outcome)
+        observe_timings(timings)
+        if timings.get('topic_reuse'):
+            TOPIC_REUSES.inc()
+        attributes.update(outcome=outcome, session=session is not None)
+        if error is not None:
+            # 임베딩/검색/프롬프트 단계가 끝나기 전이면 setup, 아니면 LLM 호출 중 오류
+            stage = 'generation' if 'setup' in timings else 'setup'
+            ERRORS.inc(stage=stage, error=type(error).__name__)
+            attributes.update(error_stage=stage, error=f"{type(error).__name__}: {error}")
+        return record_trace('chat', timings, **attributes)
+
+    def _error_response(self, error, timings, request_start, session=None):
+        """오류를 기록하고 추적 ID가 붙은 안내 문구 반환"""
+        trace_id = self._record(timings, 'error', request_start, error=error, session=session)
+        logger.error(f"응답 생성 중 오류 (trace {trace_id}): {error}", exc_info=error)
+        return f"응답 생성 중 오류가 발생했습니다: {str(error)} (추적 ID: {trace_id})"
+
+    def _check_llm(self):
+        """LLM을 부르지 않고 바로 사례 기반 답변으로 갈지 확인
+
+        빠른 답변 모드(FAST_ANSWER_MODE)면 OverloadedError, 서킷 브레이커가 열려 있으면
+        LLM 동시 호출 대기열에 들어가지 않고 바로 CircuitOpenError를 던집니다.
+        """
+        if FAST_ANSWER_MODE == 'always' or (
+            FAST_ANSWER_MODE == 'auto' and self.llm_in_flight >= LLM_MAX_CONCURRENCY
+        ):
+            raise OverloadedError(self.llm_in_flight)
+        breaker = getattr(self.llm, 'breaker', None)
+        if breaker is not None and breaker.retry_after() > 0:
+            raise CircuitOpenError(breaker.retry_after())
+
+    def _degraded_response(self, error, query, cases, query_embedding, timings, request_start, session=None):
+        """LLM을 건너뛰거나 호출이 실패했을 때 검색된 사례로 바로 만드는 답변 (응답 캐시/대화 기록에는 넣지 않음)
+
+        검색된 학생들의 전문가 의견과 추천 직무 계열로 상황 분석 / 진로 방향 / 행동 계획을
+        구성합니다 (app/fallback.py).
+        """
+        if isinstance(error, OverloadedError):
+            reason = 'fast_mode'
+        elif isinstance(error, CircuitOpenError):
+            reason = 'circuit_open'
+        elif isinstance(error, RateLimitedError):
+            reason = 'rate_limited'
+        else:
+            reason = 'llm_error'
+        FALLBACKS.inc(reason=reason)
+
+        t0 = time.perf_counter()
+        jobs = [recommendation['name'] for recommendation in self.recommend_jobs(query, query_embedding=query_embedding)]
+        text = self.fallback.answer(
+            query,
+            student_ids=[case['metadata'].get('student_idx') for case in cases or []],
+            jobs=jobs,
+            notice=FAST_ANSWER_NOTICE if reason == 'fast_mode' else DEGRADED_NOTICE
         )
-        return results
+        if reason != 'fast_mode':
+            text += DEGRADED_CLOSING
+        timings['fallback'] = (time.perf_counter() - t0) * 1000
 
-    def generate_response(self, query):
-        """AI 기반 응답 생성"""
+        trace_id = self._record(
+            timings, 'degraded', request_start, error=error if reason == 'llm_error' else None,
+            session=session, reason=reason
+        )
+        log = logger.info if reason == 'fast_mode' else logger.warning
+        log(f"LLM 없이 사례 기반 답변 ({reason}, trace {trace_id}): {error}")
+        return text
+
+    def _finish_response(self, text, query_embedding, filters, timings, request_start, query=None, session=None):
+        """추천 직무 계열을 덧붙이고 시간 기록 후 성공한 응답만 캐시 (빈 응답이면 안내 문구 반환)"""
+        if text:
+            text += self._recommendation_text(query_embedding, timings)
+        self._log_timings(timings)
+        self._record(timings, 'answered' if text else 'empty', request_start, session=session)
+        if text:
+            self._remember(text, query_embedding, filters, query, session)
+            return text
+        return "죄송합니다. 응답을 생성할 수 없습니다. 다시 시도해주세요."
+
+    def _cached_response(self, cached_response, query_embedding, filters, timings, request_start, query, session):
+        """응답 캐시 적중 처리: 기록 후 세션에 추가"""
+        self._record(timings, 'cached', request_start, session=session)
+        self._remember(cached_response, query_embedding, filters, query, session)
+        return cached_response
+
+    def generate_response(self, query, filters=None, n_results=3, timings=None, session_id=None):
+        """AI 기반 응답 생성
+
+        단계별 소요 시간(ms)은 self.last_timings(또는 전달한 timings dict)에 기록됩니다.
+        setup = 캐시 조회 + 임베딩 + 유사 사례 검색 + 프롬프트 생성, generation = LLM 호출
+        session_id를 주면 같은 세션의 이전 대화를 이어서 답변합니다.
+        """
+        request_start = time.perf_counter()
+        timings = {} if timings is None else timings
+        self.last_timings = timings
+        session = None
+        try:
+            session = self._session(session_id)
+
+            query_embedding, cached_response, prompt, cases = self._prepare_request(
+                query, filters, n_results, timings, session
+            )
+            if cached_response is not None:
+                return self._cached_response(
+                    cached_response, query_embedding, filters, timings, request_start, query, session
+                )
+
+            t0 = time.perf_counter()
+            try:
+                self._check_llm()
+                with self.count_llm_call():
+                    text = self.llm.generate(prompt)
+            except Exception as e:
+                timings['generation'] = (time.perf_counter() - t0) * 1000
+                return self._degraded_response(e, query, cases, query_embedding, timings, request_start, session)
+            timings['generation'] = (time.perf_counter() - t0) * 1000
+
+            return self._finish_response(text, query_embedding, filters, timings, request_start, query, session)
+                
+        except Exception as e:
+            return self._error_response(e, timings, request_start, session)
+
+    @contextmanager
+    def count_llm_call(self):
+        """LLM 호출 하나를 llm_in_flight에 집계 (스레드와 이벤트 루프 어디서 불러도 안전)"""
+        with self._in_flight_lock:
+            self.llm_in_flight += 1
+        try:
+            yield
+        finally:
+            with self._in_flight_lock:
+                self.llm_in_flight -= 1
+
+    def _get_llm_semaphore(self):
+        """동시에 진행 중인 LLM 호출 수를 제한하는 세마포어 (이벤트 루프 안에서 생성)"""
+        if self._llm_semaphore is None:
+            self._llm_semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+        return self._llm_semaphore
+
+    async def agenerate_response(self, query, filters=None, n_results=3, timings=None, session_id=None):
+        """generate_response의 비동기 버전
+
+        검색(임베딩, Chroma, SQLite)은 스레드 풀에서 실행하고, LLM 호출은
+        비동기로 기다립니다. 동시 LLM 호출 수는 LLM_MAX_CONCURRENCY로 제한됩니다.
+        동시에 여러 요청을 보낼 때는 요청별 timings dict를 넘겨 시간을 받으세요.
+        """
+        request_start = time.perf_counter()
+        timings = {} if timings is None else timings
+        self.last_timings = timings
+        session = None
+        try:
+            session = self._session(session_id)
+            loop = asyncio.get_running_loop()
+
+            query_embedding, cached_response, prompt, cases = await loop.run_in_executor(
+                self.executor, self._prepare_request, query, filters, n_results, timings, session
+            )
+            if cached_response is not None:
+                return self._cached_response(
+                    cached_response, query_embedding, filters, timings, request_start, query, session
+                )
+
+            t0 = time.perf_counter()
+            try:
+                self._check_llm()
+                async with self._get_llm_semaphore():
+                    with self.count_llm_call():
+                        t0 = time.perf_counter()
+                        text = await self.llm.agenerate(prompt)
+                        timings['generation'] = (time.perf_counter() - t0) * 1000
+            except Exception as e:
+                timings['generation'] = (time.perf_counter() - t0) * 1000
+                return self._degraded_response(e, query, cases, query_embedding, timings, request_start, session)
+
+            return self._finish_response(text, query_embedding, filters, timings, request_start, query, session)
+
+        except Exception as e:
+            return self._error_response(e, timings, request_start, session)
+
+    def _finish_stream(self, text, query_embedding, filters, timings, start, request_start, query=None, session=None):
+        """스트리밍 종료 처리: 시간 기록, 완성된 응답 캐시 및 세션 기록"""
+        timings['generation'] = (time.perf_counter() - start) * 1000
+        self._log_timings(timings)
+        self._record(timings, 'answered' if text else 'empty', request_start, session=session)
+        if text:
+            self._remember(text, query_embedding, filters, query, session)
+
+    def stream_response(self, query, filters=None, n_results=3, timings=None, session_id=None):
+        """generate_response의 스트리밍 버전: LLM이 생성하는 대로 텍스트 조각을 yield
+
+        self.last_timings['ttft']에 첫 토큰까지의 시간(ms, 요청 시작 기준)이 기록됩니다.
+        """
+        request_start = time.perf_counter()
+        timings = {} if timings is None else timings
+        self.last_timings = timings
+        session = None
         try:
-            # 먼저 유사 사례 검색
-            similar_cases = self.get_similar_cases(query)
-            
-            model = genai.GenerativeModel(
-                GEMINI_MODEL_NAME,
-                generation_config=genai.types.GenerationConfig(
-                    temperature=GEMINI_TEMPERATURE,
-                    max_output_tokens=GEMINI_MAX_OUTPUT_TOKENS,
+            session = self._session(session_id)
+            query_embedding, cached_response, prompt, cases = self._prepare_request(
+                query, filters, n_results, timings, session
+            )
+            if cached_response is not None:
+                timings['ttft'] = (time.perf_counter() - request_start) * 1000
+                yield self._cached_response(
+                    cached_response, query_embedding, filters, timings, request_start, query, session
                 )
+                return
+
+            t0 = time.perf_counter()
+            parts = []
+            try:
+                self._check_llm()
+                with self.count_llm_call():
+                    for text in self.llm.stream(prompt):
+                        if not parts:
+                            timings['ttft'] = (time.perf_counter() - request_start) * 1000
+                        parts.append(text)
+                        yield text
+            except Exception as e:
+                # 첫 조각 전에 실패하면 사례 기반 답변, 이미 일부를 보냈으면 오류 안내
+                if parts:
+                    raise
+                timings['generation'] = (time.perf_counter() - t0) * 1000
+                yield self._degraded_response(e, query, cases, query_embedding, timings, request_start, session)
+                return
+
+            if not parts:
+                yield "죄송합니다. 응답을 생성할 수 없습니다. 다시 시도해주세요."
+            else:
+                recommendations = self._recommendation_text(query_embedding, timings)
+                if recommendations:
+                    parts.append(recommendations)
+                    yield recommendations
+            self._finish_stream("".join(parts), query_embedding, filters, timings, t0, request_start, query, session)
+
+        except Exception as e:
+            yield self._error_response(e, timings, request_start, session)
+
+    async def astream_response(self, query, filters=None, n_results=3, timings=None, session_id=None):
+        """stream_response의 비동기 버전 (GUI에서 사용, LLM 동시 호출 수 제한 적용)"""
+        request_start = time.perf_counter()
+        timings = {} if timings is None else timings
+        self.last_timings = timings
+        session = None
+        try:
+            session = self._session(session_id)
+            loop = asyncio.get_running_loop()
+            query_embedding, cached_response, prompt, cases = await loop.run_in_executor(
+                self.executor, self._prepare_request, query, filters, n_results, timings, session
             )
-            
-            # 유사 사례를 문맥으로 활용
-            context = ""
-            if similar_cases and similar_cases['documents'] and similar_cases['documents'][0]:
-                context = "\n참고할 유사 사례들:\n"
-                for i, doc in enumerate(similar_cases['documents'][0][:3], 1):
-                    context += f"{i}. {doc}\n"
-            
-            prompt = f"""
-            당신은 전문 진로 상담사입니다. 학생의 질문에 대해 따뜻하고 구체적인 조언을 제공해주세요.
-            
-            학생의 질문: {query}
-            
-            {context}
-            
-            위 사례를 참고하여 다음 형식으로 답변해주세요:
-            1. 상황 분석
-            2. 진로 방향 제안
-            3. 구체적 행동 계획
-            
-            친근하고 도움이 되는 톤으로 작성해주세요.
-            """
-            
-            response = model.generate_content(prompt)
-            
-            if response.candidates and response.candidates[0].content.parts:
-                return response.text
+            if cached_response is not None:
+                timings['ttft'] = (time.perf_counter() - request_start) * 1000
+                yield self._cached_response(
+                    cached_response, query_embedding, filters, timings, request_start, query, session
+                )
+                return
+
+            parts = []
+            t0 = time.perf_counter()
+            try:
+                self._check_llm()
+                async with self._get_llm_semaphore():
+                    with self.count_llm_call():
+                        t0 = time.perf_counter()
+                        async for text in self.llm.astream(prompt):
+                            if not parts:
+                                timings['ttft'] = (time.perf_counter() - request_start) * 1000
+                            parts.append(text)
+                            yield text
+            except Exception as e:
+                # 첫 조각 전에 실패하면 사례 기반 답변, 이미 일부를 보냈으면 오류 안내
+                if parts:
+                    raise
+                timings['generation'] = (time.perf_counter() - t0) * 1000
+                yield self._degraded_response(e, query, cases, query_embedding, timings, request_start, session)
+                return
+
+            if not parts:
+                yield "죄송합니다. 응답을 생성할 수 없습니다. 다시 시도해주세요."
             else:
-                return "죄송합니다. 응답을 생성할 수 없습니다. 다시 시도해주세요."
-                
+                recommendations = self._recommendation_text(query_embedding, timings)
+                if recommendations:
+                    parts.append(recommendations)
+                    yield recommendations
+            self._finish_stream("".join(parts), query_embedding, filters, timings, t0, request_start, query, session)
+
         except Exception as e:
-            return f"응답 생성 중 오류가 발생했습니다: {str(e)}"
+            yield self._error_response(e, timings, request_start, session)
 
 def main():
     chatbot = CareerChatbot()
@@ -96,10 +1053,13 @@ def main():
     # 테스트 질문
     test_query = "저는 고등학생인데 경제에 관심이 많고 한국은행에서 일하고 싶어요. 어떤 준비를 해야 할까요?"
     
-    # 답변 생성 (내부에서 유사 사례 검색 자동 실행)
-    response = chatbot.generate_response(test_query)
+    # 답변 생성 (내부에서 유사 사례 검색 자동 실행), 생성되는 대로 출력
     print("=== 챗봇 답변 ===")
-    print(response)
+    for text in chatbot.stream_response(test_query):
+        print(text, end="", flush=True)
+    print()
+    if 'ttft' in chatbot.last_timings:
+        print(f"(첫 토큰까지 {chatbot.last_timings['ttft']:.0f}ms)")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,106 @@
+"""
+Read-only access to the counselling sessions stored in SQLite.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from sqlalchemy import select, tuple_
+
+from app.engine import SQLITE_POOL_SIZE, create_sqlite_engine
+from app.models import CounsellingSession, Highlight, Student
+from app.search import fts_table_exists, search_counselling
+
+logger = logging.getLogger(__name__)
+
+CaseKey = Tuple[str, int]  # (student_idx, counseling_idx)
+
+
+class CaseStore:
+    """Fetch session summaries and highlights through the serving engine profile."""
+
+    def __init__(self, db_path: Union[str, Path], max_workers: int = SQLITE_POOL_SIZE):
+        self.engine = create_sqlite_engine(db_path, profile='serving')
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='case-store')
+        self.fts_available = self._ensure_fts(db_path)
+
+    def _ensure_fts(self, db_path: Union[str, Path]) -> bool:
+        """Check once whether the database has the FTS index.
+
+        The serving engine is read-only, so a missing index is never built
+        here; lexical search is disabled with a single warning instead of
+        failing on every query.
+        """
+        with self.engine.connect() as conn:
+            if fts_table_exists(conn):
+                return True
+        logger.warning(
+            f"FTS index missing in {db_path}; lexical search disabled. "
+            f"Run python -m app.search --db {db_path} to build it."
+        )
+        return False
+
+    def _fetch_summaries(self, keys: List[CaseKey]) -> Dict[CaseKey, dict]:
+        query = (
+            select(Student.student_idx, CounsellingSession.counseling_idx,
+                   Student.school_level, CounsellingSession.summary)
+            .join(CounsellingSession.student)
+            .where(tuple_(Student.student_idx, CounsellingSession.counseling_idx).in_(keys))
+        )
+        with self.engine.connect() as conn:
+            return {
+                (row.student_idx, row.counseling_idx): {
+                    'student_idx': row.student_idx,
+                    'counseling_idx': row.counseling_idx,
+                    'school_level': row.school_level,
+                    'summary': row.summary,
+                    'highlights': []
+                }
+                for row in conn.execute(query)
+            }
+
+    def _fetch_highlights(self, keys: List[CaseKey]) -> Dict[CaseKey, List[str]]:
+        query = (
+            select(Student.student_idx, CounsellingSession.counseling_idx, Highlight.content)
+            .join(Highlight.session)
+            .join(CounsellingSession.student)
+            .where(tuple_(Student.student_idx, CounsellingSession.counseling_idx).in_(keys))
+            .where(Highlight.content != '')
+            .order_by(Highlight.start_idx)
+        )
+        highlights = {}
+        with self.engine.connect() as conn:
+            for row in conn.execute(query):
+                highlights.setdefault((row.student_idx, row.counseling_idx), []).append(row.content)
+        return highlights
+
+    def get_sessions(self, keys: Iterable[CaseKey]) -> Dict[CaseKey, dict]:
+        """Return session details keyed by (student_idx, counseling_idx).
+
+        Summaries and highlights are read concurrently on separate pooled
+        connections.
+        """
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+
+        summaries_future = self.executor.submit(self._fetch_summaries, keys)
+        highlights_future = self.executor.submit(self._fetch_highlights, keys)
+        sessions = summaries_future.result()
+        for key, contents in highlights_future.result().items():
+            if key in sessions:
+                sessions[key]['highlights'] = contents
+        return sessions
+
+    def search(self, query: str, limit: int = 10, school_level: Optional[str] = None,
+               kind: Optional[str] = None) -> List[dict]:
+        """Lexical BM25 search over summaries and highlights (no embedding model needed)."""
+        if not self.fts_available:
+            return []
+        with self.engine.connect() as conn:
+            return search_counselling(conn, query, limit=limit, school_level=school_level, kind=kind)
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+        self.engine.dispose()
@@ -0,0 +1,96 @@
+"""
+Compact retrieval units built from counselling summaries and their highlights.
+
+Instead of indexing each full summary and, separately, each highlight span,
+every highlight is widened by a small window, snapped to word boundaries and
+merged with overlapping neighbours. The resulting chunks carry their parent
+session, so retrieval can still return the whole summary for context.
+Highlight offsets that fall outside the summary are dropped; summaries left
+without a usable span are split into sentence-packed chunks instead.
+"""
+import os
+import re
+from typing import Iterable, List, Tuple
+
+# Characters of context added on each side of a highlight
+CHUNK_WINDOW = int(os.getenv('CHUNK_WINDOW', 30))
+# Longest chunk; longer merged spans and highlight-less summaries are split
+CHUNK_MAX_CHARS = int(os.getenv('CHUNK_MAX_CHARS', 200))
+# highlights: chunk around highlight offsets | none: full summary + every highlight (legacy layout)
+DOCUMENT_CHUNKING = os.getenv('DOCUMENT_CHUNKING', 'highlights')
+CHUNKING_MODES = ('highlights', 'none')
+
+Span = Tuple[int, int]
+
+SENTENCE_END = re.compile(r'(?<=[.!?다])\s+')
+
+
+def _snap(text: str, start: int, end: int) -> Span:
+    """Move start back and end forward to the nearest whitespace so words stay whole."""
+    while start > 0 and not text[start - 1].isspace():
+        start -= 1
+    while end < len(text) and not text[end].isspace():
+        end += 1
+    return start, end
+
+
+def _split(text: str, start: int, end: int, max_chars: int) -> List[Span]:
+    """Split [start, end) into pieces of at most max_chars, breaking at whitespace when possible."""
+    spans = []
+    while end - start > max_chars:
+        cut = text.rfind(' ', start + 1, start + max_chars + 1)
+        if cut <= start:
+            cut = start + max_chars
+        spans.append((start, cut))
+        start = cut
+        while start < end and text[start].isspace():
+            start += 1
+    if end > start:
+        spans.append((start, end))
+    return spans
+
+
+def highlight_spans(text: str, highlights: Iterable[dict], window: int = CHUNK_WINDOW,
+                    max_chars: int = CHUNK_MAX_CHARS) -> List[Span]:
+    """Windowed highlight spans clamped to the text, with overlapping spans merged."""
+    spans = []
+    for highlight in highlights:
+        start = max(0, min(highlight['start_idx'], len(text)))
+        end = max(0, min(highlight['end_idx'], len(text)))
+        if end <= start or not text[start:end].strip():
+            continue
+        spans.append(_snap(text, max(0, start - window), min(len(text), end + window)))
+
+    merged: List[Span] = []
+    for start, end in sorted(spans):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return [piece for start, end in merged for piece in _split(text, start, end, max_chars)]
+
+
+def sentence_spans(text: str, max_chars: int = CHUNK_MAX_CHARS) -> List[Span]:
+    """Consecutive sentences packed into spans of at most max_chars."""
+    sentences: List[Span] = []
+    start = 0
+    for match in SENTENCE_END.finditer(text):
+        if match.start() > start:
+            sentences.append((start, match.start()))
+        start = match.end()
+    if text[start:].strip():
+        sentences.append((start, len(text.rstrip())))
+
+    packed: List[Span] = []
+    for start, end in sentences:
+        if packed and end - packed[-1][0] <= max_chars:
+            packed[-1] = (packed[-1][0], end)
+        else:
+            packed.extend(_split(text, start, end, max_chars))
+    return packed
+
+
+def chunk_summary(text: str, highlights: Iterable[dict], window: int = CHUNK_WINDOW,
+                  max_chars: int = CHUNK_MAX_CHARS) -> List[Span]:
+    """Spans to index for one summary: around its highlights, or sentence chunks if none are usable."""
+    return highlight_spans(text, highlights, window, max_chars) or sentence_spans(text, max_chars)
@@ -0,0 +1,241 @@
+"""
+Per-session conversation memory for multi-turn counselling.
+
+Each session keeps its latest turns verbatim within a token budget. Turns that
+fall out of that budget are folded into a running extractive summary (the
+question plus the first informative sentence of the answer), which has its
+own budget; the oldest summary lines are dropped beyond it. Summarizing this
+way costs no LLM call. Sessions live in an LRU map with an idle TTL, so both
+the memory per session and the number of sessions are bounded.
+
+A session also remembers the cases retrieved for its current topic: a
+follow-up whose embedding stays close to that topic reuses them instead of
+searching again.
+"""
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Hashable, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.tokens import estimate_tokens, truncate_to_tokens
+
+logger = logging.getLogger(__name__)
+
+CONVERSATION_MAX_SESSIONS = int(os.getenv('CONVERSATION_MAX_SESSIONS', 1000))
+# Seconds a session may stay idle before it is dropped
+CONVERSATION_SESSION_TTL = float(os.getenv('CONVERSATION_SESSION_TTL', 3600))
+# Recent turns kept verbatim / running summary of older turns / longest stored answer
+CONVERSATION_HISTORY_TOKENS = int(os.getenv('CONVERSATION_HISTORY_TOKENS', 800))
+CONVERSATION_SUMMARY_TOKENS = int(os.getenv('CONVERSATION_SUMMARY_TOKENS', 300))
+CONVERSATION_TURN_TOKENS = int(os.getenv('CONVERSATION_TURN_TOKENS', 300))
+# Cosine similarity to the topic above which a follow-up reuses the topic's cases
+TOPIC_REUSE_THRESHOLD = float(os.getenv('TOPIC_REUSE_THRESHOLD', 0.8))
+
+SUMMARY_LINE_TOKENS = 60
+
+SENTENCE_END = re.compile(r'(?<=[.!?다요])\s+')
+# Numbering, bullets and markdown emphasis at the start of an answer line
+LINE_MARKUP = re.compile(r'^[\s#*\-•\d.)]+|\*\*')
+
+
+def first_sentence(text: str, min_chars: int = 20) -> str:
+    """First sentence of at least min_chars, skipping headings and short greetings."""
+    for line in text.splitlines():
+        line = LINE_MARKUP.sub('', line).strip()
+        for sentence in SENTENCE_END.split(line):
+            if len(sentence) >= min_chars:
+                return sentence
+    return ' '.join(text.split())
+
+
+def _normalize(embedding) -> np.ndarray:
+    vector = np.asarray(embedding, dtype=np.float32).ravel()
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+class ConversationSession:
+    """Bounded memory of one conversation: recent turns, a running summary and the topic's cases."""
+
+    def __init__(self, session_id: Hashable, history_tokens: int = CONVERSATION_HISTORY_TOKENS,
+                 summary_tokens: int = CONVERSATION_SUMMARY_TOKENS, turn_tokens: int = CONVERSATION_TURN_TOKENS):
+        self.session_id = session_id
+        self.history_tokens = history_tokens
+        self.summary_tokens = summary_tokens
+        self.turn_tokens = turn_tokens
+        self.turns = deque()  # (question, answer, tokens)
+        self.summary = deque()  # (line, tokens)
+        self.turn_count = 0
+        self.dropped = 0
+        self.topic = None
+        self.topic_scope = None
+        self.cases = None
+        self.last_used = time.monotonic()
+        self._turn_tokens_used = 0
+        self._summary_tokens_used = 0
+        self._lock = threading.Lock()
+
+    @property
+    def is_empty(self) -> bool:
+        return not self.turns and not self.summary and not self.dropped
+
+    def add_turn(self, question: str, answer: str):
+        """Store a finished turn, folding the oldest turns into the summary when over budget."""
+        question = truncate_to_tokens(' '.join(question.split()), self.turn_tokens)
+        answer = truncate_to_tokens(answer.strip(), self.turn_tokens)
+        tokens = estimate_tokens(question) + estimate_tokens(answer)
+        with self._lock:
+            self.turns.append((question, answer, tokens))
+            self._turn_tokens_used += tokens
+            self.turn_count += 1
+            # The latest turn always stays verbatim
+            while self._turn_tokens_used > self.history_tokens and len(self.turns) > 1:
+                self._fold(self.turns.popleft())
+
+    def _fold(self, turn: Tuple[str, str, int]):
+        question, answer, tokens = turn
+        self._turn_tokens_used -= tokens
+        line = truncate_to_tokens(f"- {question} → {first_sentence(answer)}", SUMMARY_LINE_TOKENS)
+        line_tokens = estimate_tokens(line)
+        self.summary.append((line, line_tokens))
+        self._summary_tokens_used += line_tokens
+        while self._summary_tokens_used > self.summary_tokens and self.summary:
+            _, dropped_tokens = self.summary.popleft()
+            self._summary_tokens_used -= dropped_tokens
+            self.dropped += 1
+
+    def render(self) -> str:
+        """Conversation so far as a prompt section ("" for a new conversation)."""
+        with self._lock:
+            if not self.turns and not self.summary:
+                return ""
+            parts = ["\n지금까지의 상담 내용 (학생의 질문은 이 대화에 이어지는 질문입니다):"]
+            if self.summary or self.dropped:
+                parts.append("이전 대화 요약:")
+                if self.dropped:
+                    parts.append(f"- (앞선 대화 {self.dropped}개 생략)")
+                parts.extend(line for line, _ in self.summary)
+            if self.turns:
+                parts.append("최근 대화:")
+                for question, answer, _ in self.turns:
+                    parts.append(f"학생: {question}\n상담사: {answer}")
+            return "\n".join(parts) + "\n"
+
+    def topic_cases(self, query_embedding, scope: Hashable, threshold: float) -> Optional[List[dict]]:
+        """The topic's cases when the query stays on topic (same scope, similarity >= threshold)."""
+        with self._lock:
+            if self.topic is None or scope != self.topic_scope:
+                return None
+            if float(self.topic @ _normalize(query_embedding)) < threshold:
+                return None
+            return self.cases
+
+    def set_topic(self, query_embedding, scope: Hashable, cases: List[dict]):
+        """Start a new topic anchored at this query and its retrieved cases."""
+        with self._lock:
+            self.topic = _normalize(query_embedding)
+            self.topic_scope = scope
+            self.cases = cases
+
+    def tokens(self) -> int:
+        return self._turn_tokens_used + self._summary_tokens_used
+
+
+class ConversationStore:
+    """Thread-safe LRU of conversation sessions with an idle TTL.
+
+    ``stats`` reports live/evicted/expired sessions and how often a follow-up
+    reused its topic's cases.
+    """
+
+    def __init__(self, max_sessions: int = CONVERSATION_MAX_SESSIONS, ttl: Optional[float] = CONVERSATION_SESSION_TTL,
+                 topic_threshold: float = TOPIC_REUSE_THRESHOLD, **session_kwargs):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.topic_threshold = topic_threshold
+        self.session_kwargs = session_kwargs
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self.evicted = 0
+        self.expired = 0
+        self.topic_hits = 0
+        self.topic_misses = 0
+
+    def _expire(self, now: float):
+        # Sessions are ordered by last use, so expired ones are at the front
+        while self._sessions and self.ttl is not None:
+            session = next(iter(self._sessions.values()))
+            if now - session.last_used <= self.ttl:
+                break
+            self._sessions.popitem(last=False)
+            self.expired += 1
+
+    def get(self, session_id: Hashable, history: Optional[Iterable[Tuple[str, str]]] = None) -> ConversationSession:
+        """The session for session_id, created when missing.
+
+        ``history`` is the client's view of the conversation as (question,
+        answer) pairs: an empty history resets the session (the chat was
+        cleared) and a non-empty one restores a session that was evicted.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = ConversationSession(session_id, **self.session_kwargs)
+                self._sessions[session_id] = session
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+                    self.evicted += 1
+            else:
+                self._sessions.move_to_end(session_id)
+            session.last_used = now
+
+        if history is not None:
+            history = list(history)
+            if not history and session.turn_count:
+                session = self.reset(session_id)
+            elif history and not session.turn_count:
+                for question, answer in history:
+                    session.add_turn(question, answer)
+        return session
+
+    def reset(self, session_id: Hashable) -> ConversationSession:
+        """Forget a conversation and start it over."""
+        with self._lock:
+            session = ConversationSession(session_id, **self.session_kwargs)
+            self._sessions[session_id] = session
+            self._sessions.move_to_end(session_id)
+            return session
+
+    def reuse_cases(self, session: ConversationSession, query_embedding, scope: Hashable) -> Optional[List[dict]]:
+        """Cases of the session's topic when the follow-up stays on it, else None."""
+        cases = session.topic_cases(query_embedding, scope, self.topic_threshold)
+        with self._lock:
+            if cases is None:
+                self.topic_misses += 1
+            else:
+                self.topic_hits += 1
+        return cases
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def stats(self) -> dict:
+        lookups = self.topic_hits + self.topic_misses
+        with self._lock:
+            tokens = [session.tokens() for session in self._sessions.values()]
+        return {
+            'sessions': len(tokens),
+            'max_sessions': self.max_sessions,
+            'evicted': self.evicted,
+            'expired': self.expired,
+            'mean_tokens': sum(tokens) / len(tokens) if tokens else 0.0,
+            'topic_reuses': self.topic_hits,
+            'topic_reuse_rate': self.topic_hits / lookups if lookups else 0.0
+        }
@@ -1,113 +1,419 @@
+import argparse
+import hashlib
 import json
+import os
 from pathlib import Path
-import chromadb
-from chromadb.utils import embedding_functions
 import logging
+import time
 from tqdm import tqdm
 import re
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
-# Set up logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
+from app.chunking import CHUNKING_MODES, DOCUMENT_CHUNKING, chunk_summary
+from app.embeddings import (
+    CHROMA_PATH, COLLECTION_NAME, EMBEDDING_MODEL, EMBEDDING_MODELS, EMBEDDING_RUNTIME, EMBEDDING_RUNTIMES,
+    OnnxEmbeddingFunction, collection_embedding_model, document_texts, get_embedding_function,
+    model_path, onnx_model_path
 )
+from app.metrics import INDEXED_DOCUMENTS, configure_logging, record_trace, span
+from app.record_reader import LABELING_DATA_PATH, SCHOOL_LEVEL_FILES, iter_json_records
+from app.vector_index import VECTOR_BACKEND, VECTOR_INDEX_PATH, NumpyVectorIndex
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+
 logger = logging.getLogger(__name__)
 
+# Number of documents embedded and written to Chroma per round trip
+EMBEDDING_BATCH_SIZE = int(os.getenv('EMBEDDING_BATCH_SIZE', 256))
+# Batch size used inside a single SentenceTransformer forward pass
+EMBEDDING_ENCODE_BATCH_SIZE = int(os.getenv('EMBEDDING_ENCODE_BATCH_SIZE', 64))
+# Worker processes for torch embedding; each loads its own model copy, so the pool is opt-in
+EMBEDDING_WORKERS = int(os.getenv('EMBEDDING_WORKERS', 1))
+# Page size used when reading existing ids and hashes back from Chroma
+INDEX_SCAN_PAGE_SIZE = 5000
+
+Document = Tuple[str, str, dict]
+
+
 def clean_text(text: str) -> str:
     """Clean text by removing excessive whitespace and special characters."""
     text = re.sub(r'\s+', ' ', text)
     return text.strip()
 
-def process_school_data(file_path: Path, collection):
-    """Process school level counseling data and add to Chroma collection."""
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        for record in tqdm(data, desc=f"Processing {file_path.parent.name}"):
-            student_idx = record['student_idx']
-            
-            for summary in record['counselling_summaries']:
-                # Clean and prepare the text
-                clean_summary = clean_text(summary['summary'])
-                
-                # Create metadata
-                metadata = {
+
+def content_hash(text: str, metadata: dict) -> str:
+    """Hash a document's text and metadata so changed records can be detected."""
+    payload = json.dumps([text, metadata], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def with_hash(document: Document) -> Document:
+    """Return the document with its content hash stored in the metadata."""
+    doc_id, text, metadata = document
+    return doc_id, text, {**metadata, 'content_hash': content_hash(text, metadata)}
+
+
+def build_chunk_documents(record: dict, school_level: str) -> List[Document]:
+    """Turn one student record into highlight-centred chunks that point back to their session."""
+    documents = []
+    student_idx = record['student_idx']
+
+    for summary in record['counselling_summaries']:
+        parent_id = f"{student_idx}_{summary['counseling_idx']}"
+        seen = set()
+        for idx, (start, end) in enumerate(chunk_summary(summary['summary'], summary['highlights'])):
+            text = clean_text(summary['summary'][start:end])
+            if not text or text in seen:
+                continue
+            seen.add(text)
+            documents.append(with_hash((
+                f"{parent_id}_chunk_{idx}",
+                text,
+                {
+                    'student_idx': student_idx,
+                    'counseling_idx': summary['counseling_idx'],
+                    'school_level': school_level,
+                    'data_type': 'chunk',
+                    'parent_id': parent_id,
+                    'start_idx': start,
+                    'end_idx': end
+                }
+            )))
+
+    return documents
+
+
+def build_documents(record: dict, school_level: str, chunking: str = DOCUMENT_CHUNKING) -> List[Document]:
+    """Turn one student record into (id, text, metadata) documents.
+
+    With ``chunking='none'`` every full summary and every highlight span is
+    indexed on its own, as before chunking was introduced.
+    """
+    if chunking == 'highlights':
+        return build_chunk_documents(record, school_level)
+
+    documents = []
+    student_idx = record['student_idx']
+
+    for summary in record['counselling_summaries']:
+        doc_id = f"{student_idx}_{summary['counseling_idx']}"
+
+        documents.append(with_hash((
+            doc_id,
+            clean_text(summary['summary']),
+            {
+                'student_idx': student_idx,
+                'counseling_idx': summary['counseling_idx'],
+                'school_level': school_level,
+                'data_type': 'counselling_summary'
+            }
+        )))
+
+        for idx, highlight in enumerate(summary['highlights']):
+            highlight_text = clean_text(
+                summary['summary'][highlight['start_idx']:highlight['end_idx']]
+            )
+            # Offsets that point past the end of the summary yield empty spans
+            if not highlight_text:
+                continue
+
+            documents.append(with_hash((
+                f"{doc_id}_highlight_{idx}",
+                highlight_text,
+                {
                     'student_idx': student_idx,
                     'counseling_idx': summary['counseling_idx'],
-                    'school_level': file_path.parent.name,
-                    'data_type': 'counselling_summary'
+                    'school_level': school_level,
+                    'data_type': 'highlight',
+                    'start_idx': highlight['start_idx'],
+                    'end_idx': highlight['end_idx']
                 }
-                
-                # Add document to collection
-                collection.add(
-                    documents=[clean_summary],
-                    metadatas=[metadata],
-                    ids=[f"{student_idx}_{summary['counseling_idx']}"]
+            )))
+
+    return documents
+
+
+def load_indexed_documents(collection, page_size: int = INDEX_SCAN_PAGE_SIZE) -> Dict[str, dict]:
+    """Read the id -> metadata map of everything already stored in the collection."""
+    indexed = {}
+    offset = 0
+    while True:
+        page = collection.get(include=['metadatas'], limit=page_size, offset=offset)
+        if not page['ids']:
+            break
+        for doc_id, metadata in zip(page['ids'], page['metadatas']):
+            indexed[doc_id] = metadata or {}
+        offset += len(page['ids'])
+    return indexed
+
+
+def select_changed(documents: Iterable[Document], indexed: Dict[str, dict],
+                   seen_ids: Set[str]) -> Iterator[Document]:
+    """Yield only documents that are new or whose content hash changed."""
+    for document in documents:
+        doc_id, _, metadata = document
+        seen_ids.add(doc_id)
+        if indexed.get(doc_id, {}).get('content_hash') != metadata['content_hash']:
+            yield document
+
+
+def delete_documents(collection, ids: List[str], batch_size: int = EMBEDDING_BATCH_SIZE):
+    """Delete documents from the collection in batches."""
+    for start in range(0, len(ids), batch_size):
+        collection.delete(ids=ids[start:start + batch_size])
+
+
+def iter_batches(documents: Iterable[Document], batch_size: int) -> Iterator[List[Document]]:
+    """Group documents into lists of at most batch_size items."""
+    batch = []
+    for document in documents:
+        batch.append(document)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def embed_texts(model: 'SentenceTransformer', texts: List[str], pool=None,
+                encode_batch_size: int = EMBEDDING_ENCODE_BATCH_SIZE) -> List[List[float]]:
+    """Embed a batch of texts in one call, spread over the worker pool if given."""
+    if pool is not None:
+        embeddings = model.encode_multi_process(texts, pool, batch_size=encode_batch_size)
+    else:
+        embeddings = model.encode(texts, batch_size=encode_batch_size, convert_to_numpy=True)
+    return embeddings.tolist()
+
+
+def ingest_documents(documents: Iterable[Document], collection, model: 'SentenceTransformer',
+                     batch_size: int = EMBEDDING_BATCH_SIZE, pool=None, desc: str = None,
+                     model_name: str = EMBEDDING_MODEL) -> Dict[str, float]:
+    """Embed documents batch by batch and bulk upsert them into the collection."""
+    count = 0
+    embed_time = 0.0
+    write_time = 0.0
+    start = time.perf_counter()
+
+    with tqdm(desc=desc, unit='doc') as progress:
+        for batch in iter_batches(documents, batch_size):
+            ids, texts, metadatas = (list(column) for column in zip(*batch))
+
+            timings = {}
+            with span('index_embed', timings):
+                embeddings = embed_texts(model, document_texts(texts, model_name), pool)
+            with span('index_write', timings):
+                collection.upsert(
+                    ids=ids,
+                    embeddings=embeddings,
+                    documents=texts,
+                    metadatas=metadatas
                 )
-                
-                # Process highlights separately
-                for idx, highlight in enumerate(summary['highlights']):
-                    highlight_text = clean_text(
-                        summary['summary'][highlight['start_idx']:highlight['end_idx']]
-                    )
-                    
-                    highlight_metadata = {
-                        'student_idx': student_idx,
-                        'counseling_idx': summary['counseling_idx'],
-                        'school_level': file_path.parent.name,
-                        'data_type': 'highlight',
-                        'start_idx': highlight['start_idx'],
-                        'end_idx': highlight['end_idx']
-                    }
-                    
-                    collection.add(
-                        documents=[highlight_text],
-                        metadatas=[highlight_metadata],
-                        ids=[f"{student_idx}_{summary['counseling_idx']}_highlight_{idx}"]
-                    )
-                    
-        logger.info(f"Successfully processed {file_path.name}")
-        
+
+            embed_time += timings['index_embed'] / 1000
+            write_time += timings['index_write'] / 1000
+            count += len(batch)
+            INDEXED_DOCUMENTS.inc(len(batch))
+            progress.update(len(batch))
+
+    elapsed = time.perf_counter() - start
+    return {
+        'documents': count,
+        'seconds': elapsed,
+        'embed_seconds': embed_time,
+        'write_seconds': write_time,
+        'docs_per_second': count / elapsed if elapsed > 0 else 0.0
+    }
+
+
+def process_school_data(file_path: Path, collection, model: 'SentenceTransformer', school_level: str,
+                        batch_size: int = EMBEDDING_BATCH_SIZE, pool=None,
+                        indexed: Optional[Dict[str, dict]] = None,
+                        seen_ids: Optional[Set[str]] = None,
+                        model_name: str = EMBEDDING_MODEL,
+                        chunking: str = DOCUMENT_CHUNKING) -> Dict[str, float]:
+    """Process school level counseling data and add to Chroma collection.
+
+    When ``indexed`` is given, only documents missing from it or whose content
+    hash differs are embedded; every id found in the file is added to ``seen_ids``.
+    """
+    try:
+        documents = (
+            document
+            for record in iter_json_records(file_path)
+            for document in build_documents(record, school_level, chunking)
+        )
+        if indexed is not None:
+            documents = select_changed(documents, indexed, seen_ids if seen_ids is not None else set())
+
+        stats = ingest_documents(
+            documents, collection, model,
+            batch_size=batch_size, pool=pool, desc=f"Processing {file_path.parent.name}",
+            model_name=model_name
+        )
+
+        logger.info(
+            f"Successfully processed {file_path.name}: {stats['documents']} documents "
+            f"in {stats['seconds']:.1f}s ({stats['docs_per_second']:.1f} docs/s, "
+            f"embed {stats['embed_seconds']:.1f}s, write {stats['write_seconds']:.1f}s)"
+        )
+        return stats
+
     except Exception as e:
         logger.error(f"Error processing {file_path}: {e}")
         raise
 
-def main():
-    # Initialize Chroma client
-    client = chromadb.PersistentClient(path="./chroma_db")
-    
-    # Use sentence-transformers all-MiniLM-L6-v2 model for embeddings
-    embedding_function = embedding_functions.SentenceTransformerEmbeddingFunction(
-        model_name="./app/models/all-MiniLM-L6-v2"
-    )
-    
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Build the counselling embedding index.")
+    parser.add_argument('--batch-size', type=int, default=EMBEDDING_BATCH_SIZE,
+                        help="documents embedded and written per batch")
+    parser.add_argument('--workers', type=int, default=EMBEDDING_WORKERS,
+                        help="CPU worker processes used for embedding; each loads its own model copy (default 1: no pool)")
+    parser.add_argument('--mode', choices=['incremental', 'full'], default='incremental',
+                        help="incremental embeds only new/changed records and removes deleted ones; "
+                             "full drops the collection and rebuilds it")
+    parser.add_argument('--backend', choices=['chroma', 'numpy'], default=VECTOR_BACKEND,
+                        help=f"vector store to build: Chroma collection or the memory-mapped NumPy index "
+                             f"in {VECTOR_INDEX_PATH.name}/ (default: {VECTOR_BACKEND})")
+    parser.add_argument('--model', choices=list(EMBEDDING_MODELS), default=EMBEDDING_MODEL,
+                        help=f"embedding model; switching models requires --mode full (default: {EMBEDDING_MODEL})")
+    parser.add_argument('--chunking', choices=CHUNKING_MODES, default=DOCUMENT_CHUNKING,
+                        help=f"highlights indexes compact chunks around the highlight offsets; none indexes "
+                             f"full summaries plus every highlight (default: {DOCUMENT_CHUNKING})")
+    parser.add_argument('--runtime', choices=EMBEDDING_RUNTIMES, default=EMBEDDING_RUNTIME,
+                        help=f"embedding runtime; onnx/onnx-int8 need download_models.py --onnx "
+                             f"(default: {EMBEDDING_RUNTIME})")
+    return parser.parse_args(argv)
+
+
+def load_document_encoder(runtime: str = EMBEDDING_RUNTIME, model_name: str = EMBEDDING_MODEL):
+    """Model used to embed documents: a SentenceTransformer, or the ONNX export (same encode API)."""
+    if runtime == 'torch':
+        # Imported here so the ONNX runtimes never load torch
+        from sentence_transformers import SentenceTransformer
+
+        return SentenceTransformer(str(model_path(model_name)), device='cpu')
+    return OnnxEmbeddingFunction(onnx_model_path(model_path(model_name)), quantized=runtime == 'onnx-int8')
+
+
+def open_chroma_collection(mode: str, model_name: str = EMBEDDING_MODEL):
+    """Open (or, in full mode, recreate) the Chroma collection. Returns (collection, max batch size)."""
+    import chromadb
+
+    client = chromadb.PersistentClient(path=str(CHROMA_PATH))
+
+    if mode == 'full':
+        try:
+            client.delete_collection(COLLECTION_NAME)
+            logger.info(f"Dropped collection {COLLECTION_NAME} for a full rebuild")
+        except Exception:
+            # Nothing to drop on the first run
+            pass
+
     # Create or get collection
     collection = client.get_or_create_collection(
-        name="counselling_data",
-        embedding_function=embedding_function,
-        metadata={"description": "Student counselling data and highlights"}
+        name=COLLECTION_NAME,
+        embedding_function=get_embedding_function(model_name),
+        metadata={
+            "description": "Student counselling summaries, highlights and chunks",
+            "embedding_model": model_name,
+            # Not every registered model emits unit vectors
+            "hnsw:space": "cosine"
+        }
     )
-    
+    # Chroma rejects writes larger than its max batch size
+    return collection, client.get_max_batch_size()
+
+
+def main(argv=None):
+    configure_logging()
+    args = parse_args(argv)
+
+    batch_size = args.batch_size
+    if args.backend == 'numpy':
+        collection = NumpyVectorIndex(VECTOR_INDEX_PATH)
+        if args.mode == 'full':
+            collection.reset()
+    else:
+        collection, max_batch_size = open_chroma_collection(args.mode, args.model)
+        batch_size = min(batch_size, max_batch_size)
+
+    # Vectors from different models are not comparable, so a model switch needs a rebuild
+    indexed_model = collection_embedding_model(collection)
+    if collection.count() and indexed_model != args.model:
+        raise SystemExit(
+            f"The index was built with {indexed_model}; run with --mode full to re-index with {args.model}"
+        )
+    if (collection.metadata or {}).get('embedding_model') != args.model:
+        collection.modify(metadata={**(collection.metadata or {}), 'embedding_model': args.model})
+
+    logger.info(f"Embedding with {args.model} ({args.runtime}), chunking: {args.chunking}")
+    model = load_document_encoder(args.runtime, args.model)
+
+    indexed = None
+    seen_ids = set()
+    processed_levels = set()
+    if args.mode == 'incremental':
+        indexed = load_indexed_documents(collection)
+        logger.info(f"Loaded {len(indexed)} indexed document hashes")
+
+    pool = None
+    # ONNX Runtime parallelizes inside a single session instead
+    if args.workers > 1 and args.runtime == 'torch':
+        pool = model.start_multi_process_pool(target_devices=['cpu'] * args.workers)
+
     # Process school level data
-    base_path = Path(__file__).parent.parent / 'data' / '02.라벨링데이터' / '01. 학교급'
-    school_levels = {
-        '초등': '01. 초등/전문가_라벨링_데이터_초등학교.json',
-        '중등': '02. 중등/전문가_라벨링_데이터_중학교.json',
-        '고등': '03. 고등/전문가_라벨링_데이터_고등학교.json'
-    }
-    
-    for level_name, file_path in school_levels.items():
-        full_path = base_path / file_path
-        if full_path.exists():
-            logger.info(f"Processing {level_name} school data...")
-            process_school_data(full_path, collection)
-        else:
-            logger.warning(f"File not found: {full_path}")
-    
+    total_documents = 0
+    start = time.perf_counter()
+
+    try:
+        for level_name, file_path in SCHOOL_LEVEL_FILES.items():
+            full_path = LABELING_DATA_PATH / file_path
+            if full_path.exists():
+                logger.info(f"Processing {level_name} school data...")
+                stats = process_school_data(
+                    full_path, collection, model, level_name,
+                    batch_size=batch_size, pool=pool,
+                    indexed=indexed, seen_ids=seen_ids, model_name=args.model,
+                    chunking=args.chunking
+                )
+                total_documents += stats['documents']
+                processed_levels.add(level_name)
+            else:
+                logger.warning(f"File not found: {full_path}")
+    finally:
+        if pool is not None:
+            model.stop_multi_process_pool(pool)
+
+    if indexed is not None:
+        # Documents of a missing file are kept rather than treated as deleted
+        skipped_levels = set(SCHOOL_LEVEL_FILES) - processed_levels
+        stale_ids = [
+            doc_id for doc_id, metadata in indexed.items()
+            if doc_id not in seen_ids and metadata.get('school_level') not in skipped_levels
+        ]
+        if stale_ids:
+            delete_documents(collection, stale_ids, batch_size)
+        logger.info(
+            f"Incremental update: {total_documents} new or changed, "
+            f"{len(seen_ids) - total_documents} unchanged, {len(stale_ids)} deleted"
+        )
+
+    if args.backend == 'numpy':
+        collection.save()
+
+    elapsed = time.perf_counter() - start
+    logger.info(
+        f"Indexed {total_documents} documents in {elapsed:.1f}s "
+        f"({total_documents / elapsed if elapsed > 0 else 0.0:.1f} docs/s)"
+    )
+
     # Print collection statistics
     collection_stats = collection.count()
     logger.info(f"Total documents in collection: {collection_stats}")
+    record_trace('indexing', {'total': elapsed * 1000}, documents=total_documents, collection_size=collection_stats,
+                 model=args.model, runtime=args.runtime, chunking=args.chunking, mode=args.mode, backend=args.backend)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
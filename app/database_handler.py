@@ -1,20 +1,24 @@
 from pathlib import Path
+import argparse
 import logging
+import os
 import sys
 
 from app.db import DatabaseManager  # Changed from 'from db import DatabaseManager'
+from app.metrics import configure_logging
+
 # Set up logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('data_import.log'),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+configure_logging(log_file='data_import.log')
 logger = logging.getLogger(__name__)
 
-def main():
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Import the labeling data into SQLite.")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="worker processes used to parse the data files (1 imports sequentially)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
     base_path = Path(__file__).parent.parent / 'data' / '02.라벨링데이터'
     
     if not base_path.exists():
@@ -25,7 +29,7 @@ def main():
     
     try:
         db = DatabaseManager()
-        db.process_all_data(base_path)
+        db.process_all_data(base_path, workers=args.workers)
         logger.info("Database creation and data import completed successfully")
     except Exception as e:
         logger.error(f"Fatal error occurred during import: {e}")
@@ -1,47 +1,112 @@
-from sqlalchemy import create_engine
+from sqlalchemy import func, insert, select
 from sqlalchemy.orm import sessionmaker
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-import json
 import logging
-from typing import List, Dict, Optional
+import os
+import time
+from typing import Iterable, Iterator, List, Dict, Optional, Tuple
 from sqlalchemy.exc import SQLAlchemyError
 
 from app.models import (
-    Base, Student, CounsellingSession, Highlight,
+    Base, create_indexes, Student, CounsellingSession, Highlight, StudentJobProfile, RecommendedJobCategory,
     CounsellingRecord, ExpertLabeling, JobInformation
 )
+from app.engine import create_sqlite_engine, enable_wal
+from app.metrics import IMPORTED_ROWS, STAGE_SECONDS, record_trace, span
+from app.record_reader import JOB_CATEGORY_FILES, SCHOOL_LEVEL_FILES, iter_json_records, school_level_in
+from app.search import ensure_fts_table, index_rows, rebuild_fts_index
 
-# Set up logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
+# Job-category records carry no school level; it is inferred from the text when stated
+UNKNOWN_SCHOOL_LEVEL = '미상'
+
+def infer_school_level(expert_data: ExpertLabeling) -> str:
+    """Guess the school level from the summaries and expert comment, or 미상 if not stated."""
+    texts = [summary.summary for summary in expert_data.counselling_summaries]
+    if expert_data.expert_comment:
+        texts.append(expert_data.expert_comment.get('ko', ''))
+
+    return school_level_in(' '.join(texts)) or UNKNOWN_SCHOOL_LEVEL
+
+
+def prepare_student(expert_data: ExpertLabeling, school_level: str) -> dict:
+    """Convert a validated record into plain, picklable insert-ready data."""
+    return {
+        'student_idx': expert_data.student_idx,
+        'school_level': school_level,
+        'sessions': [
+            {
+                'counseling_idx': summary.counseling_idx,
+                'summary': summary.summary,
+                'highlights': [
+                    (h.start_idx, h.end_idx, summary.summary[h.start_idx:h.end_idx])
+                    for h in summary.highlights
+                ]
+            }
+            for summary in expert_data.counselling_summaries
+        ],
+        'job_label': expert_data.job_label,
+        'expert_comment': (expert_data.expert_comment or {}).get('ko'),
+        'recommendations': [
+            (recommendation.priority, recommendation.job_category_idx)
+            for recommendation in expert_data.recommended_job_categories or []
+        ]
+    }
+
+
+def prepare_records(records: Iterable[dict], school_level: Optional[str], stats: dict) -> Iterator[dict]:
+    """Validate raw records, counting failures in ``stats['errors']``."""
+    for record in records:
+        try:
+            expert_data = ExpertLabeling.parse_obj(record)
+        except Exception as e:
+            stats['errors'] += 1
+            logger.error(f"Error processing record {record.get('student_idx', 'unknown')}: {e}")
+            continue
+        yield prepare_student(expert_data, school_level or infer_school_level(expert_data))
+
+
+def parse_labeling_file(file_path: Path, school_level: Optional[str]) -> dict:
+    """Parse and validate one labeling file. Runs in a worker process."""
+    stats = {'errors': 0}
+    students = list(prepare_records(iter_json_records(file_path), school_level, stats))
+    return {'students': students, 'errors': stats['errors']}
+
+
+def iter_labeling_files(base_path: Path, include_job_categories: bool = True) -> Iterator[Tuple[str, Optional[str], Path]]:
+    """Yield (label, school_level, path) for every labeling file that exists.
+
+    Job-category files have no school level of their own (None).
+    """
+    files = [(level, level, relative_path) for level, relative_path in SCHOOL_LEVEL_FILES.items()]
+    if include_job_categories:
+        files += [(label, None, relative_path) for label, relative_path in JOB_CATEGORY_FILES.items()]
+
+    for label, school_level, relative_path in files:
+        file_path = base_path / relative_path
+        if not file_path.exists():
+            logger.warning(f"File not found: {file_path}")
+            continue
+        yield label, school_level, file_path
+
+
 class DatabaseManager:
     def __init__(self, db_path: str = 'career_guidance.db', batch_size: int = 100):
-        self.engine = create_engine(f'sqlite:///{db_path}')
+        self.db_path = db_path
+        self.engine = create_sqlite_engine(db_path, profile='import')
         Base.metadata.create_all(self.engine)
+        create_indexes(self.engine)
+        with self.engine.begin() as conn:
+            # Databases imported before the FTS index existed get it filled once
+            if ensure_fts_table(conn):
+                rebuild_fts_index(conn)
         Session = sessionmaker(bind=self.engine)
         self.session = Session()
         self.batch_size = batch_size
         self.current_batch = []
 
-    def load_json_file(self, file_path: Path) -> Optional[dict]:
-        """Load and parse a JSON file with error handling."""
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except json.JSONDecodeError as e:
-            logger.error(f"JSON parsing error in {file_path}: {e}")
-            return None
-        except FileNotFoundError:
-            logger.error(f"File not found: {file_path}")
-            return None
-        except Exception as e:
-            logger.error(f"Unexpected error reading {file_path}: {e}")
-            return None
-
     def flush_batch(self):
         """Commit the current batch of records to the database."""
         if self.current_batch:
@@ -60,13 +125,11 @@ class DatabaseManager:
         if len(self.current_batch) >= self.batch_size:
             self.flush_batch()
 
-    def import_school_data(self, school_level: str, data: List[dict]):
-        """Import school-level counselling data with improved error handling and batch processing."""
-        if not data:
-            logger.warning(f"No data provided for school level: {school_level}")
-            return
+    def import_school_data(self, school_level: str, data: Iterable[dict]):
+        """Import school-level counselling data with improved error handling and batch processing.
 
-        total_records = len(data)
+        ``data`` may be a list or a lazy iterator such as ``iter_json_records``.
+        """
         processed = 0
         errors = 0
 
@@ -105,7 +168,7 @@ class DatabaseManager:
                 
                 processed += 1
                 if processed % 10 == 0:  # Log progress every 10 records
-                    logger.info(f"Processed {processed}/{total_records} records for {school_level}")
+                    logger.info(f"Processed {processed} records for {school_level}")
                 
             except Exception as e:
                 errors += 1
@@ -115,38 +178,251 @@ class DatabaseManager:
 
         # Flush any remaining batch items
         self.flush_batch()
+
+        # Rows added through the ORM are not indexed one by one
+        with self.engine.begin() as conn:
+            rebuild_fts_index(conn)
+
+        if processed == 0 and errors == 0:
+            logger.warning(f"No data provided for school level: {school_level}")
+            return
         
         logger.info(f"Completed processing {school_level} data:")
         logger.info(f"Total processed: {processed}")
         logger.info(f"Total errors: {errors}")
 
-    def process_all_data(self, base_path: Path):
-        """Process all data from the given base path with progress tracking."""
-        school_levels = {'초등': '01. 초등', '중등': '02. 중등', '고등': '03. 고등'}
-        
-        for level, folder in school_levels.items():
+    def _next_ids(self) -> Dict[str, int]:
+        """Pre-allocate primary keys by continuing from the current maximum ids."""
+        with self.engine.connect() as conn:
+            return {
+                model.__tablename__: (conn.execute(select(func.max(model.id))).scalar() or 0) + 1
+                for model in (Student, CounsellingSession, Highlight,
+                              StudentJobProfile, RecommendedJobCategory)
+            }
+
+    def _insert_batch(self, batch: List[dict], next_ids: Dict[str, int]) -> int:
+        """Insert one batch of prepared students with executemany inserts in a single transaction."""
+        students, sessions, highlights, profiles, recommendations = [], [], [], [], []
+        fts_rows = []
+
+        for prepared in batch:
+            student_id = next_ids['students']
+            next_ids['students'] += 1
+            students.append({
+                'id': student_id,
+                'student_idx': prepared['student_idx'],
+                'school_level': prepared['school_level']
+            })
+
+            for session_data in prepared['sessions']:
+                session_id = next_ids['counselling_sessions']
+                next_ids['counselling_sessions'] += 1
+                sessions.append({
+                    'id': session_id,
+                    'student_id': student_id,
+                    'counseling_idx': session_data['counseling_idx'],
+                    'summary': session_data['summary']
+                })
+                fts_row = {
+                    'session_id': session_id,
+                    'student_idx': prepared['student_idx'],
+                    'counseling_idx': session_data['counseling_idx'],
+                    'school_level': prepared['school_level']
+                }
+                fts_rows.append({**fts_row, 'content': session_data['summary'],
+                                 'kind': 'summary', 'highlight_id': None})
+
+                for start_idx, end_idx, content in session_data['highlights']:
+                    highlights.append({
+                        'id': next_ids['highlights'],
+                        'session_id': session_id,
+                        'start_idx': start_idx,
+                        'end_idx': end_idx,
+                        'content': content
+                    })
+                    if content:
+                        fts_rows.append({**fts_row, 'content': content,
+                                         'kind': 'highlight', 'highlight_id': next_ids['highlights']})
+                    next_ids['highlights'] += 1
+
+            if prepared['job_label'] is not None or prepared['expert_comment'] is not None:
+                profiles.append({
+                    'id': next_ids['student_job_profiles'],
+                    'student_id': student_id,
+                    'job_label': prepared['job_label'],
+                    'expert_comment': prepared['expert_comment']
+                })
+                next_ids['student_job_profiles'] += 1
+
+            for priority, job_category_idx in prepared['recommendations']:
+                recommendations.append({
+                    'id': next_ids['recommended_job_categories'],
+                    'student_id': student_id,
+                    'priority': priority,
+                    'job_category_idx': job_category_idx
+                })
+                next_ids['recommended_job_categories'] += 1
+
+        with self.engine.begin() as conn:
+            for model, rows in ((Student, students), (CounsellingSession, sessions),
+                                (Highlight, highlights), (StudentJobProfile, profiles),
+                                (RecommendedJobCategory, recommendations)):
+                if rows:
+                    conn.execute(insert(model.__table__), rows)
+            # Keep the full-text index in the same transaction as the base rows
+            index_rows(conn, fts_rows)
+
+        return len(students) + len(sessions) + len(highlights) + len(profiles) + len(recommendations)
+
+    def write_prepared_students(self, label: str, students: Iterable[dict],
+                                stats: Optional[dict] = None) -> Dict[str, float]:
+        """Write prepared student records (see ``prepare_student``) in batches.
+
+        Primary keys are pre-allocated in memory so every table can be written
+        with executemany-style Core inserts, one transaction per ``batch_size``
+        students. Students that already exist are skipped, so re-running an
+        import is safe.
+        """
+        # Update the caller's dict in place: prepare_records counts validation
+        # errors into it lazily, while ``students`` is being consumed
+        stats = stats if stats is not None else {}
+        stats.setdefault('errors', 0)
+
+        # Make sure nothing from the ORM session holds the write lock
+        self.flush_batch()
+        self.session.commit()
+
+        with self.engine.connect() as conn:
+            existing = set(conn.execute(select(Student.student_idx)).scalars())
+        next_ids = self._next_ids()
+
+        start = time.perf_counter()
+        processed = skipped = rows = 0
+        batch = []
+
+        def write_batch():
+            nonlocal processed, rows
             try:
-                file_path = base_path / '01. 학교급' / folder / f'전문가_라벨링_데이터_{level}학교.json'
-                logger.info(f"Processing {level} school data from {file_path}")
-                
-                if not file_path.exists():
-                    logger.warning(f"File not found: {file_path}")
+                with span('import_batch'):
+                    inserted = self._insert_batch(batch, next_ids)
+                rows += inserted
+                processed += len(batch)
+                IMPORTED_ROWS.inc(inserted, label=label)
+            except SQLAlchemyError as e:
+                stats['errors'] += len(batch)
+                logger.error(f"Database error while inserting {label} batch: {e}")
+            logger.info(f"Processed {processed} records for {label}")
+
+        for prepared in students:
+            if prepared['student_idx'] in existing:
+                skipped += 1
+                continue
+            existing.add(prepared['student_idx'])
+
+            batch.append(prepared)
+            if len(batch) >= self.batch_size:
+                write_batch()
+                batch = []
+
+        if batch:
+            write_batch()
+
+        elapsed = time.perf_counter() - start
+        stats.update({
+            'processed': processed,
+            'skipped': skipped,
+            'rows': rows,
+            'seconds': elapsed,
+            'rows_per_second': rows / elapsed if elapsed > 0 else 0.0
+        })
+        logger.info(
+            f"Completed processing {label} data: {processed} records, {rows} rows "
+            f"({stats['rows_per_second']:.0f} rows/s), {skipped} skipped, {stats['errors']} errors"
+        )
+        STAGE_SECONDS.observe(elapsed, stage='import')
+        record_trace('import', {'total': elapsed * 1000}, label=label, processed=processed, rows=rows,
+                     skipped=skipped, errors=stats['errors'])
+        return stats
+
+    def bulk_import_school_data(self, school_level: Optional[str], data: Iterable[dict],
+                                label: Optional[str] = None) -> Dict[str, float]:
+        """Import counselling data without per-row flushes.
+
+        ``school_level`` of None infers the level per student, which is how
+        the job-category files (whose records carry no school level) are loaded.
+        """
+        stats = {'errors': 0}
+        return self.write_prepared_students(
+            label or school_level, prepare_records(data, school_level, stats), stats
+        )
+
+    def parallel_import(self, base_path: Path, workers: Optional[int] = None) -> Dict[str, dict]:
+        """Parse every labeling file in its own process and write them from this one.
+
+        Files are written in submission order (school levels first) so a student
+        present in both a school-level and a job-category file keeps the explicit
+        school level.
+        """
+        files = list(iter_labeling_files(base_path))
+        if not files:
+            return {}
+
+        workers = workers or min(len(files), os.cpu_count() or 1)
+        results = {}
+        start = time.perf_counter()
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                (label, executor.submit(parse_labeling_file, file_path, school_level))
+                for label, school_level, file_path in files
+            ]
+            for label, future in futures:
+                try:
+                    parsed = future.result()
+                except Exception as e:
+                    logger.error(f"Error parsing {label} data: {e}")
                     continue
-                    
-                data = self.load_json_file(file_path)
-                if data:
-                    self.import_school_data(level, data)
+                results[label] = self.write_prepared_students(
+                    label, parsed['students'], {'errors': parsed['errors']}
+                )
+
+        logger.info(
+            f"Imported {len(results)} files with {workers} workers in "
+            f"{time.perf_counter() - start:.2f}s"
+        )
+        return results
+
+    def process_all_data(self, base_path: Path, bulk: bool = True, workers: int = 1):
+        """Process all data from the given base path with progress tracking.
+
+        With ``workers`` > 1 the files are parsed in parallel worker processes.
+        Job-category files (and their recommendations) are only imported by the
+        bulk path; the legacy importer handles the school-level files.
+        """
+        if bulk and workers > 1:
+            self.parallel_import(base_path, workers)
+            return
+
+        for label, school_level, file_path in iter_labeling_files(base_path, include_job_categories=bulk):
+            try:
+                logger.info(f"Processing {label} data from {file_path}")
+
+                if bulk:
+                    self.bulk_import_school_data(school_level, iter_json_records(file_path), label)
                 else:
-                    logger.error(f"Failed to load data from {file_path}")
+                    self.import_school_data(school_level, iter_json_records(file_path))
             
             except Exception as e:
-                logger.error(f"Error processing {level} school data: {e}")
+                logger.error(f"Error processing {label} data: {e}")
                 continue
 
     def close(self):
-        """Safely close the database session."""
+        """Safely close the database session and leave the file in WAL mode for serving."""
         try:
             self.flush_batch()  # Ensure any remaining batch items are saved
             self.session.close()
+            self.engine.dispose()
+            # The serving profile opens the file read-only, so the journal mode is set here, once
+            enable_wal(self.db_path)
         except Exception as e:
             logger.error(f"Error while closing database session: {e}")
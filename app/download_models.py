@@ -1,19 +1,110 @@
+import argparse
 import os
-from pathlib import Path
-from sentence_transformers import SentenceTransformer
-
-def download_model():
-    MODEL_PATH = Path(__file__).parent / "models" / "all-MiniLM-L6-v2"
-    
-    if MODEL_PATH.exists():
-        print("Model already exists.")
+
+from app.embeddings import (
+    EMBEDDING_MODEL, EMBEDDING_MODELS, ONNX_MODEL_FILE, ONNX_QUANTIZED_MODEL_FILE,
+    model_path, model_spec, onnx_model_path
+)
+from app.reranker import RERANKER_MODEL, RERANKER_MODELS, reranker_path
+
+def download_model(model_name=EMBEDDING_MODEL):
+    path = model_path(model_name)
+    if path.exists():
+        print(f"Model {model_name} already exists.")
         return
-    
-    print("Downloading embedding model...")
-    MODEL_PATH.parent.mkdir(parents=True, exist_ok=True)
-    model = SentenceTransformer('all-MiniLM-L6-v2')
-    model.save(str(MODEL_PATH))
+
+    # Imported here so already-downloaded models and ONNX-only runs never load torch
+    from sentence_transformers import SentenceTransformer
+
+    print(f"Downloading embedding model {model_name}...")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    model = SentenceTransformer(model_spec(model_name)['repo'])
+    model.save(str(path))
     print("Model downloaded successfully!")
 
+def download_reranker(model_name=RERANKER_MODEL):
+    from sentence_transformers import CrossEncoder
+
+    path = reranker_path(model_name)
+    if path.exists():
+        print(f"Reranker {model_name} already exists.")
+        return
+
+    print(f"Downloading reranker {model_name}...")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    CrossEncoder(RERANKER_MODELS[model_name]).save(str(path))
+    print("Reranker downloaded successfully!")
+
+def export_onnx(model_name=EMBEDDING_MODEL, quantize=True):
+    """Export the transformer to ONNX and add an int8 dynamically quantized copy.
+
+    Pooling and normalization are done in NumPy by OnnxEmbeddingFunction, so
+    only the transformer's last_hidden_state is exported.
+    """
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    path = model_path(model_name)
+    output_path = onnx_model_path(path)
+    output_path.mkdir(parents=True, exist_ok=True)
+
+    print(f"Exporting {model_name} to ONNX...")
+    tokenizer = AutoTokenizer.from_pretrained(str(path))
+    model = AutoModel.from_pretrained(str(path))
+    model.eval()
+
+    sample = tokenizer(["진로 상담 예시 문장입니다."], return_tensors='pt')
+    input_names = [name for name in ('input_ids', 'attention_mask', 'token_type_ids') if name in sample]
+    dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in input_names}
+    dynamic_axes['last_hidden_state'] = {0: 'batch', 1: 'sequence'}
+
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(sample[name] for name in input_names),
+            str(output_path / ONNX_MODEL_FILE),
+            input_names=input_names,
+            output_names=['last_hidden_state'],
+            dynamic_axes=dynamic_axes,
+            opset_version=14
+        )
+    # Writes tokenizer.json, which is all OnnxEmbeddingFunction needs
+    tokenizer.save_pretrained(str(output_path))
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        print("Quantizing ONNX model to int8...")
+        quantize_dynamic(
+            str(output_path / ONNX_MODEL_FILE),
+            str(output_path / ONNX_QUANTIZED_MODEL_FILE),
+            weight_type=QuantType.QInt8
+        )
+
+    size_mb = {
+        path.name: os.path.getsize(path) / 1024 / 1024
+        for path in output_path.glob('*.onnx')
+    }
+    print("ONNX export finished: " + ", ".join(f"{name} {size:.1f}MB" for name, size in sorted(size_mb.items())))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Download the embedding models.")
+    parser.add_argument('--models', nargs='+', choices=list(EMBEDDING_MODELS), default=[EMBEDDING_MODEL],
+                        help=f"models to download (default: {EMBEDDING_MODEL})")
+    parser.add_argument('--all', action='store_true', help="download every registered model")
+    parser.add_argument('--onnx', action='store_true',
+                        help="also export the model to ONNX (fp32 + int8) for EMBEDDING_RUNTIME=onnx|onnx-int8")
+    parser.add_argument('--no-quantize', action='store_true', help="skip the int8 copy of the ONNX export")
+    parser.add_argument('--reranker', nargs='?', const=RERANKER_MODEL, choices=list(RERANKER_MODELS),
+                        help=f"also download a cross-encoder reranker (default: {RERANKER_MODEL})")
+    args = parser.parse_args(argv)
+
+    for model_name in (list(EMBEDDING_MODELS) if args.all else args.models):
+        download_model(model_name)
+        if args.onnx:
+            export_onnx(model_name, quantize=not args.no_quantize)
+    if args.reranker:
+        download_reranker(args.reranker)
+
 if __name__ == "__main__":
-    download_model()
+    main()
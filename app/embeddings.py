@@ -0,0 +1,181 @@
+"""
+Embedding model and vector store settings shared by the indexer and the chatbot.
+"""
+import os
+from pathlib import Path
+from typing import List, Union
+
+import numpy as np
+
+CHROMA_PATH = Path(__file__).parent / "chroma_db"
+MODELS_DIR = Path(__file__).parent / "models"
+COLLECTION_NAME = "counselling_data"
+
+# Embedding models that can be downloaded and indexed. Models trained with
+# instruction prefixes (e5) need them on both queries and documents.
+EMBEDDING_MODELS = {
+    'all-MiniLM-L6-v2': {
+        'repo': 'sentence-transformers/all-MiniLM-L6-v2',
+        'dim': 384,
+    },
+    'paraphrase-multilingual-MiniLM-L12-v2': {
+        'repo': 'sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2',
+        'dim': 384,
+    },
+    'multilingual-e5-small': {
+        'repo': 'intfloat/multilingual-e5-small',
+        'dim': 384,
+        'query_prefix': 'query: ',
+        'document_prefix': 'passage: ',
+    },
+}
+EMBEDDING_MODEL = os.getenv('EMBEDDING_MODEL', 'all-MiniLM-L6-v2')
+# Collections built before the model was recorded in their metadata
+LEGACY_EMBEDDING_MODEL = 'all-MiniLM-L6-v2'
+MODEL_PATH = MODELS_DIR / EMBEDDING_MODEL
+
+# torch: SentenceTransformer on PyTorch | onnx: ONNX Runtime fp32 | onnx-int8: dynamically quantized
+EMBEDDING_RUNTIME = os.getenv('EMBEDDING_RUNTIME', 'torch')
+EMBEDDING_RUNTIMES = ('torch', 'onnx', 'onnx-int8')
+# ONNX Runtime intra-op threads (0 lets onnxruntime decide)
+ONNX_THREADS = int(os.getenv('ONNX_THREADS', 0))
+ONNX_MAX_LENGTH = 256
+ONNX_MODEL_FILE = 'model.onnx'
+ONNX_QUANTIZED_MODEL_FILE = 'model_int8.onnx'
+
+
+def model_spec(model_name: str = EMBEDDING_MODEL) -> dict:
+    try:
+        return EMBEDDING_MODELS[model_name]
+    except KeyError:
+        raise ValueError(f"Unknown embedding model: {model_name} (choose from {', '.join(EMBEDDING_MODELS)})")
+
+
+def model_path(model_name: str = EMBEDDING_MODEL) -> Path:
+    """Local directory of a downloaded model."""
+    model_spec(model_name)
+    return MODELS_DIR / model_name
+
+
+def onnx_model_path(model_path: Path = MODEL_PATH) -> Path:
+    """Directory holding the ONNX export of a downloaded model."""
+    return model_path.parent / f"{model_path.name}-onnx"
+
+
+def document_texts(texts: List[str], model_name: str = EMBEDDING_MODEL) -> List[str]:
+    """Texts as they should be passed to the model when indexing (document prefix added)."""
+    prefix = model_spec(model_name).get('document_prefix', '')
+    return [prefix + text for text in texts] if prefix else list(texts)
+
+
+def collection_embedding_model(collection) -> str:
+    """Name of the model a Chroma collection or NumPy index was built with."""
+    return (collection.metadata or {}).get('embedding_model', LEGACY_EMBEDDING_MODEL)
+
+
+def check_embedding_model(collection, model_name: str = EMBEDDING_MODEL):
+    """Raise if the index was built with a different model than the one used for queries."""
+    indexed_model = collection_embedding_model(collection)
+    if indexed_model != model_name:
+        raise ValueError(
+            f"The vector index was built with {indexed_model} but EMBEDDING_MODEL is {model_name}. "
+            f"Set EMBEDDING_MODEL={indexed_model} or re-index with "
+            f"create_embeddings.py --model {model_name} --mode full."
+        )
+
+
+class OnnxEmbeddingFunction:
+    """Sentence embeddings from an ONNX export of a SentenceTransformer.
+
+    Reproduces the SentenceTransformer pipeline of the registered models (mean
+    pooling over the attention mask, then L2 normalization) with only onnxruntime and tokenizers, so
+    serving does not import torch. It works as a Chroma embedding function and,
+    through ``encode``, in place of a SentenceTransformer when indexing.
+    """
+
+    def __init__(self, model_dir: Path, quantized: bool = True, max_length: int = ONNX_MAX_LENGTH,
+                 threads: int = ONNX_THREADS):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        model_dir = Path(model_dir)
+        model_file = model_dir / (ONNX_QUANTIZED_MODEL_FILE if quantized else ONNX_MODEL_FILE)
+        if not model_file.exists():
+            raise FileNotFoundError(
+                f"{model_file} not found. Please run download_models.py --onnx first."
+            )
+
+        self.tokenizer = Tokenizer.from_file(str(model_dir / 'tokenizer.json'))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        if self.tokenizer.padding is None:
+            # BERT vocabularies pad with [PAD], XLM-R (multilingual) ones with <pad>
+            pad_token = next(
+                (token for token in ('[PAD]', '<pad>') if self.tokenizer.token_to_id(token) is not None), '[PAD]'
+            )
+            self.tokenizer.enable_padding(pad_id=self.tokenizer.token_to_id(pad_token) or 0, pad_token=pad_token)
+
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(str(model_file), options, providers=['CPUExecutionProvider'])
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+    def encode(self, sentences: Union[str, List[str]], batch_size: int = 32, convert_to_numpy: bool = True,
+               **kwargs) -> np.ndarray:
+        """Embed sentences in batches; returns a (n, dim) float32 array of unit vectors."""
+        if isinstance(sentences, str):
+            sentences = [sentences]
+
+        outputs = []
+        for start in range(0, len(sentences), batch_size):
+            encodings = self.tokenizer.encode_batch(list(sentences[start:start + batch_size]))
+            input_ids = np.array([encoding.ids for encoding in encodings], dtype=np.int64)
+            attention_mask = np.array([encoding.attention_mask for encoding in encodings], dtype=np.int64)
+            feeds = {'input_ids': input_ids, 'attention_mask': attention_mask}
+            if 'token_type_ids' in self.input_names:
+                feeds['token_type_ids'] = np.array([encoding.type_ids for encoding in encodings], dtype=np.int64)
+
+            token_embeddings = self.session.run(None, feeds)[0]
+            mask = attention_mask[..., None].astype(np.float32)
+            pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            norms = np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            outputs.append((pooled / norms).astype(np.float32))
+
+        if not outputs:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.concatenate(outputs)
+
+    def __call__(self, input: List[str]) -> List[np.ndarray]:
+        return list(self.encode(list(input)))
+
+
+class PrefixedEmbeddingFunction:
+    """Adds the model's query prefix before delegating to another embedding function."""
+
+    def __init__(self, embedding_function, prefix: str):
+        self.embedding_function = embedding_function
+        self.prefix = prefix
+
+    def __call__(self, input: List[str]):
+        return self.embedding_function([self.prefix + text for text in input])
+
+
+def get_embedding_function(model_name: str = EMBEDDING_MODEL, runtime: str = EMBEDDING_RUNTIME):
+    """Chroma embedding function for queries, backed by the locally downloaded model.
+
+    ``runtime`` selects SentenceTransformer on torch or the ONNX export (fp32 or
+    int8). chromadb (and through it sentence-transformers/torch) is imported
+    here rather than at module import, so importing this module stays cheap.
+    """
+    if runtime not in EMBEDDING_RUNTIMES:
+        raise ValueError(f"Unknown embedding runtime: {runtime} (choose from {', '.join(EMBEDDING_RUNTIMES)})")
+    path = model_path(model_name)
+    if runtime != 'torch':
+        embedding_function = OnnxEmbeddingFunction(onnx_model_path(path), quantized=runtime == 'onnx-int8')
+    else:
+        from chromadb.utils import embedding_functions
+
+        embedding_function = embedding_functions.SentenceTransformerEmbeddingFunction(model_name=str(path))
+
+    prefix = model_spec(model_name).get('query_prefix')
+    return PrefixedEmbeddingFunction(embedding_function, prefix) if prefix else embedding_function
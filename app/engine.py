@@ -0,0 +1,97 @@
+"""
+SQLite engine factory with tuning profiles.
+
+- import:  bulk loading; trades durability for speed (no fsync, in-memory journal)
+- serving: read-only pooled connections for the chatbot with memory-mapped I/O;
+  it never writes to the file (WAL mode is set once by the importer)
+"""
+import logging
+import os
+import sqlite3
+from pathlib import Path
+from typing import Dict, Optional, Union
+from urllib.parse import quote
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+logger = logging.getLogger(__name__)
+
+SQLITE_CACHE_SIZE_KB = int(os.getenv('SQLITE_CACHE_SIZE_KB', 64 * 1024))
+SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+SQLITE_POOL_SIZE = int(os.getenv('SQLITE_POOL_SIZE', 8))
+
+SQLITE_PROFILES = {
+    'default': {
+        'read_only': False,
+        'pragmas': {}
+    },
+    'import': {
+        'read_only': False,
+        'pragmas': {
+            'journal_mode': 'MEMORY',
+            'synchronous': 'OFF',
+            'temp_store': 'MEMORY',
+            'cache_size': -SQLITE_CACHE_SIZE_KB
+        }
+    },
+    'serving': {
+        'read_only': True,
+        'pool_size': SQLITE_POOL_SIZE,
+        'pragmas': {
+            'temp_store': 'MEMORY',
+            'cache_size': -SQLITE_CACHE_SIZE_KB,
+            'mmap_size': SQLITE_MMAP_SIZE,
+            'query_only': 'ON'
+        }
+    }
+}
+
+
+def enable_wal(db_path: Union[str, Path]):
+    """Switch the database file to WAL mode. The setting persists in the file."""
+    conn = sqlite3.connect(str(db_path))
+    try:
+        mode = conn.execute("PRAGMA journal_mode=WAL").fetchone()[0]
+        if mode.lower() != 'wal':
+            logger.warning(f"Could not enable WAL for {db_path} (journal_mode={mode})")
+    finally:
+        conn.close()
+
+
+def create_sqlite_engine(db_path: Union[str, Path], profile: str = 'default',
+                         pragmas: Optional[Dict[str, object]] = None, **engine_kwargs) -> Engine:
+    """Create a SQLAlchemy engine for a SQLite file using one of SQLITE_PROFILES.
+
+    ``pragmas`` overrides or extends the profile's pragmas; extra keyword
+    arguments are passed to ``create_engine``.
+    """
+    if profile not in SQLITE_PROFILES:
+        raise ValueError(f"Unknown SQLite profile: {profile}")
+    settings = SQLITE_PROFILES[profile]
+    connection_pragmas = {**settings['pragmas'], **(pragmas or {})}
+
+    if settings['read_only']:
+        if not Path(db_path).exists():
+            raise FileNotFoundError(f"SQLite database not found: {db_path}")
+        uri = f"file:{quote(str(Path(db_path).resolve()))}?mode=ro"
+        engine_kwargs.setdefault('poolclass', QueuePool)
+        engine_kwargs.setdefault('pool_size', settings['pool_size'])
+        engine_kwargs.setdefault('max_overflow', settings['pool_size'])
+        engine = create_engine(
+            'sqlite://',
+            creator=lambda: sqlite3.connect(uri, uri=True, check_same_thread=False),
+            **engine_kwargs
+        )
+    else:
+        engine = create_engine(f'sqlite:///{db_path}', **engine_kwargs)
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in connection_pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    return engine
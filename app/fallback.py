@@ -0,0 +1,383 @@
+"""
+Fast answers without an LLM, assembled from the expert labeling data.
+
+At build time every labeled student is reduced to the parts a counselling
+answer is made of: the opening of the expert comment (situation analysis),
+the comment's recommendation sentences (career direction), the plans agreed
+on in the counselling summaries (action plan) and the ranked job categories.
+Two keyword indexes are precomputed over the summaries and comments, using
+the same particle-stripped terms as the FTS search:
+
+- term -> students, with term frequencies, to find the nearest cases, and
+- term -> job categories, how much more often each category was recommended
+  (priority-weighted) to the students using the term than to all students.
+
+A query is answered with a few dictionary lookups (a query term that is not
+indexed matches longer indexed words as a prefix), so it takes milliseconds
+and needs neither the embedding model, Chroma nor the network. The chatbot
+uses it when the LLM is unavailable or skipped under load, and the GUI while
+the chatbot is loading or when it failed to load.
+
+Usage (from the project root):
+    python -m app.fallback
+    python -m app.fallback --query "경제에 관심이 많고 한국은행에서 일하고 싶어요"
+"""
+import argparse
+import bisect
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from app.metrics import configure_logging
+from app.record_reader import (
+    JOB_CATEGORY_FILES, LABELING_DATA_PATH, SCHOOL_LEVEL_FILES, iter_json_records, school_level_in
+)
+from app.recommender import PRIORITY_WEIGHTS, mine_category_names
+from app.search import query_terms
+from app.tokens import truncate_to_tokens
+
+logger = logging.getLogger(__name__)
+
+FALLBACK_INDEX_PATH = Path(os.getenv('FALLBACK_INDEX_PATH', Path(__file__).parent / "fallback_index.json"))
+# Labeled cases quoted / job categories listed per answer
+FALLBACK_CASES = int(os.getenv('FALLBACK_CASES', 2))
+FALLBACK_JOBS = int(os.getenv('FALLBACK_JOBS', 3))
+
+# Indexed words a query term may match as a prefix
+PREFIX_EXPANSIONS = 20
+# Terms used by more than this share of students say nothing about a case
+MAX_DOCUMENT_FREQUENCY = 0.3
+# Job categories kept per term in the keyword -> job index
+JOBS_PER_TERM = 5
+SENTENCE_TOKENS = 80
+# BM25 term-frequency saturation and document-length normalization
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Same-school-level cases rank ahead when the question states a level
+SCHOOL_LEVEL_BOOST = 1.5
+
+SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+# Plans agreed on in a session ("...알아보기로 하였다", "...알아볼 계획이다")
+PLAN_SENTENCE = re.compile(r'기로\s?(?:하였|했|함|한다|정했|결정)|(?:계획|예정)이다')
+# Nearest cases searched for direction and action sentences when the closest ones have none
+CANDIDATE_CASES = 10
+# Ordinals experts phrase differently ("1차 추천 직무는 …" / "첫 번째 추천 직무는 …")
+ORDINAL = re.compile(r'[1-3]\s*(?:순위|차)|(?:첫|두|세)\s*번째|(?:첫|둘|셋)째')
+
+DEFAULT_SITUATION = "자신의 미래에 대해 생각하고 있다는 것이 매우 좋습니다."
+DEFAULT_DIRECTIONS = [
+    "자신의 관심사와 재능을 파악해보세요",
+    "다양한 직업에 대해 알아보세요",
+    "체험 활동을 통해 경험을 쌓아보세요"
+]
+DEFAULT_ACTIONS = [
+    "진로 적성 검사를 받아보세요",
+    "관심 있는 분야의 전문가와 대화해보세요",
+    "학교 진로 상담 선생님과 상담해보세요"
+]
+
+
+def sentences(text: str) -> List[str]:
+    return [sentence.strip() for sentence in SENTENCE_END.split(' '.join((text or '').split())) if sentence.strip()]
+
+
+def distinct(sentences: Iterable[str], limit: int) -> List[str]:
+    """Up to ``limit`` sentences, skipping repeats that differ only in ordinals, spacing or punctuation."""
+    seen = set()
+    kept = []
+    for sentence in sentences:
+        key = re.sub(r'[\W_]+', '', ORDINAL.sub('', sentence))
+        if key in seen:
+            continue
+        seen.add(key)
+        kept.append(sentence)
+        if len(kept) >= limit:
+            break
+    return kept
+
+
+def iter_students() -> Iterator[dict]:
+    """Yield each labeled student once with its school level (inferred for job-category files)."""
+    seen = set()
+    files = [(level, path) for level, path in SCHOOL_LEVEL_FILES.items()] + \
+        [(None, path) for path in JOB_CATEGORY_FILES.values()]
+    for level, relative_path in files:
+        file_path = LABELING_DATA_PATH / relative_path
+        if not file_path.exists():
+            logger.warning(f"File not found: {file_path}")
+            continue
+        for record in iter_json_records(file_path):
+            if record['student_idx'] in seen:
+                continue
+            seen.add(record['student_idx'])
+            record['school_level'] = level or school_level_in(
+                ((record.get('expert_comment') or {}).get('ko') or '')
+            )
+            yield record
+
+
+def student_case(record: dict) -> dict:
+    """The parts of a labeled student used in an answer."""
+    comment = sentences((record.get('expert_comment') or {}).get('ko'))
+    summaries = [summary['summary'] for summary in record.get('counselling_summaries', [])]
+    plans = [sentence for summary in summaries for sentence in sentences(summary) if PLAN_SENTENCE.search(sentence)]
+    recommendations = sorted(record.get('recommended_job_categories') or [], key=lambda r: r['priority'])
+    return {
+        'student_idx': record['student_idx'],
+        'school_level': record.get('school_level'),
+        'situation': [truncate_to_tokens(sentence, SENTENCE_TOKENS) for sentence in comment[:2]],
+        'directions': [truncate_to_tokens(sentence, SENTENCE_TOKENS) for sentence in comment if '추천' in sentence][:3],
+        # Later sessions hold the more concrete plans
+        'actions': [truncate_to_tokens(sentence, SENTENCE_TOKENS) for sentence in reversed(plans)][:3],
+        'jobs': [recommendation['job_category_idx'] for recommendation in recommendations]
+    }
+
+
+class FallbackResponder:
+    """Keyword-indexed labeled cases and job categories, formatted as a three-part answer."""
+
+    def __init__(self, cases: List[dict], postings: Dict[str, list], term_jobs: Dict[str, list],
+                 job_names: Dict[int, str], metadata: Optional[dict] = None):
+        self.cases = cases
+        self.postings = postings
+        self.term_jobs = term_jobs
+        self.job_names = job_names
+        self.metadata = metadata or {}
+        self.vocabulary = sorted(postings)
+        self.by_student = {case['student_idx']: i for i, case in enumerate(cases)}
+        average = sum(case.get('length', 0) for case in cases) / len(cases) if cases else 1
+        self.length_norms = [
+            BM25_K1 * (1 - BM25_B + BM25_B * case.get('length', 0) / (average or 1)) for case in cases
+        ]
+
+    @classmethod
+    def build(cls, records: Iterable[dict], metadata: Optional[dict] = None) -> 'FallbackResponder':
+        records = list(records)
+        job_names = mine_category_names(records)
+        cases = []
+        postings = defaultdict(list)
+        for position, record in enumerate(records):
+            cases.append(student_case(record))
+            text = ' '.join(summary['summary'] for summary in record.get('counselling_summaries', []))
+            text += ' ' + ((record.get('expert_comment') or {}).get('ko') or '')
+            counts = Counter(term for sentence in sentences(text) for term in query_terms(sentence))
+            cases[-1]['length'] = sum(counts.values())
+            for term, count in counts.items():
+                postings[term].append([position, count])
+
+        limit = max(1, int(MAX_DOCUMENT_FREQUENCY * len(records)))
+        postings = {term: entries for term, entries in postings.items() if len(entries) <= limit}
+
+        def job_weights(positions):
+            weights = Counter()
+            for position in positions:
+                for recommendation in records[position].get('recommended_job_categories') or []:
+                    weights[recommendation['job_category_idx']] += PRIORITY_WEIGHTS.get(recommendation['priority'], 0.0)
+            total = sum(weights.values())
+            return {category: weight / total for category, weight in weights.items()} if total else {}
+
+        # A term points to the categories recommended more often among its students than overall,
+        # so common words and common categories do not dominate
+        prior = job_weights(range(len(records)))
+        term_jobs = {}
+        for term, entries in postings.items():
+            shares = job_weights(position for position, _ in entries)
+            excess = Counter({category: share - prior[category] for category, share in shares.items()
+                              if share > prior[category]})
+            if excess:
+                term_jobs[term] = [[category, weight] for category, weight in excess.most_common(JOBS_PER_TERM)]
+
+        logger.info(f"Built fallback index: {len(cases)} students, {len(postings)} terms, {len(job_names)} job names")
+        return cls(cases, postings, term_jobs, job_names, metadata={**(metadata or {}), 'students': len(cases)})
+
+    def save(self, path: Path = FALLBACK_INDEX_PATH):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        index = {
+            'metadata': self.metadata,
+            'job_names': {str(category): name for category, name in self.job_names.items()},
+            'cases': self.cases,
+            'postings': self.postings,
+            'term_jobs': self.term_jobs
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(index, f, ensure_ascii=False, separators=(',', ':'))
+
+    @classmethod
+    def load(cls, path: Path = FALLBACK_INDEX_PATH) -> 'FallbackResponder':
+        with open(path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        return cls(
+            index['cases'], index['postings'], index['term_jobs'],
+            {int(category): name for category, name in index['job_names'].items()},
+            metadata=index.get('metadata')
+        )
+
+    def _expand(self, term: str) -> List[str]:
+        """The term when indexed, else the indexed words starting with it (의사 is not 의사소통)."""
+        if term in self.postings:
+            return [term]
+        start = bisect.bisect_left(self.vocabulary, term)
+        matches = []
+        for word in self.vocabulary[start:start + PREFIX_EXPANSIONS]:
+            if not word.startswith(term):
+                break
+            matches.append(word)
+        return matches
+
+    def _term_counts(self, term: str) -> Dict[int, int]:
+        """Occurrences per case of a query term, its prefix matches counted as the term itself."""
+        counts = defaultdict(int)
+        for word in self._expand(term):
+            for position, count in self.postings[word]:
+                counts[position] += count
+        return counts
+
+    def search(self, query: str, top_k: int = FALLBACK_CASES) -> List[dict]:
+        """Labeled cases ranked by BM25 over the query terms, best first."""
+        scores = defaultdict(float)
+        for term in query_terms(query):
+            counts = self._term_counts(term)
+            if not counts:
+                continue
+            # One idf for all prefix matches, so a rare spelling does not outweigh the term
+            idf = math.log(1 + len(self.cases) / len(counts))
+            for position, count in counts.items():
+                scores[position] += idf * count * (BM25_K1 + 1) / (count + self.length_norms[position])
+
+        level = school_level_in(query)
+        if level:
+            for position in scores:
+                if self.cases[position]['school_level'] == level:
+                    scores[position] *= SCHOOL_LEVEL_BOOST
+        best = sorted(scores, key=scores.get, reverse=True)[:top_k]
+        return [self.cases[position] for position in best]
+
+    def recommend_jobs(self, query: str, top_k: int = FALLBACK_JOBS) -> List[str]:
+        """Job category names from the keyword -> job index, best first."""
+        scores = defaultdict(float)
+        for term in query_terms(query):
+            words = self._expand(term)
+            users = sum(len(self.postings[word]) for word in words)
+            if not users:
+                continue
+            idf = math.log(1 + len(self.cases) / users)
+            for word in words:
+                # Each matching word's job shares, weighted by how many students use it
+                share = len(self.postings[word]) / users
+                for category, weight in self.term_jobs.get(word, ()):
+                    scores[category] += idf * share * weight
+        names = []
+        for category in sorted(scores, key=scores.get, reverse=True):
+            name = self.job_names.get(category)
+            if name and name not in names:
+                names.append(name)
+            if len(names) >= top_k:
+                break
+        return names
+
+    def cases_for(self, student_ids: Iterable[str]) -> List[dict]:
+        """Labeled cases of the given students (e.g. the chatbot's retrieved sessions), in order."""
+        positions = dict.fromkeys(self.by_student[student] for student in student_ids if student in self.by_student)
+        return [self.cases[position] for position in positions]
+
+    def answer(self, query: str, student_ids: Optional[Iterable[str]] = None, jobs: Optional[List[str]] = None,
+               notice: str = "") -> str:
+        """Three-part answer (상황 분석 / 진로 방향 / 행동 계획) for a question.
+
+        ``student_ids`` and ``jobs`` let a caller that already retrieved cases
+        and ranked job categories pass them in; otherwise both come from the
+        keyword indexes. Without any matching case the generic advice is used.
+        """
+        given = self.cases_for(student_ids) if student_ids else []
+        pool = given + [case for case in self.search(query, CANDIDATE_CASES) if case not in given]
+        cases = pool[:FALLBACK_CASES]
+        if not jobs:
+            jobs = self.recommend_jobs(query)
+        if not jobs:
+            jobs = [self.job_names[category] for case in cases for category in case['jobs'][:1]
+                    if category in self.job_names]
+
+        situation = [case['situation'][0] for case in cases if case['situation']]
+        # Nearest cases first; further ones only fill in what the closest lack
+        directions = distinct((sentence for case in pool for sentence in case['directions'][:1]), FALLBACK_CASES)
+        actions = distinct((sentence for case in pool for sentence in case['actions'][:2]), 3)
+
+        lines = [notice, ""] if notice else []
+        lines.append("**1. 질문자의 상황 분석**")
+        if situation:
+            lines.append("비슷한 고민을 한 학생들의 상담에서 전문가는 이렇게 분석했습니다.")
+            lines.extend(f"- {sentence}" for sentence in situation)
+        else:
+            lines.append(DEFAULT_SITUATION)
+
+        lines.append("\n**2. 추천하는 진로 방향**")
+        if jobs:
+            lines.append(f"- 비슷한 상담 사례에서 추천된 직무 계열: {', '.join(dict.fromkeys(jobs))}")
+        lines.extend(f"- {sentence}" for sentence in directions or DEFAULT_DIRECTIONS)
+
+        lines.append("\n**3. 구체적인 행동 제안**")
+        if actions:
+            lines.append("비슷한 학생들이 상담 후 실천하기로 한 일입니다.")
+        lines.extend(f"- {sentence}" for sentence in actions or DEFAULT_ACTIONS)
+        return "\n".join(lines)
+
+    def stats(self) -> dict:
+        return {'cases': len(self.cases), 'terms': len(self.postings), 'job_names': len(self.job_names)}
+
+
+_responder = None
+_responder_lock = threading.Lock()
+
+
+def get_fallback_responder(path: Path = FALLBACK_INDEX_PATH) -> FallbackResponder:
+    """Shared responder: the precomputed index, else built from the labeling data, else generic advice only."""
+    global _responder
+    with _responder_lock:
+        if _responder is not None:
+            return _responder
+        t0 = time.perf_counter()
+        if Path(path).exists():
+            _responder = FallbackResponder.load(path)
+        elif LABELING_DATA_PATH.exists():
+            logger.info(f"{path} not found; building the fallback index in memory (run python -m app.fallback to precompute it)")
+            _responder = FallbackResponder.build(iter_students())
+        else:
+            logger.warning("No fallback index or labeling data; fallback answers use generic advice only")
+            _responder = FallbackResponder([], {}, {}, {})
+        logger.info(f"Fallback responder ready in {(time.perf_counter() - t0) * 1000:.0f}ms: {_responder.stats()}")
+    return _responder
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Build the keyword index behind the no-LLM fallback answers.")
+    parser.add_argument('--output', type=Path, default=FALLBACK_INDEX_PATH,
+                        help=f"index file to write (default: {FALLBACK_INDEX_PATH})")
+    parser.add_argument('--query', help="print the answer to a question after building")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    configure_logging()
+    args = parse_args(argv)
+
+    responder = FallbackResponder.build(iter_students())
+    responder.save(args.output)
+    logger.info(f"Saved fallback index to {args.output} ({args.output.stat().st_size / 1e6:.1f} MB)")
+
+    if args.query:
+        t0 = time.perf_counter()
+        answer = responder.answer(args.query)
+        print(answer)
+        print(f"\n({(time.perf_counter() - t0) * 1000:.1f}ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,147 +2,221 @@
 AI 진로 상담 챗봇 GUI
 """
 import os
-import gradio as gr
+import asyncio
+import threading
+import time
 from pathlib import Path
 from dotenv import load_dotenv
-from career_chatbot import CareerChatbot
 import logging
 
+from app.metrics import FALLBACKS, configure_logging, observe_timings, record_trace, start_metrics_server
+
 # 환경 변수 로드
 load_dotenv()
 
 # 로깅 설정
-logging.basicConfig(level=logging.INFO)
+configure_logging()
 logger = logging.getLogger(__name__)
 
+# 동시에 처리할 채팅 요청 수 (Gemini 호출 수는 LLM_MAX_CONCURRENCY로 별도 제한)
+GUI_CONCURRENCY_LIMIT = int(os.getenv('GUI_CONCURRENCY_LIMIT', 16))
+# 챗봇이 아직 로딩 중일 때 첫 요청이 기다리는 최대 시간(초), 넘으면 사례 기반 로컬 답변
+CHATBOT_READY_TIMEOUT = float(os.getenv('CHATBOT_READY_TIMEOUT', 60))
+
+EXAMPLE_QUESTIONS = [
+    "저는 고등학생인데 경제에 관심이 많고 한국은행에서 일하고 싶어요. 어떤 준비를 해야 할까요?",
+    "중학생인데 의사가 되고 싶어요. 어떤 과목을 잘해야 하나요?",
+    "컴퓨터나 게임 만드는 것에 관심이 있는 초등학생입니다. 어떤 직업이 좋을까요?",
+    "고등학생인데 진로를 아직 못 정했어요. 어떻게 찾아야 할까요?"
+]
+
+# 로컬 답변 앞에 붙이는 안내 문구 (fallback 사유별)
+FALLBACK_NOTICES = {
+    'loading': "상담 챗봇을 준비하는 중이라, 비슷한 고민을 한 학생들의 실제 상담 사례로 먼저 답변드립니다.",
+    'unavailable': "지금은 AI 상담을 사용할 수 없어, 비슷한 고민을 한 학생들의 실제 상담 사례로 답변드립니다.",
+    'error': "답변을 만드는 중 문제가 생겨, 비슷한 고민을 한 학생들의 실제 상담 사례로 대신 답변드립니다.",
+}
+
+# 로컬 답변마저 만들 수 없을 때의 고정 안내
+FALLBACK_APOLOGY = "죄송합니다. 지금은 답변을 드릴 수 없어요. 잠시 후 다시 질문해 주세요."
+
+# 시작 단계 이름 (시작 시간 보고용)
+STARTUP_PHASES = {
+    'import_gradio': 'gradio import',
+    'ui_build': 'UI 구성',
+    'import_chatbot': '챗봇 모듈 import',
+    'model_load': '임베딩 모델 로드',
+    'collection_open': 'Chroma 컬렉션 열기',
+    'reranker_load': 'reranker 로드',
+    'llm_client': 'Gemini 클라이언트',
+    'recommender_load': '직무 추천기 로드',
+    'first_query': '첫 검색(warm-up)',
+}
+
+
+def history_pairs(history):
+    """Gradio 채팅 히스토리([질문, 답변] 목록 또는 role/content 메시지 목록)를 (질문, 답변) 목록으로 변환"""
+    pairs = []
+    question = None
+    for item in history or []:
+        if isinstance(item, dict):
+            if item.get('role') == 'user':
+                question = item.get('content')
+            elif item.get('role') == 'assistant' and isinstance(question, str):
+                if isinstance(item.get('content'), str):
+                    pairs.append((question, item['content']))
+                question = None
+        elif len(item) == 2 and isinstance(item[0], str) and isinstance(item[1], str):
+            pairs.append((item[0], item[1]))
+    return pairs
+
+
 class CareerGUI:
-    def __init__(self):
-        """GUI 초기화"""
+    def __init__(self, background=True):
+        """GUI 초기화
+
+        CareerChatbot(임베딩 모델, ChromaDB, Gemini)은 무거우므로 백그라운드 스레드에서
+        로딩하고, 그동안 웹 서버는 바로 포트를 열고 요청을 받습니다.
+        """
+        self.chatbot = None
+        self.use_real_chatbot = False
+        self.chatbot_ready = threading.Event()
+        self.start_time = time.perf_counter()
+        self.startup_timings = {}
+
+        if background:
+            threading.Thread(target=self.load_chatbot, name='chatbot-loader', daemon=True).start()
+        else:
+            self.load_chatbot()
+
+    def load_fallback(self):
+        """로컬 답변 색인 로드 (실패해도 로그만 남기고, 로컬 답변이 필요할 때 다시 시도)"""
+        try:
+            t0 = time.perf_counter()
+            from app.fallback import get_fallback_responder
+            get_fallback_responder()
+            # 챗봇 준비 시간과 별개로 기록 (시작 보고보다 늦게 끝날 수 있음)
+            elapsed = (time.perf_counter() - t0) * 1000
+            observe_timings({'fallback_load': elapsed})
+            logger.info(f"로컬 답변 색인 로드 {elapsed:.0f}ms (챗봇 로딩과 병렬)")
+        except Exception as e:
+            logger.warning(f"로컬 답변 색인 로드 실패: {e}")
+
+    def load_chatbot(self):
+        """로컬 답변 색인과 CareerChatbot 생성 및 warm-up (챗봇이 실패하면 로컬 답변 모드)"""
+        # 색인은 챗봇과 병렬로 로드해 챗봇 준비를 늦추지 않음 (로딩 중 요청은 색인이 준비되면 답변)
+        threading.Thread(target=self.load_fallback, name='fallback-loader', daemon=True).start()
         try:
+            t0 = time.perf_counter()
+            from app.career_chatbot import CareerChatbot
+            self.startup_timings['import_chatbot'] = (time.perf_counter() - t0) * 1000
+
             # CareerChatbot 인스턴스 생성
-            self.chatbot = CareerChatbot()
+            chatbot = CareerChatbot()
+            self.startup_timings.update(chatbot.startup_timings)
+            chatbot.warm_up()
+            self.startup_timings['first_query'] = chatbot.startup_timings['first_query']
+
+            self.chatbot = chatbot
             self.use_real_chatbot = True
             logger.info("CareerChatbot을 성공적으로 초기화했습니다.")
         except Exception as e:
             logger.warning(f"CareerChatbot 초기화 실패: {e}")
-            logger.info("모의 응답 모드로 실행합니다.")
+            logger.info("로컬 답변 모드로 실행합니다 (검색된 상담 사례 기반, LLM 없음).")
             self.use_real_chatbot = False
+        finally:
+            self.chatbot_ready.set()
+            self.log_startup_report()
 
-    def chat_response(self, message, history):
+    def log_startup_report(self):
+        """시작 단계별 소요 시간 로그"""
+        phases = ", ".join(
+            f"{label} {self.startup_timings[name]:.0f}ms"
+            for name, label in STARTUP_PHASES.items() if name in self.startup_timings
+        )
+        total = (time.perf_counter() - self.start_time) * 1000
+        logger.info(f"시작 시간: {phases} (챗봇 준비까지 총 {total:.0f}ms)")
+        # 단계별 시작 시간을 지표(career_stage_seconds)와 trace 로그에도 기록
+        observe_timings(self.startup_timings)
+        record_trace('startup', {**self.startup_timings, 'ready': total},
+                     mode='chatbot' if self.use_real_chatbot else 'fallback')
+
+    async def chat_response(self, message, history, session_id=None):
         """
-        채팅 응답 생성
+        채팅 응답 생성 (비동기 제너레이터: 생성되는 대로 화면에 표시)
         
         Args:
             message (str): 사용자 메시지
-            history (list): 채팅 히스토리
+            history (list): 채팅 히스토리 (세션 초기화/복원에 사용)
+            session_id (str): 브라우저 세션 ID (없으면 이전 대화 없이 답변)
         
-        Returns:
-            str: 응답 메시지
+        Yields:
+            str: 지금까지 생성된 응답 메시지
         """
         if not message.strip():
-            return "안녕하세요! 진로에 관한 궁금한 점을 언제든 물어보세요."
+            yield "안녕하세요! 진로에 관한 궁금한 점을 언제든 물어보세요."
+            return
         
+        if not self.chatbot_ready.is_set():
+            # 챗봇 로딩이 끝날 때까지 (이벤트 루프를 막지 않고) 기다림
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self.chatbot_ready.wait, CHATBOT_READY_TIMEOUT)
+
         if self.use_real_chatbot:
+            response = ""
             try:
-                # CareerChatbot을 사용한 실제 응답 생성
-                response = self.chatbot.generate_response(message)
-                return response
+                # 대화 지우기 후에는 세션을 새로 시작하고, 서버에서 세션이 사라졌으면 화면 기록으로 복원
+                if session_id is not None:
+                    self.chatbot.get_session(session_id, history_pairs(history))
+                # CareerChatbot을 사용한 실제 응답 생성 (토큰 스트리밍)
+                async for text in self.chatbot.astream_response(message, session_id=session_id):
+                    response += text
+                    yield response
+                return
                 
             except Exception as e:
                 logger.error(f"CareerChatbot 응답 생성 중 오류: {e}")
-                logger.info("모의 응답으로 전환합니다.")
-                # 오류 시 모의 응답으로 fallback
-                pass
-        
-        # 모의 응답 생성
-        return self.get_mock_response(message)
-
-    def get_mock_response(self, query):
-        """모의 응답 생성 (API 할당량 문제 해결용)"""
-        # 키워드 기반 간단한 응답 생성
-        if "경제" in query or "한국은행" in query:
-            return """
-안녕하세요! 경제학과 한국은행에 관심을 가지고 계시는군요. 훌륭한 목표입니다! 
-
-**1. 질문자의 상황 분석**
-고등학생으로서 경제학에 관심을 가지고 있고, 한국은행이라는 구체적인 목표 기관이 있어서 매우 좋습니다. 이는 명확한 진로 방향성을 보여줍니다.
-
-**2. 추천하는 진로 방향**
-- 경제학과 진학을 목표로 하세요
-- 통계학, 수학 등 관련 학과도 고려해볼 수 있습니다
-- 한국은행 외에도 금융권 전반에 대해 알아보세요
-
-**3. 구체적인 행동 제안**
-- 수학과 사회 과목을 열심히 공부하세요
-- 경제 관련 책을 읽어보세요 (맨큐의 경제학 원리 등)
-- 한국은행 홈페이지를 방문해서 채용 정보를 확인해보세요
-- 경제학과가 있는 대학들을 알아보고 입시 준비를 하세요
-
-화이팅하세요! 여러분의 꿈을 응원합니다! 🎓📈
-            """
-        elif "의사" in query:
-            return """
-의사가 되고 싶다는 꿈을 가지고 계시는군요! 
-
-**1. 질문자의 상황 분석**
-의료진이 되려는 목표는 사회에 기여할 수 있는 훌륭한 꿈입니다.
-
-**2. 추천하는 진로 방향**
-- 의예과 진학을 목표로 하세요
-- 생물, 화학, 물리 등 자연과학 공부가 중요합니다
-
-**3. 구체적인 행동 제안**
-- 과학 과목을 열심히 공부하세요
-- 병원 봉사활동을 해보세요
-- 의대 입시 정보를 알아보세요
-- 다양한 의료 분야에 대해 조사해보세요
-
-꿈을 향해 열심히 노력하세요! 🏥👩‍⚕️
-            """
-        elif "컴퓨터" in query or "프로그래밍" in query or "게임" in query:
-            return """
-컴퓨터와 프로그래밍에 관심이 있으시는군요!
-
-**1. 질문자의 상황 분석**
-IT 분야는 현재와 미래에 매우 유망한 분야입니다.
-
-**2. 추천하는 진로 방향**
-- 컴퓨터공학과, 소프트웨어학과 진학
-- 게임 개발, 웹 개발, 앱 개발 등 다양한 분야 탐색
-
-**3. 구체적인 행동 제안**
-- Python, Scratch 등으로 프로그래밍을 시작해보세요
-- 온라인 코딩 강의를 들어보세요
-- 간단한 게임이나 앱을 만들어보세요
-- 수학과 영어 실력을 키우세요
-
-코딩의 세계로 오신 것을 환영합니다! 💻🎮
-            """
+                if response:
+                    return
+                logger.info("로컬 답변으로 전환합니다.")
+                # 오류 시 사례 기반 로컬 답변으로 fallback
+                reason = 'error'
+        elif not self.chatbot_ready.is_set():
+            reason = 'loading'
         else:
-            return """
-진로에 대해 고민하고 계시는군요!
+            reason = 'unavailable'
 
-**1. 질문자의 상황 분석**
-자신의 미래에 대해 생각하고 있다는 것이 매우 좋습니다.
-
-**2. 추천하는 진로 방향**
-- 자신의 관심사와 재능을 파악해보세요
-- 다양한 직업에 대해 알아보세요
-- 체험 활동을 통해 경험을 쌓아보세요
-
-**3. 구체적인 행동 제안**
-- 진로 적성 검사를 받아보세요
-- 관심 있는 분야의 전문가와 대화해보세요
-- 독서와 체험 활동을 늘려보세요
-- 학교 진로 상담 선생님과 상담해보세요
-
-천천히 자신만의 길을 찾아가세요! 🌟
-            """
+        # 키워드 색인으로 찾은 상담 사례 기반 로컬 답변 (fallback 사유별로 집계)
+        FALLBACKS.inc(reason=reason)
+        try:
+            from app.fallback import get_fallback_responder
+            t0 = time.perf_counter()
+            # 색인이 아직 로드 중이면 기다려야 하므로 이벤트 루프 밖에서 실행
+            loop = asyncio.get_running_loop()
+            answer = await loop.run_in_executor(
+                None, lambda: get_fallback_responder().answer(message, notice=FALLBACK_NOTICES[reason])
+            )
+            record_trace('fallback', {'fallback': (time.perf_counter() - t0) * 1000}, reason=reason)
+        except Exception as e:
+            logger.error(f"로컬 답변 생성 중 오류: {e}")
+            answer = FALLBACK_APOLOGY
+        yield answer
 
     def create_interface(self):
         """Gradio 인터페이스 생성"""
+        t0 = time.perf_counter()
+        import gradio as gr
+        self.startup_timings['import_gradio'] = (time.perf_counter() - t0) * 1000
+
+        async def respond(message, history, request: gr.Request):
+            # 브라우저 탭마다 다른 session_hash로 대화를 구분
+            session_id = request.session_hash if request is not None else None
+            async for response in self.chat_response(message, history, session_id):
+                yield response
+
+        t0 = time.perf_counter()
         chat_interface = gr.ChatInterface(
-            self.chat_response,
+            respond,
             title="AI 진로 상담 챗봇 🎓",
             description="""
             이 챗봇은 실제 진로상담 데이터를 기반으로 학습되었습니다.
@@ -153,20 +227,18 @@ IT 분야는 현재와 미래에 매우 유망한 분야입니다.
             
             **현재는 데모 버전으로 운영 중입니다.**
             """,
-            examples=[
-                "저는 고등학생인데 경제에 관심이 많고 한국은행에서 일하고 싶어요. 어떤 준비를 해야 할까요?",
-                "중학생인데 의사가 되고 싶어요. 어떤 과목을 잘해야 하나요?",
-                "컴퓨터나 게임 만드는 것에 관심이 있는 초등학생입니다. 어떤 직업이 좋을까요?",
-                "고등학생인데 진로를 아직 못 정했어요. 어떻게 찾아야 할까요?"
-            ],
+            examples=EXAMPLE_QUESTIONS,
             theme=gr.themes.Soft(),
-            analytics_enabled=False
+            analytics_enabled=False,
+            concurrency_limit=GUI_CONCURRENCY_LIMIT
         )
+        self.startup_timings['ui_build'] = (time.perf_counter() - t0) * 1000
         
         return chat_interface
 
     def launch(self, debug=False):
-        """웹 인터페이스 실행"""
+        """웹 인터페이스 실행 (METRICS_PORT가 0이 아니면 /metrics 엔드포인트도 시작)"""
+        start_metrics_server()
         interface = self.create_interface()
         
         interface.launch(
@@ -0,0 +1,348 @@
+"""
+Process-local metrics, request traces and logging setup.
+
+- Counter, Gauge and Histogram live in a MetricsRegistry that renders the
+  Prometheus text exposition format, so no client library is needed.
+- ``span`` times a block into the ``career_stage_seconds`` histogram.
+  ``observe_timings`` does the same for a finished timings dict (ms) such as
+  the chatbot's per-request ``timings``.
+- ``record_trace`` appends one JSON line per request or job to TRACE_LOG_PATH.
+  Traces carry stage timings and outcomes, never the question text.
+- ``start_metrics_server`` serves /metrics (Prometheus) and /metrics.json on a
+  local port.
+- ``configure_logging`` is the single logging setup used by the entry points.
+"""
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+# Local Prometheus endpoint (0 turns it off)
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = int(os.getenv('METRICS_PORT', 9464))
+# JSON lines trace log (empty turns it off)
+TRACE_LOG_PATH = os.getenv('TRACE_LOG_PATH', str(Path(__file__).parent / "logs" / "traces.jsonl"))
+
+# Seconds; wide enough for a cache hit up to a full indexing batch
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def configure_logging(level: str = LOG_LEVEL, log_file: Optional[str] = None):
+    """Log to stdout (and optionally a file) with the shared format; a no-op if logging is already set up."""
+    handlers = [logging.StreamHandler()]
+    if log_file:
+        handlers.append(logging.FileHandler(log_file))
+    logging.basicConfig(level=level, format=LOG_FORMAT, handlers=handlers)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    type = 'untyped'
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+
+
+class Counter(_Metric):
+    """Monotonically increasing count per label set."""
+
+    type = 'counter'
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[Tuple[str, LabelValues, str, float]]:
+        with self._lock:
+            return [(self.name, key, '', value) for key, value in sorted(self._values.items())]
+
+
+class Gauge(Counter):
+    """Value that can go up and down (set by collectors right before export)."""
+
+    type = 'gauge'
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram per label set, with sum and count."""
+
+    type = 'histogram'
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        self._values: Dict[LabelValues, list] = {}  # key -> [bucket counts..., sum, count]
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[i] += 1
+                    break
+            entry[-2] += value
+            entry[-1] += 1
+
+    def summary(self, **labels) -> dict:
+        """Count, sum and mean of one label set."""
+        entry = self._values.get(self._key(labels))
+        if not entry:
+            return {'count': 0, 'sum': 0.0, 'mean': 0.0}
+        return {'count': entry[-1], 'sum': entry[-2], 'mean': entry[-2] / entry[-1]}
+
+    def samples(self) -> List[Tuple[str, LabelValues, str, float]]:
+        samples = []
+        with self._lock:
+            for key, entry in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, entry):
+                    cumulative += count
+                    samples.append((f"{self.name}_bucket", key, f'le="{_format_value(bound)}"', cumulative))
+                samples.append((f"{self.name}_sum", key, '', entry[-2]))
+                samples.append((f"{self.name}_count", key, '', entry[-1]))
+        return samples
+
+
+class MetricsRegistry:
+    """Named metrics plus collectors that refresh gauges before each export."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, help: str, labelnames: Iterable[str] = (), **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help, labelnames, **kwargs)
+            elif type(metric) is not cls:
+                raise ValueError(f"Metric {name} is already registered as a {metric.type}")
+            return metric
+
+    def counter(self, name: str, help: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, help, labelnames)
+
+    def gauge(self, name: str, help: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, help, labelnames)
+
+    def histogram(self, name: str, help: str, labelnames: Iterable[str] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, help, labelnames, buckets=buckets)
+
+    def add_collector(self, collector: Callable[[], None]):
+        self._collectors.append(collector)
+
+    def collect(self):
+        for collector in list(self._collectors):
+            try:
+                collector()
+            except Exception as e:
+                logger.warning(f"Metrics collector failed: {e}")
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        self.collect()
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.header())
+            for name, key, extra, value in metric.samples():
+                lines.append(f"{name}{_format_labels(metric.labelnames, key, extra)} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+    def snapshot(self) -> dict:
+        """All samples as {metric: [{'name', 'labels', 'value'}, ...]} for JSON export."""
+        self.collect()
+        snapshot = {}
+        for metric in list(self._metrics.values()):
+            snapshot[metric.name] = [
+                {'name': name, 'labels': dict(zip(metric.labelnames, key)), 'value': value}
+                for name, key, extra, value in metric.samples() if not extra
+            ]
+        return snapshot
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    'career_stage_seconds', 'Duration of a pipeline stage (startup, import, indexing, request stages)', ['stage']
+)
+REQUESTS = REGISTRY.counter('career_requests_total', 'Chat requests by outcome', ['outcome'])
+ERRORS = REGISTRY.counter('career_errors_total', 'Exceptions by stage and exception type', ['stage', 'error'])
+FALLBACKS = REGISTRY.counter('career_fallback_total', 'Answers served without the LLM, by reason', ['reason'])
+TOPIC_REUSES = REGISTRY.counter('career_topic_reuse_total', 'Follow-ups that reused the previous retrieval')
+IMPORTED_ROWS = REGISTRY.counter('career_imported_rows_total', 'Rows written by the SQLite import', ['label'])
+INDEXED_DOCUMENTS = REGISTRY.counter('career_indexed_documents_total', 'Documents embedded and written to the index')
+CACHE_HIT_RATIO = REGISTRY.gauge('career_cache_hit_ratio', 'Hit rate of an in-process cache', ['cache'])
+CACHE_ENTRIES = REGISTRY.gauge('career_cache_entries', 'Entries held by an in-process cache', ['cache'])
+LLM_IN_FLIGHT = REGISTRY.gauge('career_llm_in_flight', 'LLM calls currently in progress')
+CONVERSATION_SESSIONS = REGISTRY.gauge('career_conversation_sessions', 'Conversation sessions held in memory')
+LLM_RETRIES = REGISTRY.counter('career_llm_retries_total', 'LLM calls retried after a transient error')
+LLM_CIRCUIT_STATE = REGISTRY.gauge('career_llm_circuit_state', 'LLM circuit breaker state (0 closed, 1 half-open, 2 open)')
+
+
+def observe_timings(timings: Dict[str, object], prefix: str = ''):
+    """Feed every numeric entry of a timings dict (ms) into the stage histogram."""
+    for stage, value in timings.items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            STAGE_SECONDS.observe(value / 1000, stage=prefix + stage)
+
+
+@contextmanager
+def span(stage: str, timings: Optional[dict] = None):
+    """Time a block into the stage histogram (and, when given, timings[stage] in ms)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        if timings is not None:
+            timings[stage] = elapsed * 1000
+
+
+class TraceLog:
+    """Append-only JSON lines file shared by every thread of the process."""
+
+    def __init__(self, path: Optional[str] = TRACE_LOG_PATH):
+        self.path = Path(path) if path else None
+        self._file = None
+        self._lock = threading.Lock()
+
+    def write(self, record: dict):
+        if self.path is None:
+            return
+        line = json.dumps(record, ensure_ascii=False, default=str) + '\n'
+        with self._lock:
+            try:
+                if self._file is None:
+                    self.path.parent.mkdir(parents=True, exist_ok=True)
+                    self._file = open(self.path, 'a', encoding='utf-8', buffering=1)
+                self._file.write(line)
+            except OSError as e:
+                logger.warning(f"Disabling trace log {self.path}: {e}")
+                self.path = None
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+TRACES = TraceLog()
+
+
+def new_trace_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+def record_trace(name: str, timings: Dict[str, object], trace_id: Optional[str] = None, **attributes) -> str:
+    """Write one trace line: numeric timings become spans (ms), the rest are attributes."""
+    trace_id = trace_id or new_trace_id()
+    spans = {}
+    for stage, value in timings.items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            spans[stage] = round(value, 3)
+        else:
+            attributes.setdefault(stage, value)
+    TRACES.write({
+        'ts': time.time(),
+        'trace_id': trace_id,
+        'name': name,
+        'spans_ms': spans,
+        **attributes
+    })
+    return trace_id
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split('?')[0] == '/metrics':
+            body = self.registry.render().encode('utf-8')
+            content_type = 'text/plain; version=0.0.4; charset=utf-8'
+        elif self.path.split('?')[0] == '/metrics.json':
+            body = json.dumps(self.registry.snapshot(), ensure_ascii=False).encode('utf-8')
+            content_type = 'application/json'
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+
+def start_metrics_server(port: int = METRICS_PORT, host: str = METRICS_HOST) -> Optional[ThreadingHTTPServer]:
+    """Serve /metrics and /metrics.json from a daemon thread; None when disabled or the port is taken."""
+    if port <= 0:
+        return None
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        logger.warning(f"Metrics endpoint not started on {host}:{port}: {e}")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics', daemon=True).start()
+    logger.info(f"Metrics at http://{host}:{server.server_port}/metrics")
+    return server
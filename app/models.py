@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine, Column, Integer, String, Text, ForeignKey, Float
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, Float, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from typing import Dict, List, Optional
@@ -88,6 +88,8 @@ class ExpertLabeling(BaseModel):
     student_idx: str
     counselling_summaries: List[CounsellingSummary]
     recommended_job_categories: Optional[List[JobRecommendation]] = None
+    job_label: Optional[str] = None  # 기술계열/서비스계열/생산계열/사무계열
+    expert_comment: Optional[Dict[str, str]] = None  # Language code -> comment
     
     class Config:
         arbitrary_types_allowed = True
@@ -97,30 +99,62 @@ class Student(Base):
     
     id = Column(Integer, primary_key=True)
     student_idx = Column(String(10), unique=True, nullable=False)  # S-0001 format
-    school_level = Column(String(10), nullable=False)  # 초등/중등/고등
+    school_level = Column(String(10), nullable=False, index=True)  # 초등/중등/고등
     counselling_sessions = relationship("CounsellingSession", back_populates="student")
+    job_profile = relationship("StudentJobProfile", back_populates="student", uselist=False)
+    recommended_job_categories = relationship("RecommendedJobCategory", back_populates="student")
 
 class CounsellingSession(Base):
     __tablename__ = 'counselling_sessions'
     
     id = Column(Integer, primary_key=True)
-    student_id = Column(Integer, ForeignKey('students.id'), nullable=False)
+    student_id = Column(Integer, ForeignKey('students.id'), nullable=False, index=True)
     counseling_idx = Column(Integer, nullable=False)  # Session number for this student
     summary = Column(Text, nullable=False)
     student = relationship("Student", back_populates="counselling_sessions")
     highlights = relationship("Highlight", back_populates="session")
 
+    __table_args__ = (
+        Index('ix_counselling_sessions_student_counseling', 'student_id', 'counseling_idx'),
+    )
+
 class Highlight(Base):
     __tablename__ = 'highlights'
     
     id = Column(Integer, primary_key=True)
-    session_id = Column(Integer, ForeignKey('counselling_sessions.id'), nullable=False)
+    session_id = Column(Integer, ForeignKey('counselling_sessions.id'), nullable=False, index=True)
     start_idx = Column(Integer, nullable=False)  # Start index in the summary text
     end_idx = Column(Integer, nullable=False)    # End index in the summary text
     content = Column(Text, nullable=False)       # The highlighted text
     session = relationship("CounsellingSession", back_populates="highlights")
 
-def init_db(db_path):
-    engine = create_engine(f'sqlite:///{db_path}')
+class StudentJobProfile(Base):
+    __tablename__ = 'student_job_profiles'
+    
+    id = Column(Integer, primary_key=True)
+    student_id = Column(Integer, ForeignKey('students.id'), unique=True, nullable=False)
+    job_label = Column(String(10))         # 기술계열/서비스계열/생산계열/사무계열
+    expert_comment = Column(Text)          # Expert comment (Korean)
+    student = relationship("Student", back_populates="job_profile")
+
+class RecommendedJobCategory(Base):
+    __tablename__ = 'recommended_job_categories'
+    
+    id = Column(Integer, primary_key=True)
+    student_id = Column(Integer, ForeignKey('students.id'), nullable=False, index=True)
+    priority = Column(Integer, nullable=False)          # 1 = most recommended
+    job_category_idx = Column(Integer, nullable=False, index=True)
+    student = relationship("Student", back_populates="recommended_job_categories")
+
+def create_indexes(engine):
+    """Create any secondary indexes missing from tables built by an older schema."""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
+
+def init_db(db_path, profile='default'):
+    from app.engine import create_sqlite_engine
+    engine = create_sqlite_engine(db_path, profile=profile)
     Base.metadata.create_all(engine)
+    create_indexes(engine)
     return engine
@@ -0,0 +1,288 @@
+"""
+Job-category recommendations precomputed from the expert labeling data.
+
+Every labeled student comes with three recommended job categories (priority
+1-3). At build time each student's counselling summaries are embedded and
+averaged, and for every category we keep
+
+- a centroid: the priority-weighted mean embedding of the students it was
+  recommended to, and
+- co-occurrence counts: how often it was recommended together with each other
+  category.
+
+A query is then scored against all centroids with one matrix-vector product,
+smoothed over the row-normalized co-occurrence matrix, so ranking the
+categories takes microseconds and needs no LLM call. Category names are not
+part of the data; they are mined from the ranked phrases in expert_comment
+("추천 직무 1순위는 공학 전문직이다").
+
+Usage (from the project root):
+    python -m app.recommender
+    python -m app.recommender --query "경제에 관심이 많아요"
+"""
+import argparse
+import json
+import logging
+import os
+import re
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+from app.embeddings import EMBEDDING_MODEL
+from app.metrics import configure_logging
+from app.record_reader import JOB_CATEGORY_FILES, LABELING_DATA_PATH, SCHOOL_LEVEL_FILES, iter_json_records
+
+logger = logging.getLogger(__name__)
+
+JOB_RECOMMENDER_PATH = Path(os.getenv('JOB_RECOMMENDER_PATH', Path(__file__).parent / "job_recommender"))
+# Categories appended to each answer (0 turns structured recommendations off)
+JOB_RECOMMENDATIONS = int(os.getenv('JOB_RECOMMENDATIONS', 3))
+# Share of a category's score taken from the categories it is usually recommended with
+JOB_COOCCURRENCE_WEIGHT = float(os.getenv('JOB_COOCCURRENCE_WEIGHT', 0.2))
+# Weight of a recommendation by priority (1 = most recommended)
+PRIORITY_WEIGHTS = {1: 1.0, 2: 2 / 3, 3: 1 / 3}
+
+HEADER_FILE = 'recommender.json'
+ARRAYS_FILE = 'recommender.npz'
+
+_ORDINALS = {
+    1: r'(?:1\s*순위|1\s*차|첫\s*번째|첫째)',
+    2: r'(?:2\s*순위|2\s*차|두\s*번째|둘째)',
+    3: r'(?:3\s*순위|3\s*차|세\s*번째|셋째)',
+}
+_CATEGORY_NAME = re.compile(
+    r'([가-힣A-Za-z·]+(?:[ ,]\s?[가-힣A-Za-z·]+){0,4}?\s?(?:관련\s?직무|관련\s?직|전문직|서비스직|기술직|예술직|사무직))'
+)
+# Words ending like this lead into the name ("1순위로는 공학 전문직") rather than belong to it
+_LEADING_PARTICLES = ('는', '은', '로', '때', '한', '할', '을', '를', '의', '서', '와', '과', '된', '중', '데')
+
+
+def iter_labeled_students() -> Iterator[dict]:
+    """Yield each labeled student once, from the school-level and job-category files."""
+    seen = set()
+    for relative_path in list(SCHOOL_LEVEL_FILES.values()) + list(JOB_CATEGORY_FILES.values()):
+        file_path = LABELING_DATA_PATH / relative_path
+        if not file_path.exists():
+            logger.warning(f"File not found: {file_path}")
+            continue
+        for record in iter_json_records(file_path):
+            if record['student_idx'] in seen or not record.get('recommended_job_categories'):
+                continue
+            seen.add(record['student_idx'])
+            yield record
+
+
+def _name_after(comment: str, priority: int) -> Optional[str]:
+    """Category name following the first mention of the given priority in an expert comment."""
+    marker = re.search(_ORDINALS[priority], comment)
+    if not marker:
+        return None
+    match = _CATEGORY_NAME.search(comment[marker.end():marker.end() + 60])
+    if not match:
+        return None
+    words = match.group(1).replace(',', ' ').split()
+    # Keep what follows the last word that ends in a particle ("고려할 때 | 안전 관련직")
+    cut = max((i + 1 for i, word in enumerate(words[:-1]) if word.endswith(_LEADING_PARTICLES)), default=0)
+    return ' '.join(words[cut:])
+
+
+def mine_category_names(records: Iterable[dict]) -> Dict[int, str]:
+    """Most frequent name the expert comments give each job_category_idx.
+
+    Spelling variants that differ only in spacing are counted together and
+    the spaced spelling is kept ("IT 관련 전문직" over "IT관련전문직").
+    """
+    variants = defaultdict(Counter)
+    for record in records:
+        comment = (record.get('expert_comment') or {}).get('ko') or ''
+        for recommendation in record['recommended_job_categories']:
+            name = _name_after(comment, recommendation['priority'])
+            if name:
+                variants[recommendation['job_category_idx']][name] += 1
+
+    names = {}
+    for category, counts in variants.items():
+        by_key = defaultdict(Counter)
+        for name, count in counts.items():
+            by_key[name.replace(' ', '')][name] += count
+        best = max(by_key.values(), key=lambda spellings: sum(spellings.values()))
+        names[category] = max(best, key=lambda name: (name.count(' '), best[name]))
+    return names
+
+
+def student_text(record: dict) -> str:
+    return ' '.join(summary['summary'].strip() for summary in record['counselling_summaries'])
+
+
+class JobRecommender:
+    """Centroid + co-occurrence job-category ranking over precomputed arrays."""
+
+    def __init__(self, categories: List[int], names: Dict[int, str], centroids: np.ndarray,
+                 cooccurrence: np.ndarray, support: np.ndarray, metadata: Optional[dict] = None,
+                 cooccurrence_weight: float = JOB_COOCCURRENCE_WEIGHT):
+        self.categories = np.asarray(categories)
+        self.names = names
+        self.centroids = np.ascontiguousarray(centroids, dtype=np.float32)
+        self.cooccurrence = np.asarray(cooccurrence, dtype=np.float32)
+        self.support = np.asarray(support, dtype=np.float32)
+        self.metadata = metadata or {}
+        self.cooccurrence_weight = cooccurrence_weight
+
+        # score = (1 - w) * similarity + w * (P @ similarity), folded into one matrix
+        row_sums = self.cooccurrence.sum(axis=1, keepdims=True)
+        transition = np.divide(self.cooccurrence, row_sums, out=np.zeros_like(self.cooccurrence),
+                               where=row_sums > 0)
+        mixing = (1 - cooccurrence_weight) * np.eye(len(self.categories), dtype=np.float32) \
+            + cooccurrence_weight * transition
+        self.projection = np.ascontiguousarray(mixing @ self.centroids, dtype=np.float32)
+        self._related_names = {
+            int(category): [self.name(related) for related in self.related(int(category))]
+            for category in self.categories
+        }
+
+    @classmethod
+    def build(cls, records: Iterable[dict], encode: Callable[[List[str]], np.ndarray],
+              metadata: Optional[dict] = None, batch_size: int = 64) -> 'JobRecommender':
+        """Compute centroids and co-occurrence from labeled students.
+
+        ``encode`` embeds a list of texts (document prefix already applied by
+        the caller) and returns a (n, dim) array.
+        """
+        records = list(records)
+        names = mine_category_names(records)
+        categories = sorted({
+            recommendation['job_category_idx']
+            for record in records for recommendation in record['recommended_job_categories']
+        })
+        position = {category: i for i, category in enumerate(categories)}
+
+        texts = [student_text(record) for record in records]
+        vectors = np.concatenate([
+            np.asarray(encode(texts[start:start + batch_size]), dtype=np.float32)
+            for start in range(0, len(texts), batch_size)
+        ])
+        vectors /= np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+
+        # students x categories, weighted by priority
+        weights = np.zeros((len(records), len(categories)), dtype=np.float32)
+        for row, record in enumerate(records):
+            for recommendation in record['recommended_job_categories']:
+                weights[row, position[recommendation['job_category_idx']]] = \
+                    PRIORITY_WEIGHTS.get(recommendation['priority'], 0.0)
+
+        centroids = weights.T @ vectors
+        centroids /= np.clip(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12, None)
+        recommended = (weights > 0).astype(np.float32)
+        cooccurrence = recommended.T @ recommended
+        support = np.diag(cooccurrence).copy()
+        np.fill_diagonal(cooccurrence, 0)
+
+        logger.info(f"Built job recommender: {len(records)} students, {len(categories)} categories, "
+                    f"{len(names)} named")
+        return cls(categories, names, centroids, cooccurrence, support,
+                   metadata={**(metadata or {}), 'students': len(records)})
+
+    @staticmethod
+    def exists(path: Path = JOB_RECOMMENDER_PATH) -> bool:
+        return (Path(path) / HEADER_FILE).exists() and (Path(path) / ARRAYS_FILE).exists()
+
+    def save(self, path: Path = JOB_RECOMMENDER_PATH):
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        np.savez(path / ARRAYS_FILE, categories=self.categories, centroids=self.centroids,
+                 cooccurrence=self.cooccurrence, support=self.support)
+        header = {
+            'metadata': self.metadata,
+            'names': {str(category): name for category, name in self.names.items()}
+        }
+        with open(path / HEADER_FILE, 'w', encoding='utf-8') as f:
+            json.dump(header, f, ensure_ascii=False, indent=2)
+
+    @classmethod
+    def load(cls, path: Path = JOB_RECOMMENDER_PATH, **kwargs) -> 'JobRecommender':
+        path = Path(path)
+        with open(path / HEADER_FILE, 'r', encoding='utf-8') as f:
+            header = json.load(f)
+        arrays = np.load(path / ARRAYS_FILE)
+        return cls(
+            arrays['categories'].tolist(),
+            {int(category): name for category, name in header['names'].items()},
+            arrays['centroids'], arrays['cooccurrence'], arrays['support'],
+            metadata=header.get('metadata'), **kwargs
+        )
+
+    def name(self, category: int) -> str:
+        return self.names.get(category, f"직무 계열 {category}")
+
+    def related(self, category: int, top_k: int = 2) -> List[int]:
+        """Categories most often recommended together with ``category``."""
+        row = self.cooccurrence[int(np.searchsorted(self.categories, category))]
+        order = np.argsort(-row)[:top_k]
+        return [int(self.categories[i]) for i in order if row[i] > 0]
+
+    def scores(self, query_embeddings) -> np.ndarray:
+        """(n_queries, n_categories) scores for one or more query embeddings."""
+        queries = np.atleast_2d(np.asarray(query_embeddings, dtype=np.float32))
+        queries = queries / np.clip(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12, None)
+        return queries @ self.projection.T
+
+    def recommend(self, query_embedding, top_k: int = JOB_RECOMMENDATIONS) -> List[dict]:
+        """Top job categories for a query embedding, best first."""
+        scores = self.scores(query_embedding)[0]
+        recommendations = []
+        names = set()
+        # A few indices share a mined name; show each name once
+        for i in np.argsort(-scores):
+            category = int(self.categories[i])
+            name = self.name(category)
+            if name in names:
+                continue
+            names.add(name)
+            recommendations.append({
+                'job_category_idx': category,
+                'name': name,
+                'score': float(scores[i]),
+                'related': list(self._related_names[category])
+            })
+            if len(recommendations) >= top_k:
+                break
+        return recommendations
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Build the job-category recommender from the labeling data.")
+    parser.add_argument('--output', type=Path, default=JOB_RECOMMENDER_PATH,
+                        help=f"directory to write (default: {JOB_RECOMMENDER_PATH})")
+    parser.add_argument('--model', default=EMBEDDING_MODEL, help=f"embedding model (default: {EMBEDDING_MODEL})")
+    parser.add_argument('--query', help="print the recommendations for a question after building")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    from app.create_embeddings import load_document_encoder
+    from app.embeddings import document_texts, get_embedding_function
+
+    configure_logging()
+    args = parse_args(argv)
+
+    encoder = load_document_encoder(model_name=args.model)
+    recommender = JobRecommender.build(
+        iter_labeled_students(),
+        lambda texts: encoder.encode(document_texts(texts, args.model), convert_to_numpy=True),
+        metadata={'embedding_model': args.model}
+    )
+    recommender.save(args.output)
+    logger.info(f"Saved job recommender to {args.output}")
+
+    if args.query:
+        embedding = get_embedding_function(args.model)([args.query])[0]
+        for recommendation in recommender.recommend(embedding):
+            print(f"{recommendation['name']} ({recommendation['score']:.3f}) "
+                  f"- 함께 추천: {', '.join(recommendation['related'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Streaming reader for the labeling data JSON files.
+
+Each file is a top-level JSON array of student records. Records are decoded and
+yielded one at a time so only the record being processed (plus one read buffer)
+is held in memory.
+"""
+import json
+import logging
+import os
+import re
+from pathlib import Path
+from typing import Iterator, Optional, Union
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+logger = logging.getLogger(__name__)
+
+# auto | json | ijson
+JSON_BACKEND = os.getenv('JSON_BACKEND', 'auto')
+READ_CHUNK_SIZE = 64 * 1024
+
+LABELING_DATA_PATH = Path(__file__).parent.parent / 'data' / '02.라벨링데이터'
+SCHOOL_LEVEL_FILES = {
+    '초등': Path('01. 학교급') / '01. 초등' / '전문가_라벨링_데이터_초등학교.json',
+    '중등': Path('01. 학교급') / '02. 중등' / '전문가_라벨링_데이터_중학교.json',
+    '고등': Path('01. 학교급') / '03. 고등' / '전문가_라벨링_데이터_고등학교.json'
+}
+JOB_CATEGORY_FILES = {
+    '기술계열': Path('02. 추천직업 카테고리') / '01. 기술계열' / '전문가_라벨링_데이터_기술계열.json',
+    '서비스계열': Path('02. 추천직업 카테고리') / '02. 서비스계열' / '전문가_라벨링_데이터_서비스계열.json',
+    '생산계열': Path('02. 추천직업 카테고리') / '03. 생산계열' / '전문가_라벨링_데이터_생산계열.json',
+    '사무계열': Path('02. 추천직업 카테고리') / '04. 사무계열' / '전문가_라벨링_데이터_사무계열.json'
+}
+SCHOOL_LEVEL_PATTERN = re.compile(r'(초등|중|고등)(?:학교|학생)')
+
+_WHITESPACE = ' \t\n\r'
+
+
+def school_level_in(text: str) -> Optional[str]:
+    """School level (초등/중등/고등) first mentioned in a text, or None."""
+    match = SCHOOL_LEVEL_PATTERN.search(text)
+    if match is None:
+        return None
+    return {'초등': '초등', '중': '중등', '고등': '고등'}[match.group(1)]
+
+
+def resolve_backend(backend: Optional[str] = None) -> str:
+    """Pick the JSON backend, preferring ijson only when its C parser is available."""
+    backend = backend or JSON_BACKEND
+    if backend == 'auto':
+        if ijson is not None and ijson.backend in ('yajl2_c', 'yajl2_cffi'):
+            return 'ijson'
+        return 'json'
+    if backend == 'ijson' and ijson is None:
+        raise ImportError("JSON_BACKEND=ijson requires the ijson package")
+    if backend not in ('json', 'ijson'):
+        raise ValueError(f"Unknown JSON backend: {backend}")
+    return backend
+
+
+def iter_json_records(file_path: Union[str, Path], backend: Optional[str] = None,
+                      chunk_size: int = READ_CHUNK_SIZE) -> Iterator[dict]:
+    """Yield the elements of a top-level JSON array one at a time."""
+    if resolve_backend(backend) == 'ijson':
+        return _iter_with_ijson(Path(file_path))
+    return _iter_with_json(Path(file_path), chunk_size)
+
+
+def _iter_with_ijson(file_path: Path) -> Iterator[dict]:
+    with open(file_path, 'rb') as f:
+        yield from ijson.items(f, 'item', use_float=True)
+
+
+def _iter_with_json(file_path: Path, chunk_size: int) -> Iterator[dict]:
+    decoder = json.JSONDecoder()
+
+    with open(file_path, 'r', encoding='utf-8') as f:
+        buffer = ''
+        pos = 0
+        eof = False
+
+        def fill(size):
+            nonlocal buffer, pos, eof
+            chunk = f.read(size)
+            if chunk:
+                buffer = buffer[pos:] + chunk
+                pos = 0
+            else:
+                eof = True
+
+        def skip_whitespace():
+            nonlocal pos
+            while True:
+                while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                    pos += 1
+                if pos < len(buffer) or eof:
+                    return
+                fill(chunk_size)
+
+        skip_whitespace()
+        if pos >= len(buffer) or buffer[pos] != '[':
+            raise ValueError(f"{file_path} does not contain a top-level JSON array")
+        pos += 1
+
+        first = True
+        while True:
+            skip_whitespace()
+            if pos >= len(buffer):
+                raise ValueError(f"Unexpected end of file in {file_path}")
+            if buffer[pos] == ']':
+                return
+            if not first:
+                if buffer[pos] != ',':
+                    raise ValueError(f"Expected ',' between records in {file_path}")
+                pos += 1
+                skip_whitespace()
+
+            read_size = chunk_size
+            while True:
+                try:
+                    record, end = decoder.raw_decode(buffer, pos)
+                    # A value ending exactly at the buffer edge may continue in the next chunk
+                    if end < len(buffer) or eof:
+                        break
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                # Grow the read size so very large records are not re-decoded many times
+                fill(read_size)
+                read_size *= 2
+
+            pos = end
+            first = False
+            yield record
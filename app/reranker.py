@@ -0,0 +1,127 @@
+"""
+Cross-encoder reranking of retrieved cases.
+
+The hybrid retriever over-fetches RERANK_CANDIDATES sessions cheaply; a small
+CPU cross-encoder then scores each (question, case text) pair jointly and only
+the best n_results are kept. Scores are cached per pair, so repeated questions
+and cases that keep coming back are not scored twice.
+"""
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from app.cache import LRUCache
+from app.embeddings import MODELS_DIR
+
+logger = logging.getLogger(__name__)
+
+# auto: rerank when the cross-encoder has been downloaded | cross-encoder: always | none: off
+RERANKER = os.getenv('RERANKER', 'auto')
+RERANKER_MODES = ('auto', 'cross-encoder', 'none')
+RERANKER_MODEL = os.getenv('RERANKER_MODEL', 'mmarco-mMiniLMv2-L12-H384-v1')
+RERANKER_MODELS = {
+    'mmarco-mMiniLMv2-L12-H384-v1': 'cross-encoder/mmarco-mMiniLMv2-L12-H384-v1',
+    'ms-marco-MiniLM-L-6-v2': 'cross-encoder/ms-marco-MiniLM-L-6-v2',
+}
+# Sessions fused from vector + lexical search and passed to the cross-encoder
+RERANK_CANDIDATES = int(os.getenv('RERANK_CANDIDATES', 10))
+RERANK_BATCH_SIZE = int(os.getenv('RERANK_BATCH_SIZE', 32))
+RERANK_CACHE_SIZE = int(os.getenv('RERANK_CACHE_SIZE', 8192))
+RERANK_MAX_LENGTH = 256
+
+
+def reranker_path(model_name: str = RERANKER_MODEL) -> Path:
+    """Local directory of a downloaded cross-encoder."""
+    if model_name not in RERANKER_MODELS:
+        raise ValueError(f"Unknown reranker model: {model_name} (choose from {', '.join(RERANKER_MODELS)})")
+    return MODELS_DIR / model_name
+
+
+def case_text(case: dict) -> str:
+    """Text that represents a case: its matched chunks when present, otherwise the summary."""
+    return " … ".join(case['chunks']) if case.get('chunks') else (case.get('summary') or '')
+
+
+class CrossEncoderReranker:
+    """Batched cross-encoder scoring with an LRU cache of (question, text) scores.
+
+    ``stats`` reports calls, scored pairs, latency and the score cache hit rate.
+    """
+
+    def __init__(self, model_dir: Path, batch_size: int = RERANK_BATCH_SIZE,
+                 cache_size: int = RERANK_CACHE_SIZE, max_length: int = RERANK_MAX_LENGTH):
+        from sentence_transformers import CrossEncoder
+
+        if not Path(model_dir).exists():
+            raise FileNotFoundError(f"{model_dir} not found. Please run download_models.py --reranker first.")
+        self.model = CrossEncoder(str(model_dir), max_length=max_length, device='cpu')
+        self.batch_size = batch_size
+        self.cache = LRUCache(maxsize=cache_size)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.pairs_scored = 0
+        self.total_ms = 0.0
+        self.last_ms = 0.0
+
+    def score(self, pairs: List[tuple]) -> List[float]:
+        """Score (question, text) pairs; only pairs missing from the cache reach the model."""
+        start = time.perf_counter()
+        scores = [self.cache.get(pair) for pair in pairs]
+        missing = list(dict.fromkeys(pair for pair, score in zip(pairs, scores) if score is None))
+        if missing:
+            predicted = self.model.predict(missing, batch_size=self.batch_size, show_progress_bar=False)
+            computed = dict(zip(missing, map(float, predicted)))
+            for pair, value in computed.items():
+                self.cache.set(pair, value)
+            scores = [computed[pair] if score is None else score for pair, score in zip(pairs, scores)]
+
+        elapsed = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self.calls += 1
+            self.pairs_scored += len(missing)
+            self.total_ms += elapsed
+            self.last_ms = elapsed
+        return scores
+
+    def rerank_many(self, queries: List[str], case_lists: List[List[dict]], n_results: int) -> List[List[dict]]:
+        """Rerank each query's cases with one batched model call; keeps the top n_results per query."""
+        pairs = [(query, case_text(case)) for query, cases in zip(queries, case_lists) for case in cases]
+        scores = iter(self.score(pairs))
+
+        reranked = []
+        for cases in case_lists:
+            for case in cases:
+                case['rerank_score'] = next(scores)
+            reranked.append(sorted(cases, key=lambda case: case['rerank_score'], reverse=True)[:n_results])
+        return reranked
+
+    def rerank(self, query: str, cases: List[dict], n_results: int) -> List[dict]:
+        return self.rerank_many([query], [cases], n_results)[0]
+
+    def stats(self) -> dict:
+        cache = self.cache.stats()
+        return {
+            'calls': self.calls,
+            'pairs_scored': self.pairs_scored,
+            'mean_ms': self.total_ms / self.calls if self.calls else 0.0,
+            'last_ms': self.last_ms,
+            'cache_hits': cache['hits'],
+            'cache_hit_rate': cache['hit_rate'],
+            'cache_size': cache['size']
+        }
+
+
+def get_reranker(mode: str = RERANKER, model_name: str = RERANKER_MODEL) -> Optional[CrossEncoderReranker]:
+    """The configured reranker, or None when reranking is off (or, in auto mode, not downloaded)."""
+    if mode not in RERANKER_MODES:
+        raise ValueError(f"Unknown reranker mode: {mode} (choose from {', '.join(RERANKER_MODES)})")
+    if mode == 'none':
+        return None
+    path = reranker_path(model_name)
+    if mode == 'auto' and not path.exists():
+        logger.info(f"Reranker {model_name} not downloaded; using fused retrieval order")
+        return None
+    return CrossEncoderReranker(path)
@@ -0,0 +1,211 @@
+"""
+Rate limiting, retries and circuit breaking for calls to a remote LLM.
+
+- TokenBucket: refills at the quota rate, allows short bursts and refuses
+  (RateLimitedError) instead of queueing when the wait would exceed a limit
+- backoff_delay / is_transient: full-jitter exponential backoff for errors
+  worth retrying (unavailable, overloaded, per-minute quota)
+- CircuitBreaker: after ``failure_threshold`` consecutive failures calls are
+  rejected (CircuitOpenError) for ``reset_timeout`` seconds, then a single
+  probe call decides whether to close again
+
+All three are thread-safe and usable from sync code and the event loop.
+"""
+import asyncio
+import random
+import threading
+import time
+from typing import Optional
+
+# Exception class names (from google.api_core and the standard library) worth retrying
+TRANSIENT_ERROR_NAMES = {
+    'ServiceUnavailable', 'InternalServerError', 'TooManyRequests', 'ResourceExhausted', 'Aborted',
+    'ConnectionError', 'ConnectionResetError', 'RemoteDisconnected',
+}
+
+
+class ResilienceError(Exception):
+    """Raised instead of calling the backend."""
+
+
+class RateLimitedError(ResilienceError):
+    def __init__(self, wait: float):
+        super().__init__(f"rate limit: next slot in {wait:.1f}s")
+        self.wait = wait
+
+
+class CircuitOpenError(ResilienceError):
+    def __init__(self, retry_after: float):
+        super().__init__(f"circuit open: retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class OverloadedError(ResilienceError):
+    """Raised to shed load: the caller answers without the LLM while it is saturated."""
+
+    def __init__(self, in_flight: int):
+        super().__init__(f"overloaded: {in_flight} LLM calls in flight")
+        self.in_flight = in_flight
+
+
+class TransientError(Exception):
+    """A failure that is expected to go away on retry (used by local fakes)."""
+
+
+def is_transient(error: BaseException) -> bool:
+    """Whether a retry may succeed. Timeouts are not retried: each one already cost the full timeout."""
+    if isinstance(error, TransientError):
+        return True
+    return any(cls.__name__ in TRANSIENT_ERROR_NAMES for cls in type(error).__mro__)
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Full-jitter exponential backoff: uniform in [0, min(cap, base * 2**attempt)]."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class TokenBucket:
+    """Token bucket of ``burst`` tokens refilled at ``per_minute`` tokens per minute (0 = unlimited)."""
+
+    def __init__(self, per_minute: float, burst: int = 1, max_wait: Optional[float] = None):
+        self.rate = per_minute / 60.0
+        self.capacity = max(burst, 1)
+        self.max_wait = max_wait
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.acquired = 0
+        self.throttled = 0
+        self.rejected = 0
+        self.waited = 0.0
+
+    def reserve(self, max_wait: Optional[float] = None) -> float:
+        """Take a token and return how long to wait before using it.
+
+        Raises RateLimitedError (without taking a token) when the wait would
+        exceed ``max_wait`` (default: the bucket's own max_wait).
+        """
+        if self.rate <= 0:
+            return 0.0
+        max_wait = self.max_wait if max_wait is None else max_wait
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            wait = max(0.0, (1 - self.tokens) / self.rate)
+            if max_wait is not None and wait > max_wait:
+                self.rejected += 1
+                raise RateLimitedError(wait)
+            # Tokens may go negative: later callers queue behind this reservation
+            self.tokens -= 1
+            self.acquired += 1
+            if wait:
+                self.throttled += 1
+                self.waited += wait
+            return wait
+
+    def acquire(self, max_wait: Optional[float] = None):
+        wait = self.reserve(max_wait)
+        if wait:
+            time.sleep(wait)
+
+    async def aacquire(self, max_wait: Optional[float] = None):
+        wait = self.reserve(max_wait)
+        if wait:
+            await asyncio.sleep(wait)
+
+    def stats(self) -> dict:
+        with self._lock:
+            tokens = self.tokens + (time.monotonic() - self.updated) * self.rate if self.rate > 0 else None
+        return {
+            'per_minute': self.rate * 60,
+            'burst': self.capacity,
+            'tokens': min(self.capacity, tokens) if tokens is not None else None,
+            'acquired': self.acquired,
+            'throttled': self.throttled,
+            'rejected': self.rejected,
+            'waited_seconds': self.waited
+        }
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a half-open probe.
+
+    closed: calls pass; ``failure_threshold`` failures in a row open it.
+    open: calls are rejected until ``reset_timeout`` seconds have passed.
+    half_open: one probe call at a time is let through; success closes the
+    breaker, failure opens it again. A probe that never reports back (e.g. a
+    cancelled stream) frees its slot after another ``reset_timeout``.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_started = None
+        self._lock = threading.Lock()
+        self.opens = 0
+        self.rejected = 0
+
+    def retry_after(self) -> float:
+        """Seconds until an open breaker lets a probe through (0 when not open)."""
+        if self.state != self.OPEN:
+            return 0.0
+        return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+
+    def allow(self) -> bool:
+        """Whether a call may go ahead now (counts rejections)."""
+        with self._lock:
+            now = time.monotonic()
+            if self.state == self.OPEN and now - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self.probe_started = None
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN and (
+                self.probe_started is None or now - self.probe_started >= self.reset_timeout
+            ):
+                self.probe_started = now
+                return True
+            self.rejected += 1
+            return False
+
+    def check(self):
+        """Raise CircuitOpenError unless a call may go ahead."""
+        if not self.allow():
+            raise CircuitOpenError(self.retry_after() or self.reset_timeout)
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self.probe_started = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.opens += 1
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self.probe_started = None
+
+    def stats(self) -> dict:
+        return {
+            'state': self.state,
+            'consecutive_failures': self.failures,
+            'opens': self.opens,
+            'rejected': self.rejected,
+            'retry_after': self.retry_after()
+        }
+
+
+# Numeric breaker states for metrics gauges
+CIRCUIT_STATES = {CircuitBreaker.CLOSED: 0, CircuitBreaker.HALF_OPEN: 1, CircuitBreaker.OPEN: 2}
@@ -0,0 +1,295 @@
+"""
+Hybrid lexical + vector retrieval with reciprocal-rank fusion.
+
+The vector (Chroma) and lexical (SQLite FTS5) searches run concurrently. Their
+hits are collapsed onto the parent counselling session, so a highlight or chunk
+and its summary count as one case, and the ranked lists are fused with RRF.
+With a reranker, more sessions are fused and the cross-encoder picks the final
+ones.
+"""
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from app.reranker import RERANK_CANDIDATES
+
+logger = logging.getLogger(__name__)
+
+RRF_K = int(os.getenv('RRF_K', 60))
+# Hits fetched from each retriever before fusion
+RETRIEVAL_CANDIDATES = int(os.getenv('RETRIEVAL_CANDIDATES', 20))
+
+CaseKey = Tuple[str, int]
+
+
+def reciprocal_rank_fusion(rankings: Dict[str, List[CaseKey]], k: int = RRF_K) -> Dict[CaseKey, float]:
+    """Fuse ranked lists: score(d) = sum over lists of 1 / (k + rank)."""
+    scores = {}
+    for ranking in rankings.values():
+        for rank, key in enumerate(ranking, 1):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+    return scores
+
+
+def to_chroma_where(filters: Optional[dict]) -> Optional[dict]:
+    """Convert {'field': value, ...} into a Chroma where clause."""
+    if not filters:
+        return None
+    if len(filters) == 1:
+        return dict(filters)
+    return {'$and': [{field: value} for field, value in filters.items()]}
+
+
+class HybridRetriever:
+    """Run vector and lexical search concurrently and fuse the results per session."""
+
+    def __init__(self, collection, case_store=None, rrf_k: int = RRF_K, max_workers: int = 4,
+                 reranker=None, rerank_candidates: int = RERANK_CANDIDATES):
+        self.collection = collection
+        self.case_store = case_store
+        self.rrf_k = rrf_k
+        self.reranker = reranker
+        self.rerank_candidates = rerank_candidates
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='retrieval')
+        self.last_timings = {}
+
+    def vector_search(self, query: str, n_results: int, filters: Optional[dict] = None,
+                      query_embedding: Optional[List[float]] = None) -> List[dict]:
+        """Dense search in Chroma. Returns hits in rank order.
+
+        A precomputed ``query_embedding`` skips embedding the query again.
+        """
+        embeddings = [query_embedding] if query_embedding is not None else None
+        return self.vector_search_many([query], n_results, filters, embeddings)[0]
+
+    def vector_search_many(self, queries: List[str], n_results: int, filters: Optional[dict] = None,
+                           query_embeddings: Optional[List[List[float]]] = None) -> List[List[dict]]:
+        """Dense search for several queries in a single Chroma query call."""
+        if query_embeddings is not None:
+            query_args = {'query_embeddings': [list(map(float, embedding)) for embedding in query_embeddings]}
+        else:
+            query_args = {'query_texts': list(queries)}
+        results = self.collection.query(
+            n_results=n_results,
+            where=to_chroma_where(filters),
+            **query_args
+        )
+        all_hits = []
+        for ids, documents, metadatas, distances in zip(
+            results['ids'], results['documents'], results['metadatas'], results['distances']
+        ):
+            hits = []
+            for doc_id, document, metadata, distance in zip(ids, documents, metadatas, distances):
+                hits.append({
+                    'id': doc_id,
+                    'document': document,
+                    'metadata': metadata or {},
+                    'kind': (metadata or {}).get('data_type', 'counselling_summary'),
+                    'score': distance
+                })
+            all_hits.append(hits)
+        return all_hits
+
+    def lexical_search(self, query: str, n_results: int, filters: Optional[dict] = None) -> List[dict]:
+        """BM25 search over the FTS5 index. Returns [] when no SQLite index is available."""
+        if self.case_store is None or not self.case_store.fts_available:
+            return []
+
+        filters = dict(filters or {})
+        school_level = filters.pop('school_level', None)
+        try:
+            rows = self.case_store.search(query, limit=n_results, school_level=school_level)
+        except Exception as e:
+            logger.warning(f"Lexical search failed: {e}")
+            return []
+
+        hits = []
+        for row in rows:
+            metadata = {
+                'student_idx': row['student_idx'],
+                'counseling_idx': row['counseling_idx'],
+                'school_level': row['school_level'],
+                'data_type': 'counselling_summary' if row['kind'] == 'summary' else 'highlight'
+            }
+            # Remaining filters are applied to the stored metadata
+            if any(metadata.get(field) != value for field, value in filters.items()):
+                continue
+            hits.append({
+                'id': f"{row['student_idx']}_{row['counseling_idx']}",
+                'document': row['content'],
+                'metadata': metadata,
+                'kind': metadata['data_type'],
+                'score': row['score']
+            })
+        return hits
+
+    @staticmethod
+    def _collapse(hits: List[dict]) -> Tuple[List[CaseKey], Dict[CaseKey, List[dict]]]:
+        """Map hits to their parent session, keeping each session's best rank."""
+        ranking = []
+        grouped = {}
+        for hit in hits:
+            metadata = hit['metadata']
+            if 'student_idx' not in metadata:
+                continue
+            key = (metadata['student_idx'], int(metadata['counseling_idx']))
+            if key not in grouped:
+                ranking.append(key)
+                grouped[key] = []
+            grouped[key].append(hit)
+        return ranking, grouped
+
+    def _fill_summaries(self, cases: List[dict]):
+        """Load the parent summary for cases that were only matched through highlights or chunks."""
+        missing = [case['key'] for case in cases if case['summary'] is None]
+        if not missing or self.case_store is None:
+            return
+        try:
+            sessions = self.case_store.get_sessions(missing)
+        except Exception as e:
+            logger.warning(f"Failed to load parent summaries: {e}")
+            return
+        for case in cases:
+            session = sessions.get(case['key'])
+            if case['summary'] is None and session:
+                case['summary'] = session['summary']
+                case['metadata'].setdefault('school_level', session['school_level'])
+
+    @staticmethod
+    def _fill_missing_summaries(cases: List[dict]):
+        """Fall back to the best matching snippet when no summary could be loaded."""
+        for case in cases:
+            if case['summary'] is None:
+                case['summary'] = case['matches'][0] if case['matches'] else ''
+
+    def _fuse(self, vector_hits: List[dict], lexical_hits: List[dict], n_results: int) -> List[dict]:
+        """Collapse both hit lists to sessions and keep the top n_results by RRF score."""
+        vector_ranking, vector_groups = self._collapse(vector_hits)
+        lexical_ranking, lexical_groups = self._collapse(lexical_hits)
+        scores = reciprocal_rank_fusion(
+            {'vector': vector_ranking, 'lexical': lexical_ranking}, k=self.rrf_k
+        )
+        top_keys = sorted(scores, key=scores.get, reverse=True)[:n_results]
+
+        cases = []
+        for key in top_keys:
+            hits = vector_groups.get(key, []) + lexical_groups.get(key, [])
+            summary = next(
+                (hit['document'] for hit in hits if hit['kind'] == 'counselling_summary'), None
+            )
+            cases.append({
+                'key': key,
+                'id': f"{key[0]}_{key[1]}",
+                'summary': summary,
+                'matches': list(dict.fromkeys(
+                    hit['document'] for hit in hits if hit['kind'] != 'counselling_summary'
+                )),
+                # Matched chunks in summary order: the compact context used for the prompt
+                'chunks': list(dict.fromkeys(
+                    hit['document'] for hit in sorted(
+                        (hit for hit in hits if hit['kind'] == 'chunk'),
+                        key=lambda hit: hit['metadata'].get('start_idx', 0)
+                    )
+                )),
+                'metadata': {k: v for k, v in hits[0]['metadata'].items()
+                             if k in ('student_idx', 'counseling_idx', 'school_level')},
+                'score': scores[key],
+                'sources': [name for name, groups in (('vector', vector_groups), ('lexical', lexical_groups))
+                            if key in groups]
+            })
+        return cases
+
+    def _fused_count(self, n_results: int) -> int:
+        """Sessions to keep after fusion: the rerank budget when a reranker is set."""
+        return max(n_results, self.rerank_candidates) if self.reranker is not None else n_results
+
+    def _rerank(self, queries: List[str], results: List[List[dict]], n_results: int) -> List[List[dict]]:
+        """Rerank with the cross-encoder; keeps the fused order if scoring fails."""
+        if self.reranker is None:
+            return results
+        try:
+            return self.reranker.rerank_many(queries, results, n_results)
+        except Exception as e:
+            logger.warning(f"Reranking failed: {e}")
+            return [cases[:n_results] for cases in results]
+
+    def retrieve(self, query: str, n_results: int = 3, candidates: int = RETRIEVAL_CANDIDATES,
+                 filters: Optional[dict] = None, query_embedding: Optional[List[float]] = None,
+                 timings: Optional[dict] = None) -> List[dict]:
+        """Return up to n_results fused cases, one per counselling session.
+
+        Each case holds the session key, its summary (falls back to the best
+        matching snippet), the matched snippets and chunks, the RRF score and
+        which retrievers found it. Per-stage latencies (ms) are kept in
+        ``last_timings`` and, when given, written to ``timings``.
+        """
+        start = time.perf_counter()
+        timings = {} if timings is None else timings
+
+        def timed(name, func, *args):
+            t0 = time.perf_counter()
+            try:
+                return func(*args)
+            finally:
+                timings[name] = (time.perf_counter() - t0) * 1000
+
+        candidates = max(candidates, n_results)
+        vector_future = self.executor.submit(
+            timed, 'vector', self.vector_search, query, candidates, filters, query_embedding
+        )
+        lexical_future = self.executor.submit(timed, 'lexical', self.lexical_search, query, candidates, filters)
+        vector_hits = vector_future.result()
+        lexical_hits = lexical_future.result()
+
+        t0 = time.perf_counter()
+        cases = self._fuse(vector_hits, lexical_hits, self._fused_count(n_results))
+        timings['fusion'] = (time.perf_counter() - t0) * 1000
+
+        timed('details', self._fill_summaries, cases)
+        self._fill_missing_summaries(cases)
+        if self.reranker is not None:
+            cases = timed('rerank', self._rerank, [query], [cases], n_results)[0]
+
+        timings['total'] = (time.perf_counter() - start) * 1000
+        self.last_timings = timings
+        logger.debug(
+            "Retrieval timings (ms): " + ", ".join(f"{name}={value:.1f}" for name, value in timings.items())
+        )
+        return cases
+
+    def retrieve_many(self, queries: List[str], n_results: int = 3, candidates: int = RETRIEVAL_CANDIDATES,
+                      filters: Optional[dict] = None,
+                      query_embeddings: Optional[List[List[float]]] = None) -> List[List[dict]]:
+        """Batch version of ``retrieve``: one Chroma query for all queries.
+
+        Lexical searches run on the thread pool, parent summaries for every
+        query are loaded with a single lookup and reranking is one batched
+        call. Returns one case list per query.
+        """
+        if not queries:
+            return []
+        start = time.perf_counter()
+        candidates = max(candidates, n_results)
+
+        lexical_futures = [
+            self.executor.submit(self.lexical_search, query, candidates, filters) for query in queries
+        ]
+        vector_hits = self.vector_search_many(queries, candidates, filters, query_embeddings)
+        results = [
+            self._fuse(hits, future.result(), self._fused_count(n_results))
+            for hits, future in zip(vector_hits, lexical_futures)
+        ]
+
+        all_cases = [case for cases in results for case in cases]
+        self._fill_summaries(all_cases)
+        self._fill_missing_summaries(all_cases)
+        # Every (query, case) pair of the batch is scored in one cross-encoder call
+        results = self._rerank(queries, results, n_results)
+
+        logger.debug(f"Retrieved {len(queries)} queries in {(time.perf_counter() - start) * 1000:.1f}ms")
+        return results
+
+    def close(self):
+        self.executor.shutdown(wait=False)
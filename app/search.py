@@ -0,0 +1,196 @@
+"""
+SQLite FTS5 full-text index over counselling summaries and highlights.
+
+The index is a standalone FTS5 table filled at import time. Korean words carry
+particles (경제에, 의사가), so query terms have common particles stripped and
+are matched as prefixes.
+
+Databases imported before the index existed can be migrated in place:
+
+    python -m app.search            # create and fill the index if it is missing
+    python -m app.search --rebuild  # repopulate it from the base tables
+"""
+import argparse
+import logging
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+from sqlalchemy import text
+
+from app.engine import create_sqlite_engine
+from app.metrics import configure_logging
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = 'counselling_fts'
+
+# Longest suffixes first so 에서는 is stripped before 는
+PARTICLES = sorted([
+    '에서는', '에서', '에게', '으로', '까지', '부터', '이나', '이랑', '하고', '처럼', '인데',
+    '은', '는', '이', '가', '을', '를', '에', '의', '도', '로', '와', '과', '만', '요'
+], key=len, reverse=True)
+
+STOPWORDS = {
+    '저는', '제가', '어떤', '어떻게', '무엇', '무엇을', '뭐', '있어요', '싶어요', '해야', '할까요',
+    '싶어', '할까', '같아요', '좋을까요', '있는', '하나요', '되고', '있고', '많고', '일하고'
+}
+
+CREATE_FTS_SQL = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+    content,
+    kind UNINDEXED,
+    session_id UNINDEXED,
+    highlight_id UNINDEXED,
+    student_idx UNINDEXED,
+    counseling_idx UNINDEXED,
+    school_level UNINDEXED,
+    tokenize = 'unicode61'
+)
+"""
+
+INSERT_FTS_SQL = text(f"""
+INSERT INTO {FTS_TABLE} (content, kind, session_id, highlight_id, student_idx, counseling_idx, school_level)
+VALUES (:content, :kind, :session_id, :highlight_id, :student_idx, :counseling_idx, :school_level)
+""")
+
+REBUILD_FTS_SQL = [
+    f"DELETE FROM {FTS_TABLE}",
+    f"""
+    INSERT INTO {FTS_TABLE} (content, kind, session_id, highlight_id, student_idx, counseling_idx, school_level)
+    SELECT cs.summary, 'summary', cs.id, NULL, s.student_idx, cs.counseling_idx, s.school_level
+    FROM counselling_sessions cs JOIN students s ON s.id = cs.student_id
+    """,
+    f"""
+    INSERT INTO {FTS_TABLE} (content, kind, session_id, highlight_id, student_idx, counseling_idx, school_level)
+    SELECT h.content, 'highlight', cs.id, h.id, s.student_idx, cs.counseling_idx, s.school_level
+    FROM highlights h
+    JOIN counselling_sessions cs ON cs.id = h.session_id
+    JOIN students s ON s.id = cs.student_id
+    WHERE h.content != ''
+    """
+]
+
+
+def fts_table_exists(conn) -> bool:
+    """Whether the database already has the FTS table."""
+    return conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {'name': FTS_TABLE}
+    ).first() is not None
+
+
+def ensure_fts_table(conn) -> bool:
+    """Create the FTS table if needed. Returns True when it was newly created."""
+    exists = fts_table_exists(conn)
+    if not exists:
+        conn.execute(text(CREATE_FTS_SQL))
+    return not exists
+
+
+def rebuild_fts_index(conn):
+    """Repopulate the FTS table from the base tables."""
+    for statement in REBUILD_FTS_SQL:
+        conn.execute(text(statement))
+
+
+def build_fts_index(db_path: Union[str, Path], rebuild: bool = False) -> bool:
+    """Create the FTS table in an imported database and fill it.
+
+    An existing index is left alone unless ``rebuild`` is set. Returns True
+    when the index was (re)populated.
+    """
+    engine = create_sqlite_engine(db_path)
+    try:
+        with engine.begin() as conn:
+            populate = ensure_fts_table(conn) or rebuild
+            if populate:
+                rebuild_fts_index(conn)
+        return populate
+    finally:
+        engine.dispose()
+
+
+def index_rows(conn, rows: List[Dict]):
+    """Add summary/highlight rows to the FTS table (executemany)."""
+    if rows:
+        conn.execute(INSERT_FTS_SQL, rows)
+
+
+def query_terms(query: str) -> List[str]:
+    """Distinct words of free text with common particles and stopwords removed."""
+    terms = []
+    for token in re.findall(r'\w+', query):
+        for particle in PARTICLES:
+            if token.endswith(particle) and len(token) - len(particle) >= 2:
+                token = token[:-len(particle)]
+                break
+        if len(token) < 2 or token in STOPWORDS:
+            continue
+        if token not in terms:
+            terms.append(token)
+    return terms
+
+
+def build_match_query(query: str) -> Optional[str]:
+    """Turn free text into an FTS5 MATCH expression of OR-ed prefix terms."""
+    terms = query_terms(query)
+    if not terms:
+        return None
+    return ' OR '.join(f'"{term}"*' for term in terms)
+
+
+def search_counselling(conn, query: str, limit: int = 10, school_level: Optional[str] = None,
+                       kind: Optional[str] = None) -> List[Dict]:
+    """Rank summaries and highlights by BM25 for a free-text query."""
+    match = build_match_query(query)
+    if match is None:
+        return []
+
+    sql = f"""
+        SELECT content, kind, session_id, highlight_id, student_idx, counseling_idx, school_level,
+               bm25({FTS_TABLE}) AS score
+        FROM {FTS_TABLE}
+        WHERE {FTS_TABLE} MATCH :match
+    """
+    params = {'match': match, 'limit': limit}
+    if school_level is not None:
+        sql += " AND school_level = :school_level"
+        params['school_level'] = school_level
+    if kind is not None:
+        sql += " AND kind = :kind"
+        params['kind'] = kind
+    sql += " ORDER BY score LIMIT :limit"
+
+    return [dict(row._mapping) for row in conn.execute(text(sql), params)]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Create or rebuild the FTS index of an imported database.")
+    parser.add_argument('--db', type=Path, default=Path(__file__).parent / 'career_guidance.db',
+                        help="SQLite database to migrate (default: app/career_guidance.db)")
+    parser.add_argument('--rebuild', action='store_true',
+                        help="repopulate the index even if it already exists")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    configure_logging()
+    args = parse_args(argv)
+    if not args.db.exists():
+        logger.error(f"Database not found: {args.db}")
+        return 1
+
+    if build_fts_index(args.db, rebuild=args.rebuild):
+        engine = create_sqlite_engine(args.db)
+        with engine.connect() as conn:
+            count = conn.execute(text(f"SELECT count(*) FROM {FTS_TABLE}")).scalar()
+        engine.dispose()
+        logger.info(f"Indexed {count} summaries and highlights in {FTS_TABLE}")
+    else:
+        logger.info(f"{FTS_TABLE} already exists in {args.db}; pass --rebuild to repopulate it")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,17 @@
+"""
+Token estimates used to keep prompts within budget without loading a tokenizer.
+"""
+import math
+
+
+def estimate_tokens(text):
+    """토큰 수 추정 (UTF-8 4바이트당 약 1토큰, 한글 한 글자 약 0.75토큰)"""
+    return math.ceil(len(text.encode('utf-8')) / 4)
+
+
+def truncate_to_tokens(text, max_tokens):
+    """추정 토큰 수가 max_tokens 이하가 되도록 텍스트 뒷부분을 자름"""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    encoded = text.encode('utf-8')[:max_tokens * 4]
+    return encoded.decode('utf-8', errors='ignore').rstrip() + '…'
@@ -0,0 +1,351 @@
+"""
+In-process vector index stored as a memory-mapped NumPy matrix.
+
+An alternative to the Chroma collection for a corpus of a few thousand
+documents. It implements the subset of the Chroma collection API the indexer
+and the retriever use (get, upsert, delete, count, query, modify), so either
+backend can be passed where a collection is expected.
+
+Files under the index directory:
+- vectors.npy     L2-normalized embeddings (float32 or float16), opened with mmap
+- metadata.jsonl  one {"id", "document", "metadata"} line per matrix row
+- hnsw.bin        optional HNSW graph (requires hnswlib)
+
+Search is an exact dot-product top-k by default. With hnswlib installed an
+HNSW graph is built for corpora of at least HNSW_MIN_SIZE rows (or always with
+algorithm='hnsw').
+"""
+import importlib.util
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Retrieval backend used by the chatbot and the indexer: chroma | numpy
+VECTOR_BACKEND = os.getenv('VECTOR_BACKEND', 'chroma')
+VECTOR_INDEX_PATH = Path(os.getenv('VECTOR_INDEX_PATH', Path(__file__).parent / "vector_index"))
+VECTOR_DTYPE = os.getenv('VECTOR_DTYPE', 'float32')
+# exact | hnsw | auto (HNSW once the corpus reaches HNSW_MIN_SIZE rows and hnswlib is installed)
+VECTOR_INDEX_ALGORITHM = os.getenv('VECTOR_INDEX_ALGORITHM', 'auto')
+HNSW_MIN_SIZE = int(os.getenv('HNSW_MIN_SIZE', 50000))
+HNSW_M = 16
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = int(os.getenv('HNSW_EF_SEARCH', 64))
+# Rows converted to float32 at a time when scoring a float16 matrix
+SCORE_BLOCK_ROWS = 8192
+
+VECTORS_FILE = 'vectors.npy'
+METADATA_FILE = 'metadata.jsonl'
+HNSW_FILE = 'hnsw.bin'
+
+
+def _normalize(vectors) -> np.ndarray:
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _where_conditions(where: Optional[dict]) -> List[tuple]:
+    """Flatten a Chroma equality where clause into (field, value) pairs."""
+    if not where:
+        return []
+    if '$and' in where:
+        return [item for clause in where['$and'] for item in _where_conditions(clause)]
+    conditions = []
+    for field, value in where.items():
+        if isinstance(value, dict):
+            if set(value) != {'$eq'}:
+                raise ValueError(f"Unsupported where operator for {field}: {value}")
+            value = value['$eq']
+        conditions.append((field, value))
+    return conditions
+
+
+class NumpyVectorIndex:
+    """Chroma-compatible collection backed by a NumPy matrix and a JSONL sidecar.
+
+    Writes are kept in memory until ``save()``, which rewrites the files
+    atomically; queries always see the current in-memory state.
+    """
+
+    def __init__(self, path: Union[str, Path] = VECTOR_INDEX_PATH, embedding_function=None,
+                 dtype: str = VECTOR_DTYPE, algorithm: str = VECTOR_INDEX_ALGORITHM):
+        self.path = Path(path)
+        self.embedding_function = embedding_function
+        self.dtype = np.dtype(dtype)
+        self.algorithm = algorithm
+        self.name = self.path.name
+        self.metadata = {}
+
+        self._ids: List[str] = []
+        self._documents: List[str] = []
+        self._metadatas: List[dict] = []
+        self._positions: Dict[str, int] = {}
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._rows: Optional[List[np.ndarray]] = None  # set while there are unsaved writes
+        self._masks: Dict[tuple, np.ndarray] = {}
+        self._hnsw = None
+        self.load()
+
+    @classmethod
+    def exists(cls, path: Union[str, Path] = VECTOR_INDEX_PATH) -> bool:
+        return (Path(path) / VECTORS_FILE).exists() and (Path(path) / METADATA_FILE).exists()
+
+    def load(self):
+        """Open the saved matrix with mmap and read the sidecar."""
+        if not self.exists(self.path):
+            return
+        self._matrix = np.load(self.path / VECTORS_FILE, mmap_mode='r')
+        with open(self.path / METADATA_FILE, 'r', encoding='utf-8') as f:
+            header = json.loads(f.readline())
+            self.metadata = header.get('collection_metadata', {})
+            for line in f:
+                row = json.loads(line)
+                self._ids.append(row['id'])
+                self._documents.append(row['document'])
+                self._metadatas.append(row['metadata'])
+        self._positions = {doc_id: i for i, doc_id in enumerate(self._ids)}
+        if len(self._ids) != self._matrix.shape[0]:
+            raise ValueError(f"Vector index at {self.path} is inconsistent; rebuild it with --mode full")
+        self._load_hnsw()
+
+    def _use_hnsw(self) -> bool:
+        if self.algorithm == 'exact':
+            return False
+        if self.algorithm == 'auto' and len(self._ids) < HNSW_MIN_SIZE:
+            return False
+        if importlib.util.find_spec('hnswlib') is None:
+            if self.algorithm == 'hnsw':
+                logger.warning("hnswlib is not installed; falling back to exact search")
+            return False
+        return True
+
+    def _load_hnsw(self):
+        hnsw_path = self.path / HNSW_FILE
+        if not hnsw_path.exists() or not self._use_hnsw():
+            return
+        import hnswlib
+        index = hnswlib.Index(space='ip', dim=self._matrix.shape[1])
+        index.load_index(str(hnsw_path), max_elements=len(self._ids))
+        index.set_ef(HNSW_EF_SEARCH)
+        self._hnsw = index
+
+    def _build_hnsw(self, matrix: np.ndarray):
+        import hnswlib
+        index = hnswlib.Index(space='ip', dim=matrix.shape[1])
+        index.init_index(max_elements=len(matrix), ef_construction=HNSW_EF_CONSTRUCTION, M=HNSW_M)
+        index.add_items(np.asarray(matrix, dtype=np.float32), np.arange(len(matrix)))
+        index.set_ef(HNSW_EF_SEARCH)
+        return index
+
+    # --- writes -------------------------------------------------------------
+
+    def _start_write(self):
+        if self._rows is None:
+            self._rows = list(np.asarray(self._matrix, dtype=np.float32))
+        self._masks.clear()
+        self._hnsw = None
+
+    def upsert(self, ids: List[str], embeddings=None, documents: Optional[List[str]] = None,
+               metadatas: Optional[List[dict]] = None):
+        if embeddings is None:
+            if self.embedding_function is None:
+                raise ValueError("embeddings are required when no embedding_function is set")
+            embeddings = self.embedding_function(documents)
+        self._start_write()
+        vectors = _normalize(embeddings)
+        documents = documents or [''] * len(ids)
+        metadatas = metadatas or [{}] * len(ids)
+        for doc_id, vector, document, metadata in zip(ids, vectors, documents, metadatas):
+            position = self._positions.get(doc_id)
+            if position is None:
+                self._positions[doc_id] = len(self._ids)
+                self._ids.append(doc_id)
+                self._documents.append(document)
+                self._metadatas.append(metadata or {})
+                self._rows.append(vector)
+            else:
+                self._documents[position] = document
+                self._metadatas[position] = metadata or {}
+                self._rows[position] = vector
+
+    add = upsert
+
+    def delete(self, ids: List[str]):
+        doomed = {doc_id for doc_id in ids if doc_id in self._positions}
+        if not doomed:
+            return
+        self._start_write()
+        keep = [i for i, doc_id in enumerate(self._ids) if doc_id not in doomed]
+        self._ids = [self._ids[i] for i in keep]
+        self._documents = [self._documents[i] for i in keep]
+        self._metadatas = [self._metadatas[i] for i in keep]
+        self._rows = [self._rows[i] for i in keep]
+        self._positions = {doc_id: i for i, doc_id in enumerate(self._ids)}
+
+    def modify(self, metadata: Optional[dict] = None):
+        """Replace the collection-level metadata (written on the next save)."""
+        if metadata is not None:
+            self.metadata = dict(metadata)
+
+    def reset(self):
+        """Drop every document (the files are replaced on the next save)."""
+        self.metadata = {}
+        self._ids, self._documents, self._metadatas, self._positions = [], [], [], {}
+        self._rows = []
+        self._masks.clear()
+        self._hnsw = None
+
+    def save(self):
+        """Write the matrix, sidecar and optional HNSW graph, replacing the old files."""
+        self.path.mkdir(parents=True, exist_ok=True)
+        matrix = self._current_matrix().astype(self.dtype)
+
+        vectors_tmp = self.path / (VECTORS_FILE + '.tmp')
+        with open(vectors_tmp, 'wb') as f:
+            np.save(f, matrix)
+        metadata_tmp = self.path / (METADATA_FILE + '.tmp')
+        with open(metadata_tmp, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'collection_metadata': self.metadata}, ensure_ascii=False) + '\n')
+            for doc_id, document, metadata in zip(self._ids, self._documents, self._metadatas):
+                f.write(json.dumps({'id': doc_id, 'document': document, 'metadata': metadata},
+                                   ensure_ascii=False) + '\n')
+
+        hnsw_path = self.path / HNSW_FILE
+        if len(matrix) and self._use_hnsw():
+            self._build_hnsw(matrix).save_index(str(hnsw_path))
+        elif hnsw_path.exists():
+            hnsw_path.unlink()
+
+        os.replace(vectors_tmp, self.path / VECTORS_FILE)
+        os.replace(metadata_tmp, self.path / METADATA_FILE)
+
+        self._rows = None
+        self._ids, self._documents, self._metadatas = [], [], []
+        self.load()
+        logger.info(f"Saved {self.count()} vectors ({self.dtype}) to {self.path}")
+
+    # --- reads --------------------------------------------------------------
+
+    def _current_matrix(self) -> np.ndarray:
+        if self._rows is not None:
+            if not self._rows:
+                return np.zeros((0, self._matrix.shape[1] if self._matrix.ndim == 2 else 0), dtype=np.float32)
+            self._matrix = np.stack(self._rows)
+            self._rows = list(self._matrix)
+        return self._matrix
+
+    def count(self) -> int:
+        return len(self._ids)
+
+    def get(self, ids: Optional[List[str]] = None, include: Optional[List[str]] = None,
+            limit: Optional[int] = None, offset: int = 0, where: Optional[dict] = None) -> dict:
+        include = include if include is not None else ['metadatas', 'documents']
+        if ids is not None:
+            positions = [self._positions[doc_id] for doc_id in ids if doc_id in self._positions]
+        else:
+            positions = list(range(len(self._ids)))
+        if where:
+            mask = self._mask(where)
+            positions = [i for i in positions if mask[i]]
+        positions = positions[offset:offset + limit if limit is not None else None]
+
+        result = {'ids': [self._ids[i] for i in positions]}
+        if 'metadatas' in include:
+            result['metadatas'] = [self._metadatas[i] for i in positions]
+        if 'documents' in include:
+            result['documents'] = [self._documents[i] for i in positions]
+        if 'embeddings' in include:
+            result['embeddings'] = np.asarray(self._current_matrix()[positions], dtype=np.float32)
+        return result
+
+    def _mask(self, where: dict) -> np.ndarray:
+        """Boolean row mask for a where clause (cached per clause)."""
+        conditions = tuple(sorted(_where_conditions(where), key=repr))
+        mask = self._masks.get(conditions)
+        if mask is None:
+            mask = np.fromiter(
+                (all(metadata.get(field) == value for field, value in conditions)
+                 for metadata in self._metadatas),
+                dtype=bool, count=len(self._metadatas)
+            )
+            self._masks[conditions] = mask
+        return mask
+
+    def _scores(self, queries: np.ndarray) -> np.ndarray:
+        """Cosine similarity of every row against every query: (rows, queries)."""
+        matrix = self._current_matrix()
+        if matrix.dtype == np.float32:
+            return matrix @ queries.T
+        scores = np.empty((len(matrix), len(queries)), dtype=np.float32)
+        for start in range(0, len(matrix), SCORE_BLOCK_ROWS):
+            block = np.asarray(matrix[start:start + SCORE_BLOCK_ROWS], dtype=np.float32)
+            scores[start:start + len(block)] = block @ queries.T
+        return scores
+
+    def _exact_top_k(self, queries: np.ndarray, n_results: int, mask: Optional[np.ndarray]) -> List[tuple]:
+        scores = self._scores(queries)
+        if mask is not None:
+            scores[~mask] = -np.inf
+        k = min(n_results, len(scores) if mask is None else int(mask.sum()))
+        results = []
+        for column in scores.T:
+            if k <= 0:
+                results.append(([], []))
+                continue
+            top = np.argpartition(-column, k - 1)[:k]
+            top = top[np.argsort(-column[top])]
+            results.append((top.tolist(), column[top].tolist()))
+        return results
+
+    def _hnsw_top_k(self, queries: np.ndarray, n_results: int, mask: Optional[np.ndarray]) -> List[tuple]:
+        k = min(n_results, len(self._ids) if mask is None else int(mask.sum()))
+        if k <= 0:
+            return [([], []) for _ in queries]
+        kwargs = {'filter': (lambda label: bool(mask[label]))} if mask is not None else {}
+        labels, distances = self._hnsw.knn_query(queries, k=k, **kwargs)
+        # hnswlib 'ip' distance is 1 - dot product
+        return [(row.tolist(), (1.0 - dist).tolist()) for row, dist in zip(labels, distances)]
+
+    def query(self, query_embeddings=None, query_texts: Optional[List[str]] = None, n_results: int = 10,
+              where: Optional[dict] = None, include: Optional[List[str]] = None) -> dict:
+        """Top-k by cosine similarity; distances are 1 - similarity like Chroma's cosine space."""
+        if query_embeddings is None:
+            if self.embedding_function is None:
+                raise ValueError("query_texts need an embedding_function")
+            query_embeddings = self.embedding_function(list(query_texts))
+        queries = _normalize(query_embeddings)
+
+        results = {'ids': [], 'documents': [], 'metadatas': [], 'distances': []}
+        if not self._ids:
+            for key in results:
+                results[key] = [[] for _ in queries]
+            return results
+
+        mask = self._mask(where) if where else None
+        search = self._hnsw_top_k if self._hnsw is not None and self._rows is None else self._exact_top_k
+        for positions, similarities in search(queries, n_results, mask):
+            results['ids'].append([self._ids[i] for i in positions])
+            results['documents'].append([self._documents[i] for i in positions])
+            results['metadatas'].append([self._metadatas[i] for i in positions])
+            results['distances'].append([1.0 - s for s in similarities])
+        return results
+
+
+def copy_collection(source, target: NumpyVectorIndex, page_size: int = 5000) -> int:
+    """Copy every document and stored embedding from a Chroma collection into ``target``."""
+    copied = 0
+    while True:
+        page = source.get(include=['embeddings', 'documents', 'metadatas'], limit=page_size, offset=copied)
+        if not len(page['ids']):
+            break
+        target.upsert(ids=page['ids'], embeddings=page['embeddings'],
+                      documents=page['documents'], metadatas=page['metadatas'])
+        copied += len(page['ids'])
+    return copied
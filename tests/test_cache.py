@@ -0,0 +1,123 @@
+import numpy as np
+import pytest
+
+from app import cache
+from app.cache import LRUCache, SemanticCache
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache.time, 'monotonic', clock)
+    return clock
+
+
+def test_lru_evicts_least_recently_used():
+    lru = LRUCache(maxsize=2)
+    lru.set('a', 1)
+    lru.set('b', 2)
+    assert lru.get('a') == 1
+    lru.set('c', 3)
+
+    assert lru.get('b') is None
+    assert lru.get('a') == 1
+    assert lru.get('c') == 3
+    assert len(lru) == 2
+    assert lru.stats() == {'hits': 3, 'misses': 1, 'hit_rate': 0.75, 'size': 2, 'maxsize': 2}
+
+
+def test_lru_stores_falsy_values():
+    lru = LRUCache()
+    lru.set('empty', [])
+    lru.set('none', None)
+    assert lru.get('empty', 'missing') == []
+    assert lru.get('none', 'missing') is None
+    assert lru.hits == 2
+
+
+def test_lru_entries_expire_after_ttl(clock):
+    lru = LRUCache(ttl=10)
+    lru.set('a', 1)
+    clock.advance(10)
+    assert lru.get('a') == 1
+    clock.advance(0.1)
+    assert lru.get('a', 'expired') == 'expired'
+    assert len(lru) == 0
+
+
+def test_lru_disabled_with_zero_size():
+    lru = LRUCache(maxsize=0)
+    lru.set('a', 1)
+    assert lru.get('a') is None
+    assert len(lru) == 0
+
+
+def test_semantic_cache_matches_similar_embeddings():
+    semantic = SemanticCache(threshold=0.95)
+    semantic.add([1.0, 0.0, 0.0], 'answer')
+
+    # Scale does not matter, only direction
+    assert semantic.lookup([10.0, 0.5, 0.0]) == 'answer'
+    assert semantic.lookup([0.7, 0.7, 0.0]) is None
+    assert semantic.stats()['hits'] == 1
+    assert semantic.stats()['misses'] == 1
+
+
+def test_semantic_cache_returns_the_closest_entry():
+    semantic = SemanticCache(threshold=0.9)
+    semantic.add([1.0, 0.2, 0.0], 'near')
+    semantic.add([1.0, 0.0, 0.0], 'exact')
+    assert semantic.lookup(np.array([1.0, 0.0, 0.0], dtype=np.float64)) == 'exact'
+
+
+def test_semantic_cache_is_scoped():
+    semantic = SemanticCache(threshold=0.9)
+    semantic.add([1.0, 0.0], 'middle school answer', scope='중등')
+    semantic.add([1.0, 0.01], 'high school answer', scope='고등')
+
+    assert semantic.lookup([1.0, 0.0], scope='중등') == 'middle school answer'
+    assert semantic.lookup([1.0, 0.0], scope='고등') == 'high school answer'
+    assert semantic.lookup([1.0, 0.0], scope='초등') is None
+
+
+def test_semantic_cache_evicts_least_recently_used():
+    semantic = SemanticCache(threshold=0.99, maxsize=2)
+    semantic.add([1.0, 0.0], 'x')
+    semantic.add([0.0, 1.0], 'y')
+    assert semantic.lookup([1.0, 0.0]) == 'x'
+    semantic.add([-1.0, 0.0], 'z')
+
+    assert len(semantic) == 2
+    assert semantic.lookup([0.0, 1.0]) is None
+    assert semantic.lookup([1.0, 0.0]) == 'x'
+
+
+def test_semantic_cache_entries_expire(clock):
+    semantic = SemanticCache(threshold=0.9, ttl=60)
+    semantic.add([1.0, 0.0], 'old')
+    clock.advance(30)
+    semantic.add([0.0, 1.0], 'new')
+    clock.advance(31)
+
+    assert semantic.lookup([1.0, 0.0]) is None
+    assert semantic.lookup([0.0, 1.0]) == 'new'
+    assert len(semantic) == 1
+
+
+def test_semantic_cache_clear():
+    semantic = SemanticCache()
+    semantic.add([1.0, 0.0], 'x')
+    semantic.clear()
+    assert len(semantic) == 0
+    assert semantic.lookup([1.0, 0.0]) is None
@@ -0,0 +1,87 @@
+import pytest
+
+from app.chunking import chunk_summary, highlight_spans, sentence_spans
+
+SUMMARY = (
+    '학생은 어릴 때부터 동물을 좋아했다. 수의사가 되고 싶어 과학 공부를 열심히 하고 있다. '
+    '상담 교사는 생명과학 관련 활동과 봉사 활동을 추천했다. 학생은 동물 보호소 봉사를 계획하고 있다.'
+)
+
+
+def highlight(text: str, phrase: str) -> dict:
+    start = text.index(phrase)
+    return {'start_idx': start, 'end_idx': start + len(phrase)}
+
+
+def test_highlight_span_is_widened_and_snapped_to_words():
+    spans = highlight_spans(SUMMARY, [highlight(SUMMARY, '수의사')], window=5, max_chars=200)
+    assert len(spans) == 1
+    start, end = spans[0]
+    assert '수의사가 되고' in SUMMARY[start:end]
+    assert start == 0 or SUMMARY[start - 1].isspace()
+    assert end == len(SUMMARY) or SUMMARY[end].isspace()
+
+
+def test_overlapping_highlights_are_merged():
+    highlights = [highlight(SUMMARY, '수의사가'), highlight(SUMMARY, '과학 공부')]
+    spans = highlight_spans(SUMMARY, highlights, window=10, max_chars=200)
+    assert len(spans) == 1
+    assert '수의사가' in SUMMARY[slice(*spans[0])]
+    assert '과학 공부' in SUMMARY[slice(*spans[0])]
+
+
+def test_distant_highlights_stay_separate():
+    highlights = [highlight(SUMMARY, '봉사를 계획'), highlight(SUMMARY, '동물을 좋아했다')]
+    spans = highlight_spans(SUMMARY, highlights, window=0, max_chars=200)
+    assert len(spans) == 2
+    assert spans == sorted(spans)
+
+
+def test_invalid_highlight_offsets_are_dropped():
+    highlights = [
+        {'start_idx': len(SUMMARY) + 10, 'end_idx': len(SUMMARY) + 20},
+        {'start_idx': 20, 'end_idx': 10},
+        {'start_idx': SUMMARY.index(' '), 'end_idx': SUMMARY.index(' ') + 1},
+    ]
+    assert highlight_spans(SUMMARY, highlights) == []
+
+
+def test_offsets_past_the_end_are_clamped():
+    start = SUMMARY.index('보호소')
+    spans = highlight_spans(SUMMARY, [{'start_idx': start, 'end_idx': start + 1000}], window=0)
+    assert spans[-1][1] == len(SUMMARY)
+
+
+@pytest.mark.parametrize('max_chars', [10, 25, 60])
+def test_long_spans_are_split_under_max_chars(max_chars):
+    spans = highlight_spans(SUMMARY, [{'start_idx': 0, 'end_idx': len(SUMMARY)}], window=0, max_chars=max_chars)
+    assert all(0 < end - start <= max_chars for start, end in spans)
+    # Pieces cover the text in order, dropping only the whitespace between them
+    assert ' '.join(SUMMARY[start:end] for start, end in spans).split() == SUMMARY.split()
+
+
+def test_word_longer_than_max_chars_is_cut():
+    text = '가' * 25
+    assert highlight_spans(text, [{'start_idx': 0, 'end_idx': 25}], window=0, max_chars=10) == [
+        (0, 10), (10, 20), (20, 25)
+    ]
+
+
+def test_sentence_spans_pack_sentences():
+    spans = sentence_spans(SUMMARY, max_chars=80)
+    texts = [SUMMARY[start:end] for start, end in spans]
+    assert all(len(text) <= 80 for text in texts)
+    assert texts[0].startswith('학생은 어릴 때부터')
+    assert texts[-1].endswith('계획하고 있다.')
+    assert ' '.join(texts).split() == SUMMARY.split()
+
+
+def test_sentence_spans_ignore_blank_text():
+    assert sentence_spans('') == []
+    assert sentence_spans('   ') == []
+
+
+def test_chunk_summary_falls_back_to_sentences():
+    assert chunk_summary(SUMMARY, [], max_chars=80) == sentence_spans(SUMMARY, max_chars=80)
+    highlights = [highlight(SUMMARY, '수의사')]
+    assert chunk_summary(SUMMARY, highlights) == highlight_spans(SUMMARY, highlights)
@@ -0,0 +1,144 @@
+import pytest
+
+from app import conversation
+from app.conversation import ConversationSession, ConversationStore, first_sentence
+from app.tokens import estimate_tokens
+
+ANSWER = "## 안녕하세요!\n1. **수의사가 되려면 생명과학과 화학 공부를 꾸준히 하는 것이 좋아요.** 동물 병원 체험도 도움이 됩니다."
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(conversation.time, 'monotonic', clock)
+    return clock
+
+
+def test_first_sentence_skips_headings_and_markup():
+    assert first_sentence(ANSWER) == "수의사가 되려면 생명과학과 화학 공부를 꾸준히 하는 것이 좋아요."
+    assert first_sentence("짧은 답변\n  여러 줄") == "짧은 답변 여러 줄"
+
+
+def test_recent_turns_are_rendered_verbatim():
+    session = ConversationSession('s', history_tokens=1000)
+    assert session.is_empty
+    assert session.render() == ""
+
+    session.add_turn("수의사가 되고 싶어요", ANSWER)
+    rendered = session.render()
+    assert "최근 대화:" in rendered
+    assert "학생: 수의사가 되고 싶어요" in rendered
+    assert "이전 대화 요약:" not in rendered
+    assert not session.is_empty
+
+
+def test_old_turns_are_folded_into_the_summary():
+    session = ConversationSession('s', history_tokens=50, summary_tokens=1000)
+    for i in range(4):
+        session.add_turn(f"질문 {i}번", ANSWER)
+
+    assert session.turn_count == 4
+    assert len(session.turns) == 1
+    assert len(session.summary) == 3
+    rendered = session.render()
+    assert "- 질문 0번 → 수의사가 되려면" in rendered
+    assert "학생: 질문 3번" in rendered
+    assert session.tokens() == sum(tokens for *_, tokens in session.turns) + sum(t for _, t in session.summary)
+
+
+def test_latest_turn_stays_even_over_budget():
+    session = ConversationSession('s', history_tokens=10, turn_tokens=1000)
+    session.add_turn("긴 질문", ANSWER * 3)
+    assert len(session.turns) == 1
+    assert not session.summary
+
+
+def test_summary_drops_oldest_lines_beyond_budget():
+    session = ConversationSession('s', history_tokens=1, summary_tokens=80)
+    for i in range(10):
+        session.add_turn(f"질문 {i}번", ANSWER)
+
+    assert sum(tokens for _, tokens in session.summary) <= 80
+    assert session.dropped == 9 - len(session.summary)
+    assert f"(앞선 대화 {session.dropped}개 생략)" in session.render()
+
+
+def test_turns_are_truncated_to_turn_budget():
+    session = ConversationSession('s', turn_tokens=20)
+    session.add_turn("질문", ANSWER * 10)
+    _, answer, _ = session.turns[0]
+    assert estimate_tokens(answer) <= 21
+    assert answer.endswith('…')
+
+
+def test_topic_cases_reused_only_on_topic():
+    session = ConversationSession('s')
+    assert session.topic_cases([1.0, 0.0], '중등', 0.8) is None
+
+    cases = [{'student_idx': 'S-1'}]
+    session.set_topic([1.0, 0.0], '중등', cases)
+    assert session.topic_cases([2.0, 0.1], '중등', 0.8) is cases
+    assert session.topic_cases([0.0, 1.0], '중등', 0.8) is None
+    assert session.topic_cases([1.0, 0.0], '고등', 0.8) is None
+
+
+def test_store_evicts_least_recently_used_sessions(clock):
+    store = ConversationStore(max_sessions=2, ttl=None)
+    first = store.get('a')
+    store.get('b')
+    assert store.get('a') is first
+    store.get('c')
+
+    assert len(store) == 2
+    assert store.get('a') is first
+    assert store.stats()['evicted'] == 1
+    assert store.get('b') is not None and store.stats()['evicted'] == 2
+
+
+def test_store_expires_idle_sessions(clock):
+    store = ConversationStore(ttl=60)
+    idle = store.get('idle')
+    clock.advance(30)
+    active = store.get('active')
+    clock.advance(31)
+
+    assert store.get('active') is active
+    assert store.get('idle') is not idle
+    assert store.stats()['expired'] == 1
+
+
+def test_store_follows_client_history(clock):
+    store = ConversationStore()
+    session = store.get('s', history=[("질문 1", ANSWER), ("질문 2", ANSWER)])
+    assert session.turn_count == 2
+
+    # Same session, history already known: nothing is replayed
+    assert store.get('s', history=[("질문 1", ANSWER)]).turn_count == 2
+
+    # An empty history means the chat was cleared
+    cleared = store.get('s', history=[])
+    assert cleared is not session
+    assert cleared.is_empty
+
+
+def test_store_counts_topic_reuse():
+    store = ConversationStore(topic_threshold=0.9)
+    session = store.get('s')
+    assert store.reuse_cases(session, [1.0, 0.0], None) is None
+    session.set_topic([1.0, 0.0], None, [])
+    assert store.reuse_cases(session, [1.0, 0.05], None) == []
+
+    stats = store.stats()
+    assert stats['topic_reuses'] == 1
+    assert stats['topic_reuse_rate'] == 0.5
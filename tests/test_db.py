@@ -0,0 +1,168 @@
+import json
+
+import pytest
+from sqlalchemy import text
+
+from app.db import DatabaseManager, iter_labeling_files
+from app.record_reader import JOB_CATEGORY_FILES, SCHOOL_LEVEL_FILES, iter_json_records
+
+
+def record(student_idx, summary, highlights=(), recommendations=(), job_label=None, comment=None):
+    return {
+        'student_idx': student_idx,
+        'counselling_summaries': [
+            {
+                'counseling_idx': counseling_idx,
+                'summary': f"{summary} ({counseling_idx}회차)",
+                'highlights': [{'start_idx': start, 'end_idx': end} for start, end in highlights]
+            }
+            for counseling_idx in (1, 2)
+        ],
+        'recommended_job_categories': [
+            {'priority': priority, 'job_category_idx': idx} for priority, idx in recommendations
+        ],
+        'job_label': job_label,
+        'expert_comment': {'ko': comment} if comment else None
+    }
+
+
+SCHOOL_RECORDS = {
+    '초등': [
+        record('S-1', '동물을 좋아하는 초등학생으로 수의사를 꿈꾼다', highlights=[(0, 6), (14, 17)]),
+        record('S-2', '그림 그리기를 좋아하고 만화가가 되고 싶어 한다', highlights=[(0, 9)]),
+        {'student_idx': 'S-bad'},  # fails validation
+    ],
+    '중등': [record('S-3', '게임 개발에 관심이 많은 중학생', highlights=[(0, 5)])],
+    '고등': [],
+}
+JOB_RECORDS = {
+    # S-1 is also in the 초등 file: the explicit school level must win
+    '기술계열': [
+        record('S-1', '수의사', recommendations=[(1, 3), (2, 7)], job_label='기술계열', comment='생명과학 공부를 권함'),
+        record('S-9', '고등학생으로 로봇 공학자를 희망', recommendations=[(1, 2)], job_label='기술계열'),
+    ],
+    '서비스계열': [record('S-2', '만화가', recommendations=[(1, 5)], job_label='서비스계열')],
+}
+
+
+@pytest.fixture
+def labeling_data(tmp_path):
+    base = tmp_path / 'labeling'
+    for files, records in ((SCHOOL_LEVEL_FILES, SCHOOL_RECORDS), (JOB_CATEGORY_FILES, JOB_RECORDS)):
+        for label, data in records.items():
+            path = base / files[label]
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(data, ensure_ascii=False), encoding='utf-8')
+    return base
+
+
+def import_with(db_path, importer):
+    db = DatabaseManager(str(db_path), batch_size=2)
+    try:
+        importer(db)
+    finally:
+        db.close()
+    return dump(db_path)
+
+
+def dump(db_path):
+    """Table contents keyed by natural keys, so surrogate ids may differ."""
+    db = DatabaseManager(str(db_path))
+    queries = {
+        'students': "SELECT student_idx, school_level FROM students",
+        'sessions': """SELECT s.student_idx, cs.counseling_idx, cs.summary
+                       FROM counselling_sessions cs JOIN students s ON s.id = cs.student_id""",
+        'highlights': """SELECT s.student_idx, cs.counseling_idx, h.start_idx, h.end_idx, h.content
+                         FROM highlights h JOIN counselling_sessions cs ON cs.id = h.session_id
+                         JOIN students s ON s.id = cs.student_id""",
+        'profiles': """SELECT s.student_idx, p.job_label, p.expert_comment
+                       FROM student_job_profiles p JOIN students s ON s.id = p.student_id""",
+        'recommendations': """SELECT s.student_idx, r.priority, r.job_category_idx
+                              FROM recommended_job_categories r JOIN students s ON s.id = r.student_id""",
+        'fts': "SELECT kind, student_idx, counseling_idx, school_level, content FROM counselling_fts",
+    }
+    try:
+        with db.engine.connect() as conn:
+            return {name: sorted(tuple(row) for row in conn.execute(text(sql))) for name, sql in queries.items()}
+    finally:
+        db.close()
+
+
+def raw_rows(db_path):
+    db = DatabaseManager(str(db_path))
+    try:
+        with db.engine.connect() as conn:
+            return {
+                table: sorted(tuple(row) for row in conn.execute(text(f"SELECT * FROM {table}")))
+                for table in ('students', 'counselling_sessions', 'highlights',
+                              'student_job_profiles', 'recommended_job_categories')
+            }
+    finally:
+        db.close()
+
+def test_bulk_import_matches_legacy_import(tmp_path, labeling_data):
+    legacy = import_with(tmp_path / 'legacy.db', lambda db: db.process_all_data(labeling_data, bulk=False))
+
+    def bulk(db):
+        for level, relative_path in SCHOOL_LEVEL_FILES.items():
+            stats = db.bulk_import_school_data(level, iter_json_records(labeling_data / relative_path))
+            assert stats['errors'] == (1 if level == '초등' else 0)
+
+    bulk = import_with(tmp_path / 'bulk.db', bulk)
+
+    assert bulk == legacy
+    assert [student for student, _ in bulk['students']] == ['S-1', 'S-2', 'S-3']
+    assert len(bulk['sessions']) == 6
+    assert len(bulk['highlights']) == 8
+    # One FTS row per summary and per non-empty highlight
+    assert len(bulk['fts']) == 6 + 8
+
+
+def test_bulk_import_skips_students_already_imported(tmp_path, labeling_data):
+    db_path = tmp_path / 'bulk.db'
+    results = {}
+
+    def import_all(db):
+        for label, school_level, file_path in iter_labeling_files(labeling_data):
+            results[label] = db.bulk_import_school_data(school_level, iter_json_records(file_path), label)
+
+    tables = import_with(db_path, import_all)
+
+    assert results['기술계열']['skipped'] == 1
+    assert results['서비스계열']['skipped'] == 1
+    assert tables['students'] == [('S-1', '초등'), ('S-2', '초등'), ('S-3', '중등'), ('S-9', '고등')]
+    # Skipped students keep their school-level rows only
+    assert [summary for student, _, summary in tables['sessions'] if student == 'S-1'] == [
+        '동물을 좋아하는 초등학생으로 수의사를 꿈꾼다 (1회차)', '동물을 좋아하는 초등학생으로 수의사를 꿈꾼다 (2회차)'
+    ]
+    assert tables['recommendations'] == [('S-9', 1, 2)]
+
+    # Re-running the import is a no-op
+    assert import_with(db_path, import_all) == tables
+    assert all(stats['processed'] == 0 for stats in results.values())
+
+
+def test_parallel_import_matches_serial_bulk_import(tmp_path, labeling_data):
+    serial, parallel = {}, {}
+
+    def import_serially(db):
+        for label, school_level, file_path in iter_labeling_files(labeling_data):
+            serial[label] = db.bulk_import_school_data(school_level, iter_json_records(file_path), label)
+
+    def import_in_parallel(db):
+        parallel.update(db.parallel_import(labeling_data, workers=2))
+
+    serial_tables = import_with(tmp_path / 'serial.db', import_serially)
+    parallel_tables = import_with(tmp_path / 'parallel.db', import_in_parallel)
+
+    assert parallel_tables == serial_tables
+    # Writes follow submission order, so even the surrogate ids line up
+    assert raw_rows(tmp_path / 'parallel.db') == raw_rows(tmp_path / 'serial.db')
+    assert ('S-1', '초등') in parallel_tables['students']
+
+    counts = ('processed', 'skipped', 'rows', 'errors')
+    assert list(parallel) == list(serial)
+    assert {label: [stats[key] for key in counts] for label, stats in parallel.items()} == {
+        label: [stats[key] for key in counts] for label, stats in serial.items()
+    }
+
@@ -0,0 +1,107 @@
+import pytest
+
+from app.fallback import DEFAULT_ACTIONS, DEFAULT_DIRECTIONS, DEFAULT_SITUATION, FallbackResponder, distinct
+
+HEADERS = ["**1. 질문자의 상황 분석**", "**2. 추천하는 진로 방향**", "**3. 구체적인 행동 제안**"]
+
+
+def student(student_idx, school_level, summary, comment, jobs):
+    return {
+        'student_idx': student_idx,
+        'school_level': school_level,
+        'counselling_summaries': [{'summary': summary}],
+        'expert_comment': {'ko': comment},
+        'recommended_job_categories': [
+            {'priority': priority, 'job_category_idx': category} for priority, category in enumerate(jobs, 1)
+        ]
+    }
+
+
+# Two robot students whose experts phrase the same recommendation differently,
+# plus enough unrelated students that "로봇" stays under the document-frequency cap
+STUDENTS = [
+    student('S-1', '중등', '학생은 로봇 공학에 관심이 많다. 로봇 동아리에 가입하기로 하였다.',
+            '학생은 로봇에 대한 열정이 크다. 1차 추천 직무는 공학 전문직이다.', [10]),
+    student('S-2', '고등', '로봇 대회에 나가고 싶어 한다. 코딩 공부를 시작할 계획이다.',
+            '학생은 로봇을 만드는 일을 좋아한다. 첫 번째 추천 직무는 공학 전문직이다.', [10]),
+] + [
+    student(f'S-{i}', '중등', f'학생은 {topic}에 관심이 있다. {topic} 체험을 신청하기로 하였다.',
+            f'학생은 {topic} 활동을 즐긴다. 1순위 추천 직무는 {topic} 서비스직이다.', [category])
+    for i, (topic, category) in enumerate(
+        [('요리', 30), ('음악', 40), ('미술', 50), ('체육', 60), ('원예', 70), ('여행', 80), ('사진', 90), ('패션', 100)],
+        start=3
+    )
+]
+
+
+@pytest.fixture(scope='module')
+def responder():
+    return FallbackResponder.build(STUDENTS)
+
+
+def sections(answer):
+    """Answer lines grouped under the three headers."""
+    positions = [answer.index(header) for header in HEADERS]
+    assert positions == sorted(positions)
+    bounds = positions + [len(answer)]
+    return [answer[bounds[i] + len(HEADERS[i]):bounds[i + 1]].strip().splitlines() for i in range(3)]
+
+
+def test_answer_has_three_parts_from_the_nearest_cases(responder):
+    situation, direction, action = sections(responder.answer("로봇을 만들고 싶어요"))
+
+    assert "- 학생은 로봇에 대한 열정이 크다." in situation
+    assert "- 학생은 로봇을 만드는 일을 좋아한다." in situation
+    assert direction[0] == "- 비슷한 상담 사례에서 추천된 직무 계열: 공학 전문직"
+    assert action[0] == "비슷한 학생들이 상담 후 실천하기로 한 일입니다."
+    assert "- 로봇 동아리에 가입하기로 하였다." in action
+    assert "- 코딩 공부를 시작할 계획이다." in action
+
+
+def test_near_duplicate_directions_are_listed_once(responder):
+    _, direction, _ = sections(responder.answer("로봇을 만들고 싶어요"))
+    assert [line for line in direction if "추천 직무는 공학 전문직이다" in line] == [
+        "- 1차 추천 직무는 공학 전문직이다."
+    ]
+
+
+def test_distinct_keeps_order_and_limit():
+    assert distinct(["2순위 추천은 연구 관련직이다.", "두 번째 추천은 연구관련직이다", "A.", "B.", "C."], 3) == [
+        "2순위 추천은 연구 관련직이다.", "A.", "B."
+    ]
+
+
+def test_given_cases_and_jobs_override_the_keyword_indexes(responder):
+    # How _degraded_response passes the sessions and job categories it already has
+    answer = responder.answer("로봇을 만들고 싶어요", student_ids=['S-4', 'S-unknown'], jobs=['음악 관련직', '음악 관련직'],
+                              notice="지금은 간단한 답변만 드릴 수 있어요.")
+    assert answer.startswith("지금은 간단한 답변만 드릴 수 있어요.\n\n" + HEADERS[0])
+
+    situation, direction, action = sections(answer)
+    # The given case comes first, the nearest keyword match fills the remaining slot
+    assert situation[1:] == ["- 학생은 음악 활동을 즐긴다.", "- 학생은 로봇에 대한 열정이 크다."]
+    assert direction[:2] == ["- 비슷한 상담 사례에서 추천된 직무 계열: 음악 관련직", "- 1순위 추천 직무는 음악 서비스직이다."]
+    assert action[1] == "- 음악 체험을 신청하기로 하였다."
+
+
+@pytest.mark.parametrize('query', ["", "우주 비행사가 되고 싶어요"])
+def test_queries_without_matches_get_generic_advice(responder, query):
+    situation, direction, action = sections(responder.answer(query))
+    assert situation == [DEFAULT_SITUATION]
+    assert direction == [f"- {sentence}" for sentence in DEFAULT_DIRECTIONS]
+    assert action == [f"- {sentence}" for sentence in DEFAULT_ACTIONS]
+
+
+def test_empty_index_answers_with_generic_advice():
+    responder = FallbackResponder([], {}, {}, {})
+    assert responder.search("로봇") == []
+    assert responder.recommend_jobs("로봇") == []
+    situation, _, _ = sections(responder.answer("로봇", student_ids=['S-1']))
+    assert situation == [DEFAULT_SITUATION]
+
+
+def test_save_and_load_round_trip(tmp_path, responder):
+    path = tmp_path / 'fallback_index.json'
+    responder.save(path)
+    loaded = FallbackResponder.load(path)
+    assert loaded.answer("로봇을 만들고 싶어요") == responder.answer("로봇을 만들고 싶어요")
@@ -0,0 +1,20 @@
+"""The ONNX runtime, model download, benchmark and recommender paths must not load torch."""
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).parent.parent
+HEAVY_MODULES = ('torch', 'sentence_transformers', 'chromadb')
+
+
+def test_embedding_modules_import_without_torch():
+    pytest.importorskip('tqdm')
+    code = (
+        "import sys\n"
+        "import app.create_embeddings, app.download_models, app.recommender, app.benchmark\n"
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))\n"
+    )
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == ''
@@ -0,0 +1,52 @@
+import threading
+
+import pytest
+
+pytest.importorskip('dotenv')
+
+from app import career_chatbot  # noqa: E402
+from app.career_chatbot import CareerChatbot  # noqa: E402
+from app.resilience import OverloadedError  # noqa: E402
+
+
+@pytest.fixture
+def chatbot(monkeypatch):
+    monkeypatch.setattr(career_chatbot, 'FAST_ANSWER_MODE', 'auto')
+    monkeypatch.setattr(career_chatbot, 'LLM_MAX_CONCURRENCY', 1)
+    # Only the in-flight bookkeeping is needed, not the models and indexes
+    chatbot = CareerChatbot.__new__(CareerChatbot)
+    chatbot.llm_in_flight = 0
+    chatbot._in_flight_lock = threading.Lock()
+    chatbot.llm = None
+    return chatbot
+
+
+def test_sync_calls_count_towards_auto_fast_mode(chatbot):
+    chatbot._check_llm()
+    with chatbot.count_llm_call():
+        assert chatbot.llm_in_flight == 1
+        with pytest.raises(OverloadedError):
+            chatbot._check_llm()
+    assert chatbot.llm_in_flight == 0
+    chatbot._check_llm()
+
+
+def test_in_flight_count_is_thread_safe(chatbot):
+    def worker():
+        for _ in range(1000):
+            with chatbot.count_llm_call():
+                pass
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert chatbot.llm_in_flight == 0
+
+
+def test_failed_call_releases_its_slot(chatbot):
+    with pytest.raises(RuntimeError):
+        with chatbot.count_llm_call():
+            raise RuntimeError("boom")
+    assert chatbot.llm_in_flight == 0
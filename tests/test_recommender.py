@@ -0,0 +1,107 @@
+import numpy as np
+import pytest
+
+from app.recommender import JobRecommender, mine_category_names
+
+# One embedding axis per keyword, so every centroid is known in closed form
+AXES = {'공학': 0, '예술': 1, '돌봄': 2}
+
+
+def encode(texts):
+    vectors = np.zeros((len(texts), len(AXES)), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for keyword, axis in AXES.items():
+            if keyword in text:
+                vectors[row, axis] += 1
+    return vectors
+
+
+def student(student_idx, summary, recommendations, comment):
+    return {
+        'student_idx': student_idx,
+        'counselling_summaries': [{'summary': summary}],
+        'recommended_job_categories': [
+            {'priority': priority, 'job_category_idx': category} for priority, category in recommendations
+        ],
+        'expert_comment': {'ko': comment}
+    }
+
+
+STUDENTS = [
+    student('S-1', '공학에 관심이 많다', [(1, 10), (2, 20)], '추천 직무 1순위는 공학 전문직이며 2순위는 연구 관련직이다.'),
+    student('S-2', '공학 동아리 활동', [(1, 10), (2, 20)], '1순위로는 공학전문직을, 2순위로는 연구 관련직을 추천한다.'),
+    student('S-3', '예술 활동을 즐긴다', [(1, 30), (2, 20)], '첫 번째 추천 직무는 예술 관련 직무이고 두 번째는 연구 관련직이다.'),
+    student('S-4', '돌봄 봉사를 한다', [(1, 40), (2, 30)], '1차 추천은 보건 서비스직, 2차 추천은 예술 관련 직무이다.'),
+]
+
+
+def build(cooccurrence_weight):
+    built = JobRecommender.build(STUDENTS, encode, batch_size=3)
+    return JobRecommender(built.categories.tolist(), built.names, built.centroids, built.cooccurrence,
+                          built.support, built.metadata, cooccurrence_weight=cooccurrence_weight)
+
+
+def test_category_names_are_mined_from_expert_comments():
+    assert mine_category_names(STUDENTS) == {
+        10: '공학 전문직',  # the spaced spelling wins over "공학전문직"
+        20: '연구 관련직',
+        30: '예술 관련 직무',
+        40: '보건 서비스직',
+    }
+
+
+def test_build_counts_support_and_cooccurrence():
+    recommender = JobRecommender.build(STUDENTS, encode, batch_size=3)
+    assert recommender.categories.tolist() == [10, 20, 30, 40]
+    assert recommender.support.tolist() == [2, 3, 2, 1]
+    assert recommender.cooccurrence.tolist() == [
+        [0, 2, 0, 0],
+        [2, 0, 1, 0],
+        [0, 1, 0, 1],
+        [0, 0, 1, 0],
+    ]
+    assert recommender.metadata == {'students': 4}
+    assert recommender.related(20) == [10, 30]
+    assert recommender.related(40) == [30]
+
+
+def test_recommend_ranks_categories_by_centroid_similarity():
+    recommendations = build(cooccurrence_weight=0).recommend(encode(['공학'])[0], top_k=3)
+
+    assert [r['name'] for r in recommendations] == ['공학 전문직', '연구 관련직', '예술 관련 직무']
+    assert recommendations[0]['score'] == pytest.approx(1.0)
+    # 20's centroid mixes two priority-2 공학 students with one 예술 student
+    assert recommendations[1]['score'] == pytest.approx(2 / np.sqrt(5))
+    assert recommendations[2]['score'] == pytest.approx(0.0)
+    assert recommendations[1]['related'] == ['공학 전문직', '예술 관련 직무']
+
+
+def test_cooccurrence_smoothing_lifts_related_categories():
+    query = encode(['공학'])
+    plain = build(cooccurrence_weight=0).scores(query)[0]
+    smoothed = build(cooccurrence_weight=0.2).scores(query)[0]
+
+    # 30 is recommended together with 20 and 40 as often: half of 20's similarity flows to it
+    assert plain[2] == pytest.approx(0.0)
+    assert smoothed[2] == pytest.approx(0.2 * 0.5 * 2 / np.sqrt(5))
+    assert smoothed[3] == pytest.approx(0.0)
+    assert [r['job_category_idx'] for r in build(0.2).recommend(query[0], top_k=4)] == [10, 20, 30, 40]
+
+
+def test_shared_names_are_recommended_once():
+    recommender = build(cooccurrence_weight=0)
+    recommender.names[20] = recommender.names[10]
+    recommendations = recommender.recommend(encode(['공학'])[0], top_k=2)
+    assert [r['job_category_idx'] for r in recommendations] == [10, 30]
+
+
+def test_save_and_load_round_trip(tmp_path):
+    recommender = build(cooccurrence_weight=0.2)
+    recommender.save(tmp_path)
+    assert JobRecommender.exists(tmp_path)
+
+    loaded = JobRecommender.load(tmp_path, cooccurrence_weight=0.2)
+    query = encode(['예술 돌봄'])
+    assert loaded.names == recommender.names
+    np.testing.assert_allclose(loaded.scores(query), recommender.scores(query), rtol=1e-6)
+    assert loaded.recommend(query[0]) == recommender.recommend(query[0])
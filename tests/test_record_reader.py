@@ -0,0 +1,83 @@
+import json
+
+import pytest
+
+from app import record_reader
+from app.record_reader import iter_json_records, resolve_backend, school_level_in
+
+RECORDS = [
+    {'student_idx': 'S-1', 'summary': '의사가 되고 싶은 중학생', 'score': 12345},
+    {'student_idx': 'S-2', 'nested': {'items': [1, 2.5, None, True]}, 'text': 'a,b]c'},
+    [],
+    67890,
+    '문자열 "레코드"',
+]
+
+
+@pytest.fixture
+def records_file(tmp_path):
+    path = tmp_path / 'records.json'
+    path.write_text(json.dumps(RECORDS, ensure_ascii=False, indent=2), encoding='utf-8')
+    return path
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 7, 64 * 1024])
+def test_json_backend_matches_json_load(records_file, chunk_size):
+    # Tiny chunks put record and number boundaries on the buffer edge
+    assert list(iter_json_records(records_file, backend='json', chunk_size=chunk_size)) == RECORDS
+
+
+def test_json_backend_is_lazy(tmp_path):
+    path = tmp_path / 'broken.json'
+    path.write_text('[{"a": 1}, {"b": 2} {"c": 3}]', encoding='utf-8')
+    records = iter_json_records(path, backend='json', chunk_size=4)
+    assert next(records) == {'a': 1}
+    assert next(records) == {'b': 2}
+    with pytest.raises(ValueError, match="Expected ','"):
+        next(records)
+
+
+@pytest.mark.parametrize('content', ['[]', '  \n[ \n ]\n'])
+def test_empty_array(tmp_path, content):
+    path = tmp_path / 'empty.json'
+    path.write_text(content, encoding='utf-8')
+    assert list(iter_json_records(path, backend='json', chunk_size=2)) == []
+
+
+def test_rejects_non_array_and_truncated_files(tmp_path):
+    path = tmp_path / 'object.json'
+    for content in ('{"a": 1}', ''):
+        path.write_text(content, encoding='utf-8')
+        with pytest.raises(ValueError, match='top-level JSON array'):
+            list(iter_json_records(path, backend='json'))
+
+    path.write_text('[{"a": 1}, {"b": ', encoding='utf-8')
+    with pytest.raises(ValueError):
+        list(iter_json_records(path, backend='json', chunk_size=3))
+
+
+def test_ijson_backend_matches_json_backend(records_file):
+    pytest.importorskip('ijson')
+    assert list(iter_json_records(records_file, backend='ijson')) == RECORDS
+
+
+def test_resolve_backend(monkeypatch):
+    assert resolve_backend('json') == 'json'
+    with pytest.raises(ValueError):
+        resolve_backend('yaml')
+
+    monkeypatch.setattr(record_reader, 'ijson', None)
+    assert resolve_backend('auto') == 'json'
+    with pytest.raises(ImportError):
+        resolve_backend('ijson')
+
+
+@pytest.mark.parametrize('text, level', [
+    ('저는 중학생인데 의사가 되고 싶어요', '중등'),
+    ('초등학교 5학년입니다', '초등'),
+    ('고등학생이고 중학교 때부터 그림을 그렸어요', '고등'),
+    ('대학생입니다', None),
+    ('', None),
+])
+def test_school_level_in(text, level):
+    assert school_level_in(text) == level
@@ -0,0 +1,154 @@
+import pytest
+
+from app import resilience
+from app.resilience import (
+    CircuitBreaker, CircuitOpenError, RateLimitedError, TokenBucket, TransientError, backoff_delay, is_transient
+)
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(resilience.time, 'monotonic', clock)
+    return clock
+
+
+def test_unlimited_bucket_never_waits(clock):
+    bucket = TokenBucket(0, burst=1, max_wait=0)
+    assert [bucket.reserve() for _ in range(100)] == [0.0] * 100
+
+
+def test_bucket_allows_burst_then_queues_on_negative_tokens(clock):
+    bucket = TokenBucket(60, burst=2)
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == 0.0
+    # Each later caller is scheduled one refill interval behind the previous one
+    assert bucket.reserve() == pytest.approx(1.0)
+    assert bucket.reserve() == pytest.approx(2.0)
+    assert bucket.tokens == pytest.approx(-2.0)
+
+    stats = bucket.stats()
+    assert stats['acquired'] == 4
+    assert stats['throttled'] == 2
+    assert stats['waited_seconds'] == pytest.approx(3.0)
+
+
+def test_bucket_refills_up_to_capacity(clock):
+    bucket = TokenBucket(60, burst=3)
+    for _ in range(3):
+        bucket.reserve()
+    clock.advance(1.0)
+    assert bucket.reserve() == 0.0
+    clock.advance(600)
+    assert bucket.stats()['tokens'] == pytest.approx(3.0)
+
+
+def test_rejection_over_max_wait_leaves_bucket_untouched(clock):
+    bucket = TokenBucket(60, burst=1, max_wait=0.5)
+    bucket.reserve()
+    tokens = bucket.tokens
+
+    with pytest.raises(RateLimitedError) as excinfo:
+        bucket.reserve()
+    assert excinfo.value.wait == pytest.approx(1.0)
+    assert bucket.tokens == tokens
+    assert bucket.acquired == 1
+    assert bucket.rejected == 1
+
+    # A per-call limit overrides the bucket's own
+    assert bucket.reserve(max_wait=2.0) == pytest.approx(1.0)
+    clock.advance(2.0)
+    assert bucket.reserve() == 0.0
+
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+    clock.advance(10)
+    with pytest.raises(CircuitOpenError) as excinfo:
+        breaker.check()
+    assert excinfo.value.retry_after == pytest.approx(20)
+    assert breaker.stats()['rejected'] == 2
+    assert breaker.stats()['opens'] == 1
+
+
+def test_half_open_lets_one_probe_through(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock.advance(30)
+
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+
+
+def test_failed_probe_reopens_breaker(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock.advance(30)
+    assert breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.retry_after() == pytest.approx(30)
+    assert breaker.stats()['opens'] == 2
+
+
+def test_unreported_probe_slot_expires(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock.advance(30)
+    assert breaker.allow()
+
+    # The probe never reports back (e.g. a cancelled stream)
+    clock.advance(29)
+    assert not breaker.allow()
+    clock.advance(1)
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+
+def test_backoff_delay_is_capped_full_jitter(monkeypatch):
+    bounds = []
+    monkeypatch.setattr(resilience.random, 'uniform', lambda low, high: bounds.append((low, high)) or high)
+    assert [backoff_delay(attempt, base=0.5, cap=4.0) for attempt in range(5)] == [0.5, 1.0, 2.0, 4.0, 4.0]
+    assert all(low == 0 for low, _ in bounds)
+
+
+def test_is_transient():
+    class ServiceUnavailable(Exception):
+        pass
+
+    class CustomUnavailable(ServiceUnavailable):
+        pass
+
+    assert is_transient(TransientError())
+    assert is_transient(ServiceUnavailable())
+    assert is_transient(CustomUnavailable())
+    assert is_transient(ConnectionResetError())
+    assert not is_transient(TimeoutError())
+    assert not is_transient(ValueError())
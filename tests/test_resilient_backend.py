@@ -0,0 +1,133 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip('dotenv')
+
+from app import resilience  # noqa: E402
+from app.career_chatbot import LLMBackend, ResilientBackend  # noqa: E402
+from app.resilience import CircuitBreaker, CircuitOpenError, TokenBucket, TransientError  # noqa: E402
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(resilience.time, 'monotonic', clock)
+    return clock
+
+
+class ScriptedBackend(LLMBackend):
+    """Raises the scripted errors in order, then answers."""
+
+    name = 'scripted'
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def _next(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return 'answer'
+
+    def generate(self, prompt):
+        return self._next()
+
+    async def agenerate(self, prompt):
+        return self._next()
+
+
+class InvalidArgument(Exception):
+    pass
+
+
+def resilient(backend, failures=5, max_retries=2):
+    return ResilientBackend(
+        backend, limiter=TokenBucket(0), breaker=CircuitBreaker(failures, reset_timeout=30),
+        max_retries=max_retries, retry_base_delay=0, retry_max_delay=0, timeout=None
+    )
+
+
+def test_transient_errors_are_retried_until_success(clock):
+    backend = ScriptedBackend(TransientError('503'), TransientError('503'))
+    llm = resilient(backend)
+    assert llm.generate('q') == 'answer'
+    assert backend.calls == 3
+    assert llm.retries == 2
+    assert llm.breaker.failures == 0
+
+
+def test_exhausted_retries_record_one_failure_per_request(clock):
+    llm = resilient(ScriptedBackend(*[TransientError('503')] * 6), failures=2)
+    with pytest.raises(TransientError):
+        llm.generate('q')
+    assert llm.breaker.failures == 1
+    assert llm.breaker.state == CircuitBreaker.CLOSED
+
+    # The second failed request, not the second failed attempt, opens the breaker
+    with pytest.raises(TransientError):
+        llm.generate('q')
+    assert llm.breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        llm.generate('q')
+
+
+def test_client_errors_do_not_count_towards_the_breaker(clock):
+    backend = ScriptedBackend(InvalidArgument('prompt too long'))
+    llm = resilient(backend, failures=1)
+    with pytest.raises(InvalidArgument):
+        llm.generate('q')
+    assert backend.calls == 1
+    assert llm.breaker.failures == 0
+    assert llm.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_timeouts_count_without_retry(clock):
+    backend = ScriptedBackend(asyncio.TimeoutError())
+    llm = resilient(backend, failures=1)
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(llm.agenerate('q'))
+    assert backend.calls == 1
+    assert llm.breaker.state == CircuitBreaker.OPEN
+
+
+def test_half_open_probe_retries_then_closes(clock):
+    llm = resilient(ScriptedBackend(TransientError('503')), failures=1, max_retries=0)
+    with pytest.raises(TransientError):
+        llm.generate('q')
+    assert llm.breaker.state == CircuitBreaker.OPEN
+
+    clock.advance(30)
+    llm.backend, llm.max_retries = ScriptedBackend(TransientError('503')), 2
+    # The probe may use its own retries; the breaker is only checked once per request
+    assert asyncio.run(llm.agenerate('q')) == 'answer'
+    assert llm.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_failed_half_open_probe_reopens_with_one_failure(clock):
+    llm = resilient(ScriptedBackend(TransientError('503')), failures=1, max_retries=0)
+    with pytest.raises(TransientError):
+        llm.generate('q')
+
+    clock.advance(30)
+    backend = ScriptedBackend(*[TransientError('503')] * 3)
+    llm.backend, llm.max_retries = backend, 2
+    with pytest.raises(TransientError):
+        llm.generate('q')
+    assert backend.calls == 3
+    assert llm.breaker.state == CircuitBreaker.OPEN
+    assert llm.breaker.stats()['opens'] == 2
+    with pytest.raises(CircuitOpenError):
+        llm.generate('q')
@@ -0,0 +1,169 @@
+import pytest
+
+from app.retrieval import HybridRetriever, reciprocal_rank_fusion, to_chroma_where
+
+
+def vector_hit(student_idx, counseling_idx, document, data_type='counselling_summary', school_level='중등'):
+    return {
+        'id': f"{student_idx}_{counseling_idx}_{data_type}",
+        'document': document,
+        'metadata': {
+            'student_idx': student_idx, 'counseling_idx': counseling_idx,
+            'school_level': school_level, 'data_type': data_type
+        }
+    }
+
+
+def lexical_row(student_idx, counseling_idx, content, kind='highlight', school_level='중등'):
+    return {
+        'content': content, 'kind': kind, 'student_idx': student_idx, 'counseling_idx': counseling_idx,
+        'school_level': school_level, 'score': -1.0
+    }
+
+
+class StubCollection:
+    """Chroma stand-in: returns the configured hits that match the where clause."""
+
+    def __init__(self, hits):
+        self.hits = hits
+        self.queries = []
+
+    def query(self, n_results, where=None, query_texts=None, query_embeddings=None):
+        self.queries.append({'n_results': n_results, 'where': where})
+        clauses = (where or {}).get('$and', [where] if where else [])
+        hits = [hit for hit in self.hits
+                if all(hit['metadata'].get(field) == value for clause in clauses for field, value in clause.items())]
+        hits = hits[:n_results]
+        return {
+            'ids': [[hit['id'] for hit in hits]],
+            'documents': [[hit['document'] for hit in hits]],
+            'metadatas': [[hit['metadata'] for hit in hits]],
+            'distances': [[0.1 * i for i in range(len(hits))]],
+        }
+
+
+class StubCaseStore:
+    """CaseStore stand-in: lexical rows in rank order plus the stored summaries."""
+
+    def __init__(self, rows=(), summaries=None, fts_available=True):
+        self.rows = list(rows)
+        self.summaries = summaries or {}
+        self.fts_available = fts_available
+        self.searches = []
+
+    def search(self, query, limit=10, school_level=None):
+        self.searches.append({'query': query, 'limit': limit, 'school_level': school_level})
+        return [row for row in self.rows if school_level is None or row['school_level'] == school_level][:limit]
+
+    def get_sessions(self, keys):
+        return {
+            key: {'summary': self.summaries[key], 'school_level': '중등'}
+            for key in keys if key in self.summaries
+        }
+
+
+def test_reciprocal_rank_fusion():
+    scores = reciprocal_rank_fusion({'vector': ['a', 'b'], 'lexical': ['b', 'c']}, k=60)
+    assert scores['b'] == pytest.approx(1 / 62 + 1 / 61)
+    assert scores['a'] == pytest.approx(1 / 61)
+    assert scores['c'] == pytest.approx(1 / 62)
+    assert sorted(scores, key=scores.get, reverse=True) == ['b', 'a', 'c']
+
+
+def test_to_chroma_where():
+    assert to_chroma_where(None) is None
+    assert to_chroma_where({'school_level': '중등'}) == {'school_level': '중등'}
+    assert to_chroma_where({'school_level': '중등', 'data_type': 'chunk'}) == {
+        '$and': [{'school_level': '중등'}, {'data_type': 'chunk'}]
+    }
+
+
+def test_sessions_found_by_both_retrievers_rank_first():
+    collection = StubCollection([
+        vector_hit('S-1', 1, '요약 1'),
+        vector_hit('S-2', 1, '요약 2'),
+    ])
+    case_store = StubCaseStore(rows=[
+        lexical_row('S-2', 1, '하이라이트 2'),
+        lexical_row('S-3', 1, '하이라이트 3'),
+    ], summaries={('S-3', 1): '요약 3'})
+    retriever = HybridRetriever(collection, case_store, rrf_k=60)
+
+    cases = retriever.retrieve('의사', n_results=3)
+    assert [case['id'] for case in cases] == ['S-2_1', 'S-1_1', 'S-3_1']
+    assert cases[0]['sources'] == ['vector', 'lexical']
+    assert cases[0]['score'] == pytest.approx(1 / 62 + 1 / 61)
+    assert cases[1]['sources'] == ['vector']
+    assert cases[2]['sources'] == ['lexical']
+
+
+def test_highlights_collapse_into_their_parent_summary():
+    collection = StubCollection([
+        vector_hit('S-1', 2, '하이라이트 A', data_type='highlight'),
+        vector_hit('S-1', 2, '요약 전체'),
+        vector_hit('S-1', 2, '하이라이트 B', data_type='highlight'),
+    ])
+    case_store = StubCaseStore(rows=[lexical_row('S-1', 2, '하이라이트 A')])
+    cases = HybridRetriever(collection, case_store).retrieve('의사', n_results=3)
+
+    assert len(cases) == 1
+    assert cases[0]['key'] == ('S-1', 2)
+    assert cases[0]['summary'] == '요약 전체'
+    assert cases[0]['matches'] == ['하이라이트 A', '하이라이트 B']
+
+
+def test_highlight_only_hits_load_the_summary():
+    collection = StubCollection([vector_hit('S-1', 1, '하이라이트', data_type='highlight')])
+    case_store = StubCaseStore(summaries={('S-1', 1): '저장된 요약'})
+    case = HybridRetriever(collection, case_store).retrieve('의사', n_results=1)[0]
+    assert case['summary'] == '저장된 요약'
+
+    # Without a stored summary the best snippet stands in
+    case = HybridRetriever(collection, StubCaseStore()).retrieve('의사', n_results=1)[0]
+    assert case['summary'] == '하이라이트'
+
+
+def test_school_level_filter_applies_to_both_retrievers():
+    collection = StubCollection([
+        vector_hit('S-1', 1, '중학생 요약', school_level='중등'),
+        vector_hit('S-2', 1, '고등학생 요약', school_level='고등'),
+    ])
+    case_store = StubCaseStore(rows=[
+        lexical_row('S-3', 1, '고등 하이라이트', school_level='고등'),
+        lexical_row('S-4', 1, '중등 하이라이트', school_level='중등'),
+    ])
+    cases = HybridRetriever(collection, case_store).retrieve('의사', n_results=5, filters={'school_level': '중등'})
+
+    assert {case['id'] for case in cases} == {'S-1_1', 'S-4_1'}
+    assert collection.queries[0]['where'] == {'school_level': '중등'}
+    assert case_store.searches[0]['school_level'] == '중등'
+
+
+def test_other_filters_apply_to_lexical_metadata():
+    case_store = StubCaseStore(rows=[
+        lexical_row('S-1', 1, '요약', kind='summary'),
+        lexical_row('S-2', 1, '하이라이트', kind='highlight'),
+    ])
+    retriever = HybridRetriever(StubCollection([]), case_store)
+    hits = retriever.lexical_search('의사', 5, filters={'school_level': '중등', 'data_type': 'highlight'})
+    assert [hit['id'] for hit in hits] == ['S-2_1']
+
+
+def test_vector_only_when_fts_is_unavailable():
+    collection = StubCollection([vector_hit('S-1', 1, '요약 1')])
+    case_store = StubCaseStore(rows=[lexical_row('S-2', 1, '하이라이트')], fts_available=False)
+    cases = HybridRetriever(collection, case_store).retrieve('의사', n_results=3)
+
+    assert [case['id'] for case in cases] == ['S-1_1']
+    assert cases[0]['sources'] == ['vector']
+    assert case_store.searches == []
+
+
+def test_lexical_failure_degrades_to_vector_only():
+    class FailingCaseStore(StubCaseStore):
+        def search(self, query, limit=10, school_level=None):
+            raise RuntimeError("database is locked")
+
+    collection = StubCollection([vector_hit('S-1', 1, '요약 1')])
+    cases = HybridRetriever(collection, FailingCaseStore()).retrieve('의사', n_results=3)
+    assert [case['id'] for case in cases] == ['S-1_1']